@@ -0,0 +1,73 @@
+"""12 transpositions x 3 tempo scales x 4 crops of one file, rendered to
+tokens: deep-copying the MidiFile per variant vs. an `Augmenter`.
+
+    python benchmarks/bench_augment.py
+
+"""
+import os
+import sys
+from copy import deepcopy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile
+from miditoolkit.tokenizer import REMITokenizer
+from miditoolkit.augmentation import Augmenter, Transpose, StretchTime, Crop
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+SEMITONES = range(-6, 6)
+FACTORS = (0.9, 1.0, 1.1)
+
+
+def get_crops(max_tick, num_crops=4):
+    length = max_tick // num_crops
+    return [(idx * length, (idx + 1) * length) for idx in range(num_crops)]
+
+
+def deepcopy_variants(filename, tokenizer):
+    midi_obj = MidiFile(filename)
+    tokens = []
+    for start_tick, end_tick in get_crops(midi_obj.max_tick):
+        for factor in FACTORS:
+            for semitones in SEMITONES:
+                variant = deepcopy(midi_obj)
+                variant.transpose(semitones)
+                variant.stretch_time(factor)
+                tokens.append(tokenizer.encode(variant.slice(
+                    int(start_tick * factor + 0.5), int(end_tick * factor + 0.5))))
+    return tokens
+
+
+def augmenter_variants(filename, tokenizer):
+    augmenter = Augmenter(filename)
+    crops = [Crop(start_tick, end_tick) for start_tick, end_tick in get_crops(
+        augmenter.variant().max_tick)]
+    variants = augmenter.variants(
+        crops, [StretchTime(factor) for factor in FACTORS],
+        [Transpose(semitones) for semitones in SEMITONES])
+    return [variant.encode(tokenizer) for variant in variants]
+
+
+def main():
+    filename = make_midi(
+        os.path.join(benchmark_dir(), 'augment.mid'), num_tracks=8, num_notes=500)
+    tokenizer = REMITokenizer()
+    num_variants = len(augmenter_variants(filename, tokenizer))
+
+    # sanity check
+    expected = MidiFile(filename)
+    expected.transpose(3)
+    expected.stretch_time(1.1)
+    actual = Augmenter(filename).variant(Transpose(3), StretchTime(1.1))
+    assert (tokenizer.encode(expected) == actual.encode(tokenizer)).all()
+
+    print('{} variants'.format(num_variants))
+    t_copy = timeit(lambda: deepcopy_variants(filename, tokenizer), repeat=1)
+    t_augment = timeit(lambda: augmenter_variants(filename, tokenizer), repeat=3)
+    report('deepcopy per variant', t_copy)
+    report('Augmenter', t_augment, t_copy)
+
+
+if __name__ == '__main__':
+    main()
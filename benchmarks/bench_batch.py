@@ -0,0 +1,66 @@
+"""Throughput of loading a synthetic corpus: plain loop vs. load_midi_files.
+
+    python benchmarks/bench_batch.py [num_files] [num_workers]
+
+"""
+import os
+import sys
+import time
+import pickle
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi.parser import MidiFile
+from miditoolkit.midi.batch import load_midi_files
+from utils import make_midi, report, benchmark_dir
+
+
+def count_notes(midi_obj):
+    return sum(instrument.get_num_notes() for instrument in midi_obj.instruments)
+
+
+def main(num_files=200, num_workers=None):
+    corpus = os.path.join(benchmark_dir(), 'corpus')
+    os.makedirs(corpus, exist_ok=True)
+    filenames = [
+        make_midi(os.path.join(corpus, '%04d.mid' % idx), num_tracks=4, num_notes=500, seed=idx)
+        for idx in range(num_files)]
+    # one corrupt file
+    with open(os.path.join(corpus, 'corrupt.mid'), 'wb') as f:
+        f.write(b'MThd\x00\x00')
+    filenames.append(os.path.join(corpus, 'corrupt.mid'))
+
+    def loop():
+        results = []
+        for filename in filenames:
+            try:
+                results.append(MidiFile(filename))
+            except Exception:
+                results.append(None)
+        return results
+
+    def timed(func):
+        start = time.perf_counter()
+        result = func()
+        return time.perf_counter() - start, result
+
+    t_loop, _ = timed(loop)
+    t_pool, results = timed(lambda: load_midi_files(filenames, num_workers=num_workers))
+    t_reduce, counts = timed(lambda: load_midi_files(
+        filenames, func=count_notes, num_workers=num_workers))
+    assert sum(r.error is not None for r in results) == 1
+
+    print('{} files, {} workers'.format(len(filenames), num_workers or os.cpu_count()))
+    report('loop over MidiFile', t_loop)
+    report('load_midi_files', t_pool, t_loop)
+    report('load_midi_files, reduced in worker', t_reduce, t_loop)
+
+    midi_obj = MidiFile(filenames[0])
+    list_size = len(pickle.dumps(midi_obj))
+    array_size = len(pickle.dumps(MidiFile(filenames[0], note_array=True)))
+    print('pickled MidiFile: {} bytes with note lists, {} bytes with note arrays'.format(
+        list_size, array_size))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
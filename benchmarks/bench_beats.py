@@ -0,0 +1,52 @@
+"""Bar and beat of every note onset: walking the bars of the time signatures
+per note vs. `MidiFile.get_bar_beat`.
+
+    python benchmarks/bench_beats.py
+
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile
+from miditoolkit.midi.containers import TimeSignature
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def loop_bar_beat(midi_obj, tick):
+    signatures = midi_obj.time_signature_changes
+    bar = 0
+    for idx, ts in enumerate(signatures):
+        beat_ticks = midi_obj.ticks_per_beat * 4 // ts.denominator
+        bar_ticks = beat_ticks * ts.numerator
+        end = signatures[idx + 1].time if idx + 1 < len(signatures) else None
+        if end is None or tick < end:
+            offset = tick - ts.time
+            return bar + offset // bar_ticks, offset % bar_ticks // beat_ticks
+        bar += -(-(end - ts.time) // bar_ticks)
+
+
+def main():
+    filename = make_midi(
+        os.path.join(benchmark_dir(), 'beats.mid'), num_tracks=8, num_notes=5000)
+    midi_obj = MidiFile(filename)
+    num_bars = midi_obj.max_tick // (midi_obj.ticks_per_beat * 4)
+    midi_obj.time_signature_changes = [
+        TimeSignature((4, 3, 6, 7)[idx % 4], (4, 4, 8, 8)[idx % 4], idx * 4 * midi_obj.ticks_per_beat)
+        for idx in range(0, num_bars, 8)]
+    onsets = [note.start for instrument in midi_obj.instruments for note in instrument.notes]
+
+    # sanity check
+    bars, beats = midi_obj.get_bar_beat(onsets)
+    assert [loop_bar_beat(midi_obj, tick) for tick in onsets] == list(zip(bars.tolist(), beats.tolist()))
+
+    print('{} onsets, {} time signatures'.format(len(onsets), len(midi_obj.time_signature_changes)))
+    t_loop = timeit(lambda: [loop_bar_beat(midi_obj, tick) for tick in onsets], repeat=1)
+    t_grid = timeit(lambda: midi_obj.get_bar_beat(onsets))
+    report('loop over the bars per note', t_loop)
+    report('get_bar_beat, cached grid', t_grid, t_loop)
+
+
+if __name__ == '__main__':
+    main()
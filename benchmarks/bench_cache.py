@@ -0,0 +1,38 @@
+"""Loading a parsed MidiFile: cold parse of the midi file vs. the binary
+cache of `MidiFile.save_cache`.
+
+    python benchmarks/bench_cache.py
+
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def main():
+    filename = make_midi(
+        os.path.join(benchmark_dir(), 'cache.mid'), num_tracks=16, num_notes=5000)
+    cache_filename = os.path.join(benchmark_dir(), 'cache.mtkc')
+    MidiFile(filename, note_array=True).save_cache(cache_filename)
+
+    # sanity check
+    assert MidiFile.load_cache(cache_filename).dump() == MidiFile(filename).dump()
+
+    print('midi {} bytes, cache {} bytes'.format(
+        os.path.getsize(filename), os.path.getsize(cache_filename)))
+    t_parse = timeit(lambda: MidiFile(filename))
+    t_parse_array = timeit(lambda: MidiFile(filename, note_array=True))
+    t_read = timeit(lambda: MidiFile.load_cache(cache_filename, use_mmap=False))
+    t_mmap = timeit(lambda: MidiFile.load_cache(cache_filename))
+    report('parse', t_parse)
+    report('parse, note arrays', t_parse_array, t_parse)
+    report('cache, read', t_read, t_parse)
+    report('cache, memory-mapped', t_mmap, t_parse)
+
+
+if __name__ == '__main__':
+    main()
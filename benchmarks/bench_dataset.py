@@ -0,0 +1,67 @@
+"""Two epochs of random pianoroll crops over a small corpus: parsing and
+rendering every file on each access vs. `MidiDataset` with its cache of
+parsed files vs. crops of examples precomputed once.
+
+    python benchmarks/bench_dataset.py
+
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile
+from miditoolkit.dataset import MidiDataset, PianorollTransform, RandomCropDataset
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+NUM_FILES = 16
+CROP_LENGTH = 256
+
+
+class ReparseDataset(object):
+    """What is written by hand today: parse and render on each access."""
+
+    def __init__(self, filenames, transform):
+        self.filenames = filenames
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def __getitem__(self, idx):
+        return self.transform(MidiFile(self.filenames[idx]))
+
+
+def run_epochs(dataset, num_epochs=2):
+    crops = RandomCropDataset(dataset, CROP_LENGTH)
+    for epoch in range(num_epochs):
+        crops.set_epoch(epoch)
+        for idx in range(len(crops)):
+            crops[idx]
+
+
+def main():
+    filenames = [
+        make_midi(os.path.join(benchmark_dir(), 'dataset_{}.mid'.format(idx)),
+                  num_tracks=4, num_notes=1000, seed=idx)
+        for idx in range(NUM_FILES)]
+    transform = PianorollTransform(resample_resolution=12, binary_thres=0)
+
+    # sanity check
+    packed = MidiDataset(filenames, transform=transform).precompute()
+    reparse = ReparseDataset(filenames, transform)
+    assert all((packed[idx] == reparse[idx]).all() for idx in range(NUM_FILES))
+
+    t_reparse = timeit(lambda: run_epochs(ReparseDataset(filenames, transform)), repeat=1)
+    t_cached = timeit(lambda: run_epochs(MidiDataset(filenames, transform=transform)), repeat=1)
+    t_packed = timeit(lambda: run_epochs(MidiDataset(filenames, transform=transform).precompute()), repeat=1)
+    t_crops = timeit(lambda: run_epochs(packed))
+    report('parse and render per access', t_reparse)
+    report('MidiDataset, cached files', t_cached, t_reparse)
+    report('precompute, then crops', t_packed, t_reparse)
+    report('crops of precomputed examples', t_crops, t_reparse)
+
+
+if __name__ == '__main__':
+    main()
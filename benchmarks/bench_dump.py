@@ -0,0 +1,128 @@
+"""Writing speed of MidiFile.dump: vectorized encoder vs. the former writer
+building one mido message per event.
+
+The reference below is the former dump (without segment support), and its
+output is checked to be byte-identical to the new one.
+
+    python benchmarks/bench_dump.py
+
+"""
+import os
+import sys
+import functools
+import mido
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import parser
+from miditoolkit.midi.smf import KEY_NUMBER_NAMES
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+SECONDARY_SORT = {
+    'set_tempo': lambda e: 1 * 256 * 256,
+    'time_signature': lambda e: 2 * 256 * 256,
+    'key_signature': lambda e: 3 * 256 * 256,
+    'marker': lambda e: 4 * 256 * 256,
+    'lyrics': lambda e: 5 * 256 * 256,
+    'program_change': lambda e: 6 * 256 * 256,
+    'pitchwheel': lambda e: 7 * 256 * 256 + e.pitch,
+    'control_change': lambda e: 8 * 256 * 256 + e.control * 256 + e.value,
+    'note_on': lambda e: 10 * 256 * 256 + e.note * 256 + e.velocity}
+
+
+def event_compare(event1, event2):
+    if (event1.time == event2.time and
+            event1.type in SECONDARY_SORT and event2.type in SECONDARY_SORT):
+        return SECONDARY_SORT[event1.type](event1) - SECONDARY_SORT[event2.type](event2)
+    return event1.time - event2.time
+
+
+def mido_dump(midi_obj, filename):
+    midi_parsed = mido.MidiFile(ticks_per_beat=midi_obj.ticks_per_beat)
+
+    meta_track = []
+    if not midi_obj.time_signature_changes or min(
+            ts.time for ts in midi_obj.time_signature_changes) > 0:
+        meta_track.append(mido.MetaMessage('time_signature', time=0, numerator=4, denominator=4))
+    for ts in midi_obj.time_signature_changes:
+        meta_track.append(mido.MetaMessage(
+            'time_signature', time=ts.time, numerator=ts.numerator, denominator=ts.denominator))
+    if not midi_obj.tempo_changes or min(t.time for t in midi_obj.tempo_changes) > 0:
+        meta_track.append(mido.MetaMessage(
+            'set_tempo', time=0, tempo=mido.bpm2tempo(parser.DEFAULT_BPM)))
+    for t in midi_obj.tempo_changes:
+        meta_track.append(mido.MetaMessage(
+            'set_tempo', time=t.time, tempo=int(mido.bpm2tempo(t.tempo))))
+    for l in midi_obj.lyrics:
+        meta_track.append(mido.MetaMessage('lyrics', time=l.time, text=l.text))
+    for m in midi_obj.markers:
+        meta_track.append(mido.MetaMessage('marker', time=m.time, text=m.text))
+    for ks in midi_obj.key_signature_changes:
+        meta_track.append(mido.MetaMessage(
+            'key_signature', time=ks.time, key=KEY_NUMBER_NAMES[ks.key_number]))
+    meta_track.sort(key=functools.cmp_to_key(event_compare))
+    meta_track.append(mido.MetaMessage('end_of_track', time=meta_track[-1].time + 1))
+    midi_parsed.tracks.append(meta_track)
+
+    channels = list(range(16))
+    channels.remove(9)
+    for cur_idx, instrument in enumerate(midi_obj.instruments):
+        channel = 9 if instrument.is_drum else channels[cur_idx % len(channels)]
+        track = []
+        if instrument.name:
+            track.append(mido.MetaMessage('track_name', time=0, name=instrument.name))
+        track.append(mido.Message(
+            'program_change', time=0, program=instrument.program, channel=channel))
+        for bend in instrument.pitch_bends:
+            track.append(mido.Message(
+                'pitchwheel', time=bend.time, channel=channel, pitch=bend.pitch))
+        for cc in instrument.control_changes:
+            track.append(mido.Message(
+                'control_change', time=cc.time, channel=channel,
+                control=cc.number, value=cc.value))
+        for note in instrument.notes:
+            track.append(mido.Message(
+                'note_on', time=note.start, channel=channel,
+                note=note.pitch, velocity=note.velocity))
+            track.append(mido.Message(
+                'note_on', time=note.end, channel=channel, note=note.pitch, velocity=0))
+        track = sorted(track, key=functools.cmp_to_key(event_compare))
+        track.append(mido.MetaMessage('end_of_track', time=track[-1].time + 1))
+        midi_parsed.tracks.append(track)
+
+    # cumulative timing to delta
+    for track in midi_parsed.tracks:
+        tick = 0
+        for event in track:
+            event.time -= tick
+            tick += event.time
+    midi_parsed.save(filename=filename)
+
+
+def main():
+    filename = make_midi(
+        os.path.join(benchmark_dir(), 'dump.mid'), num_tracks=16, num_notes=5000)
+    out_ref = os.path.join(benchmark_dir(), 'dump_ref.mid')
+    out_new = os.path.join(benchmark_dir(), 'dump_new.mid')
+    midi_obj = parser.MidiFile(filename)
+    midi_arr = parser.MidiFile(filename, note_array=True)
+
+    # sanity check
+    mido_dump(midi_obj, out_ref)
+    midi_obj.dump(out_new)
+    with open(out_ref, 'rb') as f_ref, open(out_new, 'rb') as f_new:
+        assert f_ref.read() == f_new.read()
+
+    print('{} notes, {} instruments'.format(
+        sum(i.get_num_notes() for i in midi_obj.instruments), len(midi_obj.instruments)))
+    t_mido = timeit(lambda: mido_dump(midi_obj, out_ref))
+    t_list = timeit(lambda: midi_obj.dump(out_new))
+    t_array = timeit(lambda: midi_arr.dump(out_new))
+    report('mido writer', t_mido)
+    report('vectorized writer (note list)', t_list, t_mido)
+    report('vectorized writer (note array)', t_array, t_mido)
+
+
+if __name__ == '__main__':
+    main()
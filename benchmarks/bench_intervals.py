@@ -0,0 +1,47 @@
+"""Time-range queries over notes: a full scan of the notes per query vs.
+`Instrument.get_interval_index`.
+
+    python benchmarks/bench_intervals.py
+
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def scan_active(notes, ticks):
+    return [[idx for idx, note in enumerate(notes) if note.start <= tick < note.end]
+            for tick in ticks]
+
+
+def main(num_queries=200):
+    filename = make_midi(
+        os.path.join(benchmark_dir(), 'intervals.mid'), num_tracks=1, num_notes=20000)
+    instrument = MidiFile(filename).instruments[0]
+    notes = instrument.notes
+    ticks = np.random.RandomState(0).randint(0, max(n.end for n in notes), num_queries)
+
+    # sanity check
+    query_idx, note_idx = instrument.get_interval_index().active_at(ticks)
+    assert scan_active(notes, ticks) == [
+        note_idx[query_idx == idx].tolist() for idx in range(num_queries)]
+
+    print('{} notes, {} queries'.format(len(notes), num_queries))
+    t_scan = timeit(lambda: scan_active(notes, ticks), repeat=1)
+    t_build = timeit(lambda: type(instrument.get_interval_index())(
+        instrument.note_array['start'], instrument.note_array['end']))
+    t_index = timeit(lambda: instrument.get_interval_index().active_at(ticks))
+    t_poly = timeit(lambda: instrument.get_interval_index().get_polyphony(ticks))
+    report('full scan per query', t_scan)
+    report('build index', t_build)
+    report('active_at, cached index', t_index, t_scan)
+    report('get_polyphony, cached index', t_poly, t_scan)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Round trip latency of an in-memory request: load midi bytes, dump midi
+bytes, through temporary files vs. straight from/to memory.
+
+    python benchmarks/bench_io.py
+
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import parser
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def temp_file_round_trip(data):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path_in = os.path.join(tmp_dir, 'in.mid')
+        with open(path_in, 'wb') as f:
+            f.write(data)
+        midi_obj = parser.MidiFile(path_in)
+        path_out = os.path.join(tmp_dir, 'out.mid')
+        midi_obj.dump(path_out)
+        with open(path_out, 'rb') as f:
+            return f.read()
+
+
+def in_memory_round_trip(data):
+    return parser.MidiFile(data).dump()
+
+
+def main():
+    for num_notes in [100, 1000, 10000]:
+        filename = make_midi(
+            os.path.join(benchmark_dir(), 'io_%d.mid' % num_notes),
+            num_tracks=4, num_notes=num_notes)
+        with open(filename, 'rb') as f:
+            data = f.read()
+        assert temp_file_round_trip(data) == in_memory_round_trip(data)
+
+        print('{} notes per track, {} bytes'.format(num_notes, len(data)))
+        t_file = timeit(lambda: temp_file_round_trip(data), repeat=20)
+        t_memory = timeit(lambda: in_memory_round_trip(data), repeat=20)
+        report('  temporary files', t_file)
+        report('  in memory', t_memory, t_file)
+
+
+if __name__ == '__main__':
+    main()
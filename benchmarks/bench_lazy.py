@@ -0,0 +1,62 @@
+"""Metadata-only scans: full MidiFile load vs. LazyMidiFile, against
+reading the raw bytes as the I/O bound.
+
+    python benchmarks/bench_lazy.py
+
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile, LazyMidiFile
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def read_bytes(filenames):
+    for filename in filenames:
+        with open(filename, 'rb') as f:
+            f.read()
+
+
+def full_scan(filenames):
+    return [(m.ticks_per_beat, m.tempo_changes, m.time_signature_changes)
+            for m in map(MidiFile, filenames)]
+
+
+def lazy_scan(filenames):
+    results = []
+    for filename in filenames:
+        with LazyMidiFile(filename) as m:
+            results.append((m.ticks_per_beat, m.tempo_changes, m.time_signature_changes))
+    return results
+
+
+def lazy_instrument(filenames):
+    results = []
+    for filename in filenames:
+        with LazyMidiFile(filename) as m:
+            results.append(m.get_instrument(0).get_num_notes())
+    return results
+
+
+def main():
+    filenames = [
+        make_midi(os.path.join(benchmark_dir(), 'lazy_%d.mid' % idx),
+                  num_tracks=8, num_notes=2000, seed=idx)
+        for idx in range(10)]
+    assert full_scan(filenames) == lazy_scan(filenames)
+
+    t_read = timeit(lambda: read_bytes(filenames))
+    t_full = timeit(lambda: full_scan(filenames))
+    t_lazy = timeit(lambda: lazy_scan(filenames))
+    t_inst = timeit(lambda: lazy_instrument(filenames))
+    print('{} files'.format(len(filenames)))
+    report('read bytes only', t_read)
+    report('MidiFile, meta events', t_full)
+    report('LazyMidiFile, meta events', t_lazy, t_full)
+    report('LazyMidiFile, first instrument', t_inst, t_full)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Loading speed of MidiFile: single-pass loader vs. the former multi-pass one,
+with mido parsing and with the native byte decoder.
+
+The multi-pass reference below reproduces the traversal pattern of the
+previous loader (one pass per container type, plus the delta-to-cumulative
+and max tick passes) on top of the same container handlers, so the
+difference measures the cost of the extra traversals only.
+
+    python benchmarks/bench_load.py
+
+"""
+import os
+import sys
+import mido
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import parser
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def multi_pass_load(filename):
+    mido_obj = mido.MidiFile(filename=filename)
+    loader = parser._MidiLoader()
+
+    # delta to cumulative
+    for track in mido_obj.tracks:
+        tick = 0
+        for event in track:
+            event.time += tick
+            tick = event.time
+
+    # one pass per meta event type
+    for event_type in ['set_tempo', 'key_signature', 'time_signature', 'marker', 'lyrics']:
+        for track in mido_obj.tracks:
+            for event in track:
+                if event.type != event_type:
+                    continue
+                if event_type == 'set_tempo':
+                    loader.set_tempo(event.time, event.tempo)
+                elif event_type == 'key_signature':
+                    loader.key_signature(event.time, event.key)
+                elif event_type == 'time_signature':
+                    loader.time_signature(event.time, event.numerator, event.denominator)
+                elif event_type == 'marker':
+                    loader.marker(event.time, event.text)
+                else:
+                    loader.lyric(event.time, event.text)
+
+    # max tick
+    max_tick = max([max([e.time for e in t]) for t in mido_obj.tracks]) + 1
+
+    # instruments
+    for track_idx, track in enumerate(mido_obj.tracks):
+        loader.start_track(track_idx)
+        for event in track:
+            if event.type == 'track_name':
+                loader.track_name(event.name)
+            elif event.type == 'program_change':
+                loader.program_change(event.channel, event.program)
+            elif event.type == 'note_on':
+                loader.note_on(event.time, event.channel, event.note, event.velocity)
+            elif event.type == 'note_off':
+                loader.note_off(event.time, event.channel, event.note)
+            elif event.type == 'pitchwheel':
+                loader.pitchwheel(event.time, event.channel, event.pitch)
+            elif event.type == 'control_change':
+                loader.control_change(event.time, event.channel, event.control, event.value)
+    return max_tick, loader.get_instruments()
+
+
+def main():
+    filename = make_midi(
+        os.path.join(benchmark_dir(), 'load.mid'), num_tracks=16, num_notes=5000)
+
+    # sanity check
+    midi_obj = parser.MidiFile(filename, native=False)
+    max_tick, instruments = multi_pass_load(filename)
+    assert max_tick == midi_obj.max_tick
+    assert sum(len(i.notes) for i in instruments) == sum(len(i.notes) for i in midi_obj.instruments)
+
+    print('{} notes, {} instruments'.format(
+        sum(len(i.notes) for i in midi_obj.instruments), len(midi_obj.instruments)))
+    t_parse = timeit(lambda: mido.MidiFile(filename=filename))
+    t_multi = timeit(lambda: multi_pass_load(filename))
+    t_single = timeit(lambda: parser.MidiFile(filename, native=False))
+    t_native = timeit(lambda: parser.MidiFile(filename))
+    report('mido parsing only', t_parse)
+    report('multi-pass loader', t_multi)
+    report('single-pass loader (mido)', t_single, t_multi)
+    report('  excluding mido parsing', t_single - t_parse, t_multi - t_parse)
+    report('single-pass loader (native)', t_native, t_multi)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Memory per note: dict-based containers vs. slotted containers vs. note arrays.
+
+    python benchmarks/bench_memory.py
+
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi.containers import Note, notes_to_array
+
+
+class DictNote(object):
+    """The former Note layout, with a per-instance __dict__."""
+
+    def __init__(self, velocity, pitch, start, end):
+        self.velocity = velocity
+        self.pitch = pitch
+        self.start = start
+        self.end = end
+
+
+def bytes_per_note(build, num_notes):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    notes = build(num_notes)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del notes
+    return (after - before) / num_notes
+
+
+def build_list(cls):
+    # large start/end values so the ints are not cached singletons
+    return lambda n: [cls(64, 60 + i % 12, 100000 + i, 100480 + i) for i in range(n)]
+
+
+def main(num_notes=200000):
+    results = [
+        ('dict-based Note (before)', bytes_per_note(build_list(DictNote), num_notes)),
+        ('slotted Note (after)', bytes_per_note(build_list(Note), num_notes)),
+        # the source list is released before the array is measured
+        ('Instrument.note_array', bytes_per_note(
+            lambda n: notes_to_array(build_list(Note)(n)), num_notes)),
+    ]
+    for name, size in results:
+        print('{:<30s} {:8.1f} bytes/note'.format(name, size))
+
+
+if __name__ == '__main__':
+    main()
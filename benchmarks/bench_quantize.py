@@ -0,0 +1,59 @@
+"""Resampling a MidiFile to a coarse resolution: per-note loop vs.
+`MidiFile.resample`.
+
+With notes held as a list, resampling still reads and writes every Note
+object, and runs about as fast as the loop; the speedup comes with notes
+held as arrays.
+
+    python benchmarks/bench_quantize.py
+
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def loop_resample(midi_obj, ticks_per_beat):
+    factor = ticks_per_beat / midi_obj.ticks_per_beat
+    for instrument in midi_obj.instruments:
+        for note in instrument.notes:
+            note.start = int(note.start * factor + 0.5)
+            note.end = int(note.end * factor + 0.5)
+        for event in instrument.control_changes + instrument.pitch_bends:
+            event.time = int(event.time * factor + 0.5)
+    for event in (midi_obj.tempo_changes + midi_obj.time_signature_changes +
+                  midi_obj.key_signature_changes + midi_obj.markers + midi_obj.lyrics):
+        event.time = int(event.time * factor + 0.5)
+    midi_obj.ticks_per_beat = ticks_per_beat
+
+
+def main():
+    filename = make_midi(
+        os.path.join(benchmark_dir(), 'quantize.mid'), num_tracks=16, num_notes=5000)
+
+    # sanity check
+    expected, actual = MidiFile(filename), MidiFile(filename)
+    loop_resample(expected, 24)
+    actual.resample(24)
+    assert [i.notes for i in expected.instruments] == [i.notes for i in actual.instruments]
+
+    def run(func, **kwargs):
+        midi_objs = [MidiFile(filename, **kwargs) for _ in range(5)]
+        return timeit(lambda: func(midi_objs.pop()))
+
+    t_loop = run(lambda m: loop_resample(m, 24))
+    t_list = run(lambda m: m.resample(24))
+    t_array = run(lambda m: m.resample(24), note_array=True)
+    t_quantize = run(lambda m: m.quantize(subdivision=4), note_array=True)
+    report('per-note loop', t_loop)
+    report('resample (note list)', t_list, t_loop)
+    report('resample (note array)', t_array, t_loop)
+    report('quantize, time signature grid', t_quantize, t_loop)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Decoding a batch of pianorolls to notes: the former per-note loop vs.
+the vectorized `convert_pianoroll_to_notes`.
+
+    python benchmarks/bench_roll_to_notes.py
+
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi.containers import Note
+from miditoolkit.pianoroll import convert_pianoroll_to_notes
+from utils import timeit, report
+
+
+def loop_convert(pianoroll):
+    binarized = pianoroll > 0
+    padded = np.pad(binarized, ((1, 1), (0, 0)), 'constant')
+    diff = np.diff(padded.astype(np.int8), axis=0)
+    pitches, note_ons = np.nonzero((diff > 0).T)
+    note_offs = np.nonzero((diff < 0).T)[1]
+    notes = []
+    for idx, pitch in enumerate(pitches):
+        st, ed = note_ons[idx], note_offs[idx]
+        velocity = max(0, min(127, pianoroll[st, pitch]))
+        notes.append(Note(velocity=int(velocity), pitch=pitch, start=st, end=ed))
+    return notes
+
+
+def main(batch_size=32, num_frames=2048):
+    rng = np.random.RandomState(0)
+    batch = (rng.rand(batch_size, num_frames, 128) < 0.02) * rng.randint(1, 128, (batch_size, num_frames, 128))
+
+    # sanity check
+    assert [(n.velocity, n.pitch, n.start, n.end) for n in loop_convert(batch[0])] == \
+        [(n.velocity, n.pitch, n.start, n.end) for n in convert_pianoroll_to_notes(batch[0])]
+
+    print('{} pianorolls of {} frames'.format(batch_size, num_frames))
+    t_loop = timeit(lambda: [loop_convert(roll) for roll in batch], repeat=3)
+    t_notes = timeit(lambda: convert_pianoroll_to_notes(batch), repeat=3)
+    t_array = timeit(lambda: convert_pianoroll_to_notes(batch, return_array=True), repeat=3)
+    report('per-note loop', t_loop)
+    report('batched, Note lists', t_notes, t_loop)
+    report('batched, note arrays', t_array, t_loop)
+
+
+if __name__ == '__main__':
+    main()
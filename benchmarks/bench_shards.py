@@ -0,0 +1,41 @@
+"""Random access to many small midi files: one `MidiFile(path)` per file vs.
+a sharded store (`write_midi_shards` / `MidiShards`).
+
+    python benchmarks/bench_shards.py
+
+"""
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile, write_midi_shards, MidiShards
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def main(num_files=200):
+    filenames = [
+        make_midi(os.path.join(benchmark_dir(), 'shards_%d.mid' % idx),
+                  num_tracks=4, num_notes=200, seed=idx)
+        for idx in range(num_files)]
+    store_path = os.path.join(benchmark_dir(), 'store')
+    t_write = timeit(lambda: write_midi_shards(filenames, store_path, files_per_shard=64), repeat=1)
+
+    order = list(range(num_files))
+    random.Random(0).shuffle(order)
+    store = MidiShards(store_path)
+    assert all(store[idx].dump() == MidiFile(filenames[idx]).dump() for idx in order[:10])
+
+    print('{} files, {} shards'.format(len(store), len(store.shard_names)))
+    t_files = timeit(lambda: [MidiFile(filenames[idx]) for idx in order])
+    t_random = timeit(lambda: [store[idx] for idx in order])
+    t_stream = timeit(lambda: list(store))
+    report('write store', t_write)
+    report('MidiFile(path), random order', t_files)
+    report('MidiShards, random order', t_random, t_files)
+    report('MidiShards, streaming', t_stream, t_files)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Cropping random windows: per-note Python cropping, as the former
+`dump(segment=...)` did, vs. `MidiFile.slice`.
+
+    python benchmarks/bench_slice.py
+
+"""
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile, Note
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def crop_notes(notes, st, ed):
+    cropped = []
+    for note in notes:
+        start = max(st, note.start)
+        end = max(st, min(note.end, ed))
+        if end > start:
+            cropped.append(Note(note.velocity, note.pitch, start - st, end - st))
+    return cropped
+
+
+def main(num_windows=50):
+    filename = make_midi(
+        os.path.join(benchmark_dir(), 'slice.mid'), num_tracks=16, num_notes=5000)
+    midi_obj = MidiFile(filename)
+    midi_arr = MidiFile(filename, note_array=True)
+    rng = random.Random(0)
+    windows = [(st, st + 480 * 16) for st in (
+        rng.randrange(midi_obj.max_tick) for _ in range(num_windows))]
+
+    # sanity check
+    st, ed = windows[0]
+    assert [crop_notes(i.notes, st, ed) for i in midi_obj.instruments] == \
+        [i.notes for i in midi_obj.slice(st, ed).instruments]
+
+    print('{} windows'.format(num_windows))
+    t_loop = timeit(lambda: [
+        [crop_notes(i.notes, st, ed) for i in midi_obj.instruments] for st, ed in windows])
+    t_list = timeit(lambda: [midi_obj.slice(st, ed) for st, ed in windows])
+    t_array = timeit(lambda: [midi_arr.slice(st, ed) for st, ed in windows])
+    report('per-note cropping (notes only)', t_loop)
+    report('slice (note list)', t_list, t_loop)
+    report('slice (note array)', t_array, t_loop)
+
+
+if __name__ == '__main__':
+    main()
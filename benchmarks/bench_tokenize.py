@@ -0,0 +1,92 @@
+"""REMI tokenization: a per-note Python loop over `Instrument.notes` vs.
+`REMITokenizer`, in tokens per second.
+
+    python benchmarks/bench_tokenize.py
+
+"""
+import os
+import sys
+import bisect
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile
+from miditoolkit.tokenizer import REMITokenizer
+from miditoolkit.tokenizer.remi import BAR, POSITION, TEMPO, PROGRAM, PITCH, VELOCITY, DURATION
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def loop_encode(tokenizer, midi_obj):
+    offsets = tokenizer.offsets.tolist()
+    step = midi_obj.ticks_per_beat / tokenizer.resolution
+    bar_steps = [int(tick / step + 0.5) for tick in midi_obj.get_downbeats().tolist()]
+    signatures = tokenizer._get_time_signature_tokens(midi_obj, midi_obj.get_downbeats()).tolist()
+
+    def locate(tick):
+        onset = int(tick / step + 0.5)
+        bar = max(bisect.bisect_right(bar_steps, onset) - 1, 0)
+        return bar, min(max(onset - bar_steps[bar], 0), tokenizer.num_positions - 1)
+
+    events = {}
+    for tempo in midi_obj.tempo_changes:
+        bar, pos = locate(tempo.time)
+        tempo_bin = int(np.argmin(np.abs(np.log(tokenizer.tempi) - np.log(tempo.tempo))))
+        events.setdefault((bar, pos), [None, []])[0] = offsets[TEMPO] + tempo_bin
+    for instrument in midi_obj.instruments:
+        program = 128 if instrument.is_drum else instrument.program
+        for note in instrument.notes:
+            bar, pos = locate(note.start)
+            velocity = min((min(max(note.velocity, 1), 127) - 1) * tokenizer.num_velocities // 126,
+                           tokenizer.num_velocities - 1)
+            duration = min(max(int((note.end - note.start) / step + 0.5), 1), tokenizer.max_duration)
+            events.setdefault((bar, pos), [None, []])[1].append((
+                offsets[PROGRAM] + program, offsets[PITCH] + note.pitch,
+                offsets[VELOCITY] + velocity, offsets[DURATION] + duration - 1))
+
+    tokens = []
+    keys = sorted(events)
+    num_bars = keys[-1][0] + 1 if keys else 1
+    key_idx = 0
+    for bar in range(num_bars):
+        tokens.append(offsets[BAR])
+        if signatures[bar] >= 0:
+            tokens.append(signatures[bar])
+        while key_idx < len(keys) and keys[key_idx][0] == bar:
+            tempo, notes = events[keys[key_idx]]
+            tokens.append(offsets[POSITION] + keys[key_idx][1])
+            if tempo is not None:
+                tokens.append(tempo)
+            for note in sorted(notes):
+                tokens.extend(note)
+            key_idx += 1
+    return np.array(tokens, dtype=np.int32)
+
+
+def main():
+    filename = make_midi(
+        os.path.join(benchmark_dir(), 'tokenize.mid'), num_tracks=8, num_notes=5000)
+    tokenizer = REMITokenizer()
+    midi_list = MidiFile(filename)
+    midi_array = MidiFile(filename, note_array=True)
+
+    # sanity check
+    tokens = tokenizer.encode(midi_array)
+    assert np.array_equal(loop_encode(tokenizer, midi_list), tokens)
+    assert np.array_equal(tokenizer.encode(tokenizer.decode(tokens, midi_array.ticks_per_beat)), tokens)
+
+    def throughput(name, seconds, baseline=None):
+        report(name, seconds, baseline)
+        print('{:<40s} {:10.2f} M tokens/s'.format('', len(tokens) / seconds / 1e6))
+
+    print('{} tokens'.format(len(tokens)))
+    t_loop = timeit(lambda: loop_encode(tokenizer, midi_list), repeat=1)
+    t_encode = timeit(lambda: tokenizer.encode(midi_array))
+    t_decode = timeit(lambda: tokenizer.decode(tokens, midi_array.ticks_per_beat))
+    throughput('per-note loop encode', t_loop)
+    throughput('REMITokenizer.encode', t_encode, t_loop)
+    throughput('REMITokenizer.decode', t_decode)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Bulk edits of notes: per-note Python loops (and `list.remove` for
+invalid notes) vs. the vectorized transforms.
+
+    python benchmarks/bench_transforms.py
+
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from miditoolkit.midi import MidiFile
+from miditoolkit.midi.containers import Note, Instrument
+from utils import make_midi, timeit, report, benchmark_dir
+
+
+def loop_transpose(midi_obj, semitones):
+    for instrument in midi_obj.instruments:
+        if instrument.is_drum:
+            continue
+        for note in instrument.notes:
+            note.pitch = min(max(note.pitch + semitones, 0), 127)
+
+
+def loop_velocity(midi_obj, factor):
+    for instrument in midi_obj.instruments:
+        for note in instrument.notes:
+            note.velocity = min(max(int(note.velocity * factor + 0.5), 1), 127)
+
+
+def loop_stretch(midi_obj, factor):
+    for instrument in midi_obj.instruments:
+        for note in instrument.notes:
+            note.start = int(note.start * factor + 0.5)
+            note.end = int(note.end * factor + 0.5)
+        for event in instrument.control_changes + instrument.pitch_bends:
+            event.time = int(event.time * factor + 0.5)
+    for event in (midi_obj.tempo_changes + midi_obj.time_signature_changes +
+                  midi_obj.key_signature_changes + midi_obj.markers + midi_obj.lyrics):
+        event.time = int(event.time * factor + 0.5)
+
+
+def loop_merge(midi_obj):
+    groups = {}
+    for instrument in midi_obj.instruments:
+        groups.setdefault((instrument.program, instrument.is_drum), []).append(instrument)
+    instruments = []
+    for group in groups.values():
+        merged = group[0]
+        for instrument in group[1:]:
+            merged.notes.extend(instrument.notes)
+            merged.control_changes.extend(instrument.control_changes)
+            merged.pitch_bends.extend(instrument.pitch_bends)
+        merged.notes.sort(key=lambda note: note.start)
+        merged.control_changes.sort(key=lambda cc: cc.time)
+        merged.pitch_bends.sort(key=lambda bend: bend.time)
+        instruments.append(merged)
+    midi_obj.instruments = instruments
+
+
+def remove_by_list(instrument):
+    notes_to_delete = [note for note in instrument.notes if note.end <= note.start]
+    for note in notes_to_delete:
+        instrument.notes.remove(note)
+
+
+def make_invalid_instrument(num_notes, note_array):
+    rng = np.random.RandomState(0)
+    start = rng.randint(0, 100000, num_notes)
+    end = start + rng.randint(-5, 20, num_notes)
+    instrument = Instrument(0)
+    instrument.notes = [Note(64, 60, s, e) for s, e in zip(start.tolist(), end.tolist())]
+    if note_array:
+        instrument.note_array = instrument.note_array
+    return instrument
+
+
+def main():
+    filename = make_midi(
+        os.path.join(benchmark_dir(), 'transforms.mid'), num_tracks=8, num_notes=5000)
+
+    def run(func, repeat=5, **kwargs):
+        midi_objs = [MidiFile(filename, **kwargs) for _ in range(repeat)]
+        return timeit(lambda: func(midi_objs.pop()), repeat=repeat)
+
+    # sanity check
+    expected, actual = MidiFile(filename), MidiFile(filename)
+    loop_transpose(expected, 5)
+    loop_velocity(expected, 0.8)
+    actual.transpose(5)
+    actual.apply_velocity_curve(0.8)
+    assert [i.notes for i in expected.instruments] == [i.notes for i in actual.instruments]
+
+    cases = [
+        ('transpose', lambda m: loop_transpose(m, 5), lambda m: m.transpose(5)),
+        ('velocity scaling', lambda m: loop_velocity(m, 0.8),
+         lambda m: m.apply_velocity_curve(0.8)),
+        ('time stretch', lambda m: loop_stretch(m, 1.1), lambda m: m.stretch_time(1.1)),
+        ('merge instruments', loop_merge, lambda m: m.merge_instruments())]
+    for name, loop, transform in cases:
+        t_loop = run(loop)
+        report('{}, per-note loop'.format(name), t_loop)
+        report('{}, note list'.format(name), run(transform), t_loop)
+        report('{}, note array'.format(name), run(transform, note_array=True), t_loop)
+
+    # invalid notes, with a quadratic baseline
+    expected, actual = make_invalid_instrument(5000, False), make_invalid_instrument(5000, True)
+    remove_by_list(expected)
+    actual.remove_invalid_notes(verbose=False)
+    assert expected.notes == actual.notes
+
+    for num_notes in (1000, 5000):
+        def run_remove(func, note_array):
+            instruments = [make_invalid_instrument(num_notes, note_array) for _ in range(2)]
+            return timeit(lambda: func(instruments.pop()), repeat=2)
+
+        t_list = run_remove(remove_by_list, False)
+        report('remove invalid, list.remove ({})'.format(num_notes), t_list)
+        report('remove invalid, note list ({})'.format(num_notes), run_remove(
+            lambda i: i.remove_invalid_notes(verbose=False), False), t_list)
+        report('remove invalid, note array ({})'.format(num_notes), run_remove(
+            lambda i: i.remove_invalid_notes(verbose=False), True), t_list)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import os
+import time
+import random
+import mido
+
+
+def make_midi(filename, num_tracks=8, num_notes=5000, ticks_per_beat=480, seed=0):
+    """Write a synthetic multi-track midi file for benchmarking.
+
+    Every track holds notes, control changes and pitch bends on its own
+    channel, and the first track carries tempo and time signature changes.
+
+    """
+    rng = random.Random(seed)
+    midi_obj = mido.MidiFile(ticks_per_beat=ticks_per_beat)
+    for track_idx in range(num_tracks):
+        channel = 9 if track_idx == num_tracks - 1 else track_idx % 9
+        events = [(0, mido.MetaMessage('track_name', name='track %d' % track_idx))]
+        events.append((0, mido.Message(
+            'program_change', channel=channel, program=rng.randint(0, 127))))
+        if track_idx == 0:
+            for idx in range(16):
+                events.append((idx * ticks_per_beat * 16, mido.MetaMessage(
+                    'set_tempo', tempo=rng.randint(400000, 700000))))
+            events.append((0, mido.MetaMessage('time_signature', numerator=4, denominator=4)))
+            events.append((0, mido.MetaMessage('key_signature', key='C')))
+            events.append((ticks_per_beat * 64, mido.MetaMessage('marker', text='B')))
+
+        tick = 0
+        for _ in range(num_notes):
+            tick += rng.choice([0, ticks_per_beat // 4, ticks_per_beat // 2])
+            duration = rng.randint(1, ticks_per_beat * 2)
+            pitch = rng.randint(36, 96)
+            events.append((tick, mido.Message(
+                'note_on', channel=channel, note=pitch, velocity=rng.randint(1, 127))))
+            events.append((tick + duration, mido.Message(
+                'note_on', channel=channel, note=pitch, velocity=0)))
+            if rng.random() < 0.1:
+                events.append((tick, mido.Message(
+                    'control_change', channel=channel,
+                    control=rng.randint(0, 127), value=rng.randint(0, 127))))
+            if rng.random() < 0.1:
+                events.append((tick, mido.Message(
+                    'pitchwheel', channel=channel, pitch=rng.randint(-8192, 8191))))
+
+        events.sort(key=lambda x: x[0])
+        track = mido.MidiTrack()
+        last_tick = 0
+        for event_tick, msg in events:
+            track.append(msg.copy(time=event_tick - last_tick))
+            last_tick = event_tick
+        midi_obj.tracks.append(track)
+    midi_obj.save(filename=filename)
+    return filename
+
+
+def timeit(func, repeat=5):
+    """Return the best wall time of `repeat` calls, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name, seconds, baseline=None):
+    line = '{:<40s} {:10.2f} ms'.format(name, seconds * 1000)
+    if baseline is not None:
+        line += '   x{:.2f}'.format(baseline / seconds)
+    print(line)
+
+
+def benchmark_dir():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '_data')
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -1,4 +1,7 @@
 from .midi import *
 from .pianoroll import *
+from .tokenizer import *
+from .augmentation import *
+from .dataset import *
 
 __version__ = '0.0.6'
\ No newline at end of file
@@ -0,0 +1,3 @@
+from .pipeline import *
+
+__all__ = [_ for _ in dir() if not _.startswith('_')]
\ No newline at end of file
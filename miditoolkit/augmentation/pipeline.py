@@ -0,0 +1,326 @@
+"""Many augmented variants of one parsed midi file.
+
+An `Augmenter` parses a file once, and keeps its notes as read-only columns
+(start, end, pitch, velocity and instrument of each note, instruments in
+order) along with its tempo and time signature changes. A `Variant` is a
+chain of transform specs over this base, applied on first use. Transforms
+return new columns only for what they change, and share the others with
+the base or the previous step, so a transposition copies the pitches only,
+and a tempo change no note column at all.
+
+Variants hold no object per note: they are materialized straight to
+pianorolls or tokens, or to a MidiFile with notes as arrays. Control
+changes, pitch bends, key signatures, markers and lyrics are not carried.
+
+"""
+import itertools
+import collections
+import numpy as np
+from ..midi.parser import MidiFile, _select_events_within_range
+from ..midi.containers import Instrument, TempoChange, TimeSignature, make_note_array
+from ..midi import transforms
+from ..pianoroll import parser as pianoroll_parser
+
+
+# columns of a variant, all np.ndarray but the first two
+_State = collections.namedtuple('_State', [
+    'ticks_per_beat', 'max_tick',
+    'start', 'end', 'pitch', 'velocity', 'track',
+    'tempo_times', 'tempi',
+    'signature_times', 'numerators', 'denominators'])
+
+
+class Transpose(object):
+    """Shift pitches by `semitones`, see `transforms.transpose`."""
+
+    def __init__(self, semitones, mode='clip', drums=False):
+        if mode not in transforms.CLIP_MODES:
+            raise ValueError('mode must be one of {}'.format(transforms.CLIP_MODES))
+        self.semitones = semitones
+        self.mode = mode
+        self.drums = drums
+
+    def __call__(self, state, drum_tracks):
+        pitch = state.pitch.astype(np.int64)
+        if self.drums:
+            pitch = pitch + self.semitones
+        else:
+            pitch = pitch + np.where(drum_tracks[state.track], 0, self.semitones)
+        if self.mode == 'drop':
+            keep = (pitch >= 0) & (pitch <= 127)
+            if not keep.all():
+                state = _mask_notes(state, keep)
+                pitch = pitch[keep]
+        return state._replace(pitch=np.clip(pitch, 0, 127))
+
+    def __repr__(self):
+        return 'Transpose(semitones={})'.format(self.semitones)
+
+
+class StretchTime(object):
+    """Stretch in time by `factor`, see `transforms.stretch_time`."""
+
+    def __init__(self, factor, change_tempo=False):
+        if factor <= 0:
+            raise ValueError('factor must be positive')
+        self.factor = factor
+        self.change_tempo = change_tempo
+
+    def __call__(self, state, drum_tracks):
+        if self.change_tempo:
+            return state._replace(tempi=state.tempi / self.factor)
+
+        def map_times(times):
+            return np.floor(times * self.factor + 0.5).astype(np.int64)
+
+        start = map_times(state.start)
+        end = map_times(state.end)
+        tempo_times = map_times(state.tempo_times)
+        signature_times = map_times(state.signature_times)
+        # the last tick stays past every event
+        last = max(
+            end.max(initial=-1), tempo_times.max(initial=-1), signature_times.max(initial=-1),
+            int(map_times(state.max_tick - 1)) if state.max_tick > 0 else -1)
+        return state._replace(
+            max_tick=int(last) + 1, start=start, end=end,
+            tempo_times=tempo_times, signature_times=signature_times)
+
+    def __repr__(self):
+        return 'StretchTime(factor={})'.format(self.factor)
+
+
+class VelocityCurve(object):
+    """Map velocities through a factor, table or function, see
+    `transforms.apply_velocity_curve`."""
+
+    def __init__(self, curve):
+        self.curve = curve
+        self._func = transforms._get_velocity_func(curve)
+
+    def __call__(self, state, drum_tracks):
+        return state._replace(velocity=transforms._map_velocity(state.velocity, self._func))
+
+    def __repr__(self):
+        return 'VelocityCurve(curve={})'.format(self.curve)
+
+
+class Crop(object):
+    """Keep the segment ``[start_tick, end_tick)``, moved to tick 0, see
+    `MidiFile.slice`."""
+
+    def __init__(self, start_tick, end_tick):
+        if end_tick < start_tick:
+            raise ValueError('end_tick must not be before start_tick')
+        self.start_tick = start_tick
+        self.end_tick = end_tick
+
+    def __call__(self, state, drum_tracks):
+        st, ed = self.start_tick, self.end_tick
+
+        # clip the notes to the segment, drop those left empty
+        start = np.maximum(state.start, st)
+        end = np.maximum(np.minimum(state.end, ed), st)
+        keep = end > start
+        state = _mask_notes(state, keep)
+
+        # tempo and time signatures active at st are carried over to it
+        tempo_idx = _select_events_within_range(state.tempo_times, st, ed, front=True)
+        signature_idx = _select_events_within_range(state.signature_times, st, ed, front=True)
+        return state._replace(
+            max_tick=ed - st, start=start[keep] - st, end=end[keep] - st,
+            tempo_times=np.maximum(state.tempo_times[tempo_idx], st) - st,
+            tempi=state.tempi[tempo_idx],
+            signature_times=np.maximum(state.signature_times[signature_idx], st) - st,
+            numerators=state.numerators[signature_idx],
+            denominators=state.denominators[signature_idx])
+
+    def __repr__(self):
+        return 'Crop(start_tick={}, end_tick={})'.format(self.start_tick, self.end_tick)
+
+
+class Augmenter(object):
+    """Derive augmented variants from a midi file parsed once.
+
+    Parameters
+    ----------
+    midi_file : MidiFile, str, path-like, bytes-like or file-like
+        A loaded file, or a file to load (see `MidiFile`). A loaded file is
+        read once, and later edits of it do not reach the variants.
+
+    Attributes
+    ----------
+    instruments : list of Instrument
+        Empty instruments, with the program, drum flag and name of those
+        of the file, in order.
+
+    """
+
+    def __init__(self, midi_file):
+        if not isinstance(midi_file, MidiFile):
+            midi_file = MidiFile(midi_file, note_array=True)
+
+        note_arrays = [instrument.note_array for instrument in midi_file.instruments]
+        notes = np.concatenate(note_arrays) if note_arrays else make_note_array([], [], [], [])
+        tempo_changes = sorted(midi_file.tempo_changes, key=lambda t: t.time)
+        signatures = sorted(midi_file.time_signature_changes, key=lambda ts: ts.time)
+        base = _State(
+            ticks_per_beat=midi_file.ticks_per_beat,
+            max_tick=midi_file.max_tick,
+            start=notes['start'].astype(np.int64),
+            end=notes['end'].astype(np.int64),
+            pitch=notes['pitch'].astype(np.int64),
+            velocity=notes['velocity'].astype(np.int64),
+            track=np.repeat(np.arange(len(note_arrays)), [len(a) for a in note_arrays]),
+            tempo_times=np.array([t.time for t in tempo_changes], dtype=np.int64),
+            tempi=np.array([t.tempo for t in tempo_changes], dtype=np.float64),
+            signature_times=np.array([ts.time for ts in signatures], dtype=np.int64),
+            numerators=np.array([ts.numerator for ts in signatures], dtype=np.int64),
+            denominators=np.array([ts.denominator for ts in signatures], dtype=np.int64))
+        for column in base[2:]:
+            column.flags.writeable = False
+        self._base = base
+
+        self.instruments = [
+            Instrument(instrument.program, instrument.is_drum, instrument.name)
+            for instrument in midi_file.instruments]
+        self._drum_tracks = np.array(
+            [instrument.is_drum for instrument in self.instruments], dtype=bool)
+
+    def variant(self, *transforms):
+        """Get the variant applying `transforms` in order, e.g.
+        ``augmenter.variant(Crop(0, 7680), Transpose(2))``."""
+        variant = Variant(self)
+        for transform in transforms:
+            variant = variant.then(transform)
+        return variant
+
+    def variants(self, *axes):
+        """Iterate over the variants of every combination of transforms.
+
+        Parameters
+        ----------
+        *axes : list
+            One list of transforms per axis, applied in the order of the
+            axes. None stands for no transform.
+
+        Yields
+        ------
+        variant : Variant
+            Variants over the product of the axes, last axis fastest. The
+            steps they share are computed once: put the axes that shrink
+            the notes, e.g. crops, first.
+
+        """
+        prefixes = {(): Variant(self)}
+        for combination in itertools.product(*[range(len(axis)) for axis in axes]):
+            for depth in range(1, len(combination) + 1):
+                key = combination[:depth]
+                if key not in prefixes:
+                    parent = prefixes[key[:-1]]
+                    transform = axes[depth - 1][key[-1]]
+                    prefixes[key] = parent if transform is None else parent.then(transform)
+            # drop the prefixes no longer needed
+            for key in [key for key in prefixes if key and key != combination[:len(key)]]:
+                del prefixes[key]
+            yield prefixes[combination]
+
+    def __repr__(self):
+        return 'Augmenter(num_notes={}, num_instruments={})'.format(
+            len(self._base.start), len(self.instruments))
+
+
+class Variant(object):
+    """A chain of transforms over the base of an `Augmenter`, evaluated on
+    first use and cached. See `Augmenter.variant`."""
+
+    def __init__(self, augmenter, parent=None, transform=None):
+        self.augmenter = augmenter
+        self.parent = parent
+        self.transform = transform
+        self._state = None
+
+    @property
+    def transforms(self):
+        """Transforms applied, in order."""
+        if self.parent is None:
+            return ()
+        return self.parent.transforms + (self.transform,)
+
+    def then(self, transform):
+        """Get the variant applying one more transform after these ones."""
+        return Variant(self.augmenter, parent=self, transform=transform)
+
+    def _get_state(self):
+        if self._state is None:
+            if self.parent is None:
+                self._state = self.augmenter._base
+            else:
+                self._state = self.transform(
+                    self.parent._get_state(), self.augmenter._drum_tracks)
+        return self._state
+
+    @property
+    def max_tick(self):
+        return self._get_state().max_tick
+
+    def get_note_arrays(self):
+        """Get the notes of each instrument, as structured arrays of
+        ``NOTE_DTYPE``."""
+        state = self._get_state()
+        note_array = make_note_array(state.start, state.end, state.pitch, state.velocity)
+        # transforms only drop notes, so the instruments stay in order
+        bounds = np.searchsorted(state.track, np.arange(len(self.augmenter.instruments) + 1))
+        return [note_array[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    def to_midi(self):
+        """Materialize a MidiFile, with notes as arrays, and tempo and time
+        signature changes."""
+        state = self._get_state()
+        midi_obj = MidiFile()
+        midi_obj.ticks_per_beat = state.ticks_per_beat
+        midi_obj.max_tick = state.max_tick
+        midi_obj.tempo_changes = [
+            TempoChange(tempo, time)
+            for tempo, time in zip(state.tempi.tolist(), state.tempo_times.tolist())]
+        midi_obj.time_signature_changes = [
+            TimeSignature(numerator, denominator, time) for numerator, denominator, time in zip(
+                state.numerators.tolist(), state.denominators.tolist(),
+                state.signature_times.tolist())]
+        for template, note_array in zip(self.augmenter.instruments, self.get_note_arrays()):
+            instrument = Instrument(template.program, template.is_drum, template.name)
+            instrument.note_array = note_array
+            midi_obj.instruments.append(instrument)
+        return midi_obj
+
+    def get_pianoroll(self, merge=False, **kwargs):
+        """Render the notes, see `get_pianorolls`.
+
+        Parameters
+        ----------
+        merge : bool
+            Render all instruments on one (time, 128) pianoroll with
+            `get_pianoroll`, instead of one per instrument.
+        **kwargs
+            Passed to the renderer. The resolution is the one of the
+            variant.
+
+        """
+        kwargs.setdefault('ticks_per_beat', self._get_state().ticks_per_beat)
+        if merge:
+            state = self._get_state()
+            note_array = make_note_array(state.start, state.end, state.pitch, state.velocity)
+            return pianoroll_parser.get_pianoroll(note_array, **kwargs)
+        return pianoroll_parser.get_pianorolls(self.get_note_arrays(), **kwargs)
+
+    def encode(self, tokenizer):
+        """Tokenize the variant, e.g. with a `REMITokenizer`."""
+        return tokenizer.encode(self.to_midi())
+
+    def __repr__(self):
+        return 'Variant({})'.format(', '.join(repr(t) for t in self.transforms))
+
+
+def _mask_notes(state, keep):
+    return state._replace(
+        start=state.start[keep], end=state.end[keep], pitch=state.pitch[keep],
+        velocity=state.velocity[keep], track=state.track[keep])
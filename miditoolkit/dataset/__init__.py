@@ -0,0 +1,5 @@
+from .lru import *
+from .buffers import *
+from .datasets import *
+
+__all__ = [_ for _ in dir() if not _.startswith('_')]
\ No newline at end of file
@@ -0,0 +1,121 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+
+class PackedArrays(object):
+    """Arrays of different lengths packed along their first axis into one
+    buffer, e.g. the pianorolls or token arrays of a corpus.
+
+    The buffer can live in shared memory: pickling then only sends its
+    name, and worker processes (e.g. of a data loader) map the same memory
+    instead of receiving a copy. Items are views of the buffer.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Items back to back along the first axis.
+    offsets : np.ndarray
+        Start of each item along the first axis, and the end of the last.
+
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self._shm = None
+        self._owner = False
+
+    @classmethod
+    def pack(cls, arrays, shared=False):
+        """Pack a list of arrays, of the same dtype and trailing shape.
+
+        Parameters
+        ----------
+        arrays : list of np.ndarray
+        shared : bool
+            Allocate the buffer in shared memory. The packed arrays own it:
+            `close` frees it once the workers are done.
+
+        """
+        arrays = [np.asarray(array) for array in arrays]
+        if not arrays:
+            raise ValueError('Nothing to pack')
+        trailing = arrays[0].shape[1:]
+        dtype = np.result_type(*arrays)
+        if any(array.shape[1:] != trailing for array in arrays):
+            raise ValueError('Arrays must share their trailing shape')
+        offsets = np.concatenate([[0], np.cumsum([len(array) for array in arrays])])
+        shape = (int(offsets[-1]),) + trailing
+
+        if shared:
+            num_bytes = max(int(np.prod(shape)) * dtype.itemsize, 1)
+            shm = shared_memory.SharedMemory(create=True, size=num_bytes)
+            data = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        else:
+            shm = None
+            data = np.empty(shape, dtype=dtype)
+        for array, start, end in zip(arrays, offsets[:-1], offsets[1:]):
+            data[start:end] = array
+
+        packed = cls(data, offsets)
+        packed._shm = shm
+        packed._owner = shared
+        return packed
+
+    @property
+    def shared(self):
+        return self._shm is not None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if not -len(self) <= idx < len(self):
+            raise IndexError('index out of range')
+        idx = idx % len(self)
+        return self.data[self.offsets[idx]:self.offsets[idx + 1]]
+
+    def get_lengths(self):
+        """Get the length of every item."""
+        return np.diff(self.offsets)
+
+    def __getstate__(self):
+        if self._shm is None:
+            return {'data': self.data, 'offsets': self.offsets}
+        return {
+            'name': self._shm.name, 'shape': self.data.shape,
+            'dtype': self.data.dtype.str, 'offsets': self.offsets}
+
+    def __setstate__(self, state):
+        self.offsets = state['offsets']
+        self._owner = False
+        if 'data' in state:
+            self.data = state['data']
+            self._shm = None
+            return
+        # processes started by multiprocessing share the resource tracker of
+        # the creator, which frees the memory once, on `close` or at exit
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self.data = np.ndarray(state['shape'], dtype=np.dtype(state['dtype']), buffer=self._shm.buf)
+
+    def close(self):
+        """Release the shared memory, and free it if created here. Items
+        must not be used afterwards."""
+        if self._shm is None:
+            return
+        self.data = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return 'PackedArrays(num_items={}, shape={}, dtype={}, shared={})'.format(
+            len(self), None if self.data is None else self.data.shape,
+            None if self.data is None else self.data.dtype, self.shared)
@@ -0,0 +1,183 @@
+import numpy as np
+from .lru import LRUMidiCache
+from .buffers import PackedArrays
+from ..midi.batch import load_midi_files
+from ..midi.shards import MidiShards
+from ..midi.containers import make_note_array
+from ..pianoroll.parser import get_pianoroll
+
+
+class PianorollTransform(object):
+    """Render all the notes of a MidiFile on one (time, 128) pianoroll, see
+    `get_pianoroll`. Picklable, to run in worker processes.
+
+    Parameters
+    ----------
+    resample_resolution : int
+        Ticks per beat of the pianoroll, the one of the file by default.
+    binary_thres : int
+        Render booleans instead of velocities, see `get_pianoroll`.
+
+    """
+
+    def __init__(self, resample_resolution=None, binary_thres=None):
+        self.resample_resolution = resample_resolution
+        self.binary_thres = binary_thres
+
+    def __call__(self, midi_obj):
+        note_arrays = [instrument.note_array for instrument in midi_obj.instruments]
+        notes = np.concatenate(note_arrays) if note_arrays else make_note_array([], [], [], [])
+        return get_pianoroll(
+            notes,
+            ticks_per_beat=midi_obj.ticks_per_beat,
+            resample_resolution=self.resample_resolution,
+            binary_thres=self.binary_thres)
+
+
+class MidiDataset(object):
+    """Map indices to examples computed from midi files, e.g. pianorolls or
+    token arrays.
+
+    Files are parsed on access through an `LRUMidiCache`, so that epochs
+    after the first one do not parse again within the budget. For a
+    corpus that fits in memory, `precompute` the examples once instead.
+
+    Parameters
+    ----------
+    sources : list of str, or MidiShards
+        Paths of the files, or a store of parsed files (see
+        `write_midi_shards`), read in place instead of cached.
+    transform : callable
+        Maps a MidiFile to an example, e.g. a `PianorollTransform` or the
+        `encode` method of a `REMITokenizer`. By default, examples are the
+        MidiFiles themselves.
+    cache : LRUMidiCache
+        Cache of the parsed files, 1 GiB by default.
+
+    """
+
+    def __init__(self, sources, transform=None, cache=None):
+        self.sources = sources
+        self.transform = transform
+        self.cache = LRUMidiCache() if cache is None else cache
+
+    def __len__(self):
+        return len(self.sources)
+
+    def get_midi(self, idx):
+        """Get the parsed file of an index."""
+        if isinstance(self.sources, MidiShards):
+            return self.sources[idx]
+        return self.cache[self.sources[idx]]
+
+    def __getitem__(self, idx):
+        midi_obj = self.get_midi(idx)
+        return midi_obj if self.transform is None else self.transform(midi_obj)
+
+    def precompute(self, shared=False, num_workers=0):
+        """Compute all the examples into `PackedArrays`.
+
+        Parameters
+        ----------
+        shared : bool
+            Pack them in shared memory, for worker processes.
+        num_workers : int
+            Parse and transform the files of a list of paths across a pool
+            of processes (see `load_midi_files`), 0 for the current process.
+            The transform must then be picklable.
+
+        """
+        if self.transform is None:
+            raise ValueError('Examples need a transform to be packed')
+        if num_workers and not isinstance(self.sources, MidiShards):
+            examples = []
+            for result in load_midi_files(
+                    self.sources, func=self.transform, num_workers=num_workers):
+                if result.error is not None:
+                    raise ValueError('Failed to load {}:\n{}'.format(result.filename, result.error))
+                examples.append(result.value)
+        else:
+            examples = [self.transform(self.get_midi(idx)) for idx in range(len(self))]
+        return PackedArrays.pack(examples, shared=shared)
+
+    def __repr__(self):
+        return 'MidiDataset(num_files={})'.format(len(self))
+
+
+class RandomCropDataset(object):
+    """Random crops of a fixed length along the first axis of the examples
+    of a dataset, e.g. time steps or tokens.
+
+    Crops are views when the example is long enough, or copies padded at
+    the end. The crop of an index only depends on `seed`, the epoch and the
+    index, so that worker processes need no shared random state.
+
+    Parameters
+    ----------
+    dataset : PackedArrays, MidiDataset or sequence of np.ndarray
+    length : int
+        Length of the crops.
+    seed : int
+    pad_value : scalar
+        Value padding the examples shorter than `length`.
+
+    """
+
+    def __init__(self, dataset, length, seed=0, pad_value=0):
+        if length <= 0:
+            raise ValueError('length must be positive')
+        self.dataset = dataset
+        self.length = length
+        self.seed = seed
+        self.pad_value = pad_value
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        """Draw new crops, e.g. at the start of each epoch."""
+        self.epoch = epoch
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx):
+        example = self.dataset[idx]
+        excess = len(example) - self.length
+        if excess >= 0:
+            rng = np.random.default_rng((self.seed, self.epoch, idx % len(self)))
+            start = int(rng.integers(0, excess + 1))
+            return example[start:start + self.length]
+        padded = np.full((self.length,) + example.shape[1:], self.pad_value, dtype=example.dtype)
+        padded[:len(example)] = example
+        return padded
+
+
+class TorchDataset(object):
+    """Expose a dataset of np.ndarray examples as a map-style dataset for
+    ``torch.utils.data.DataLoader``, converting them with
+    ``torch.from_numpy``, without copy unless they are read-only.
+
+    Requires PyTorch, imported on first use only, so that importing
+    miditoolkit does not.
+
+    """
+
+    def __init__(self, dataset):
+        _import_torch()
+        self.dataset = dataset
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx):
+        example = self.dataset[idx]
+        if not example.flags.writeable:
+            example = example.copy()
+        return _import_torch().from_numpy(example)
+
+
+def _import_torch():
+    try:
+        import torch
+    except ImportError:
+        raise ImportError('TorchDataset requires PyTorch')
+    return torch
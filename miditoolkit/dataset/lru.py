@@ -0,0 +1,84 @@
+import collections
+from ..midi.parser import MidiFile
+
+
+# rough size of an event object (slots, ints), for the budget
+_EVENT_NBYTES = 100
+
+
+def get_midi_nbytes(midi_obj):
+    """Estimate the memory held by a MidiFile, in bytes: the size of its note
+    arrays, and a fixed size per event object."""
+    num_bytes = 0
+    num_events = (
+        len(midi_obj.tempo_changes) + len(midi_obj.time_signature_changes) +
+        len(midi_obj.key_signature_changes) + len(midi_obj.markers) + len(midi_obj.lyrics))
+    for instrument in midi_obj.instruments:
+        num_events += len(instrument.control_changes) + len(instrument.pitch_bends)
+        if instrument._notes is None:
+            num_bytes += instrument._note_array.nbytes
+        else:
+            num_events += len(instrument._notes)
+    return num_bytes + num_events * _EVENT_NBYTES
+
+
+class LRUMidiCache(object):
+    """Parsed midi files, the least recently used evicted past a memory
+    budget.
+
+    Each process holds its own cache: with a pool of workers, the budget
+    applies per worker.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Memory budget, as estimated by `get_midi_nbytes`. The file last
+        loaded is kept even if it alone exceeds the budget.
+    load : callable
+        Loads a file from its key, by default ``MidiFile(key,
+        note_array=True)``.
+
+    """
+
+    def __init__(self, max_bytes=1 << 30, load=None):
+        self.max_bytes = max_bytes
+        self.load = _load_midi if load is None else load
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __getitem__(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        midi_obj = self.load(key)
+        num_bytes = get_midi_nbytes(midi_obj)
+        self._entries[key] = (midi_obj, num_bytes)
+        self.num_bytes += num_bytes
+        while self.num_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self.num_bytes -= evicted_bytes
+        return midi_obj
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.num_bytes = 0
+
+    def __repr__(self):
+        return 'LRUMidiCache(num_files={}, num_bytes={}, max_bytes={})'.format(
+            len(self), self.num_bytes, self.max_bytes)
+
+
+def _load_midi(key):
+    return MidiFile(key, note_array=True)
@@ -1,4 +1,9 @@
 from .containers import *
+from .intervals import *
 from .parser import *
+from .batch import *
+from .lazy import *
+from .scan import *
+from .shards import *
 
 __all__ = [_ for _ in dir() if not _.startswith('_')]
\ No newline at end of file
@@ -0,0 +1,83 @@
+import glob
+import functools
+import traceback
+import collections
+import multiprocessing
+from .parser import MidiFile
+
+
+# outcome of loading one file: error is None on success, or the traceback
+LoadResult = collections.namedtuple('LoadResult', ['filename', 'value', 'error'])
+
+
+def load_midi_files(
+        filenames,
+        func=None,
+        num_workers=None,
+        chunksize=16,
+        note_array=True,
+        native=True):
+    """Load many midi files across a pool of processes.
+
+    Parameters
+    ----------
+    filenames : list of str, or str
+        Paths, or a glob pattern (``**`` matches subdirectories).
+    func : callable
+        Applied to each MidiFile within the worker, e.g. `get_pianorolls`
+        or a function computing statistics, so only its result is sent back.
+        It must be picklable, i.e. defined at module level.
+    num_workers : int
+        Number of processes, the number of CPUs by default. With 0, files
+        are loaded in the current process.
+    chunksize : int
+        Number of files handed to a worker at a time.
+    note_array : bool
+        Load the notes as arrays, so that a MidiFile is sent back as a few
+        contiguous buffers instead of one object per note.
+    native : bool
+        Use the native decoder, see `MidiFile`.
+
+    Returns
+    -------
+    results : list of LoadResult
+        One (filename, value, error) per file, in order. Corrupt files do
+        not stop the batch: their value is None and error holds the
+        traceback.
+
+    """
+    return list(iter_midi_files(
+        filenames, func=func, num_workers=num_workers, chunksize=chunksize,
+        note_array=note_array, native=native))
+
+
+def iter_midi_files(
+        filenames,
+        func=None,
+        num_workers=None,
+        chunksize=16,
+        note_array=True,
+        native=True):
+    """Same as `load_midi_files`, yielding the results in order as they come."""
+    if isinstance(filenames, str):
+        filenames = sorted(glob.glob(filenames, recursive=True))
+    load = functools.partial(_load, func=func, note_array=note_array, native=native)
+
+    if num_workers == 0:
+        for filename in filenames:
+            yield load(filename)
+        return
+
+    with multiprocessing.Pool(num_workers) as pool:
+        for result in pool.imap(load, filenames, chunksize=chunksize):
+            yield result
+
+
+def _load(filename, func=None, note_array=True, native=True):
+    try:
+        value = MidiFile(filename, native=native, note_array=note_array)
+        if func is not None:
+            value = func(value)
+    except Exception:
+        return LoadResult(filename, None, traceback.format_exc())
+    return LoadResult(filename, value, None)
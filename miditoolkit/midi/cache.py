@@ -0,0 +1,139 @@
+"""Binary cache of parsed midi files.
+
+Layout, all little-endian::
+
+    magic     4 bytes, b'MTKC'
+    version   uint32
+    size      uint32, of the header
+    header    utf-8 JSON: metadata, meta events, and for each instrument the
+              offset and length of its arrays in the data section
+    padding   up to a multiple of 8 bytes
+    data      the arrays of all instruments, back to back, each 8-byte
+              aligned: notes as ``NOTE_DTYPE`` records, control changes as
+              int32 (time, number, value) rows, pitch bends as int32
+              (time, pitch) rows
+
+Arrays are read with ``np.frombuffer`` straight from the loaded bytes or a
+memory map, without copy.
+
+"""
+import json
+import struct
+import numpy as np
+from .containers import (
+    NOTE_DTYPE, KeySignature, TimeSignature, Lyric, PitchBend, ControlChange,
+    Instrument, TempoChange, Marker)
+
+
+MAGIC = b'MTKC'
+VERSION = 1
+
+_PREFIX = struct.Struct('<4sII')
+_ALIGNMENT = 8
+_NOTE_DTYPE = NOTE_DTYPE.newbyteorder('<')
+_INT_DTYPE = np.dtype('<i4')
+
+
+def encode_cache(midi_obj):
+    """Encode a MidiFile to the bytes of a cache."""
+    chunks = []
+    offset = 0
+
+    def add_array(array):
+        nonlocal offset
+        data = array.tobytes()
+        chunks.append(data + b'\0' * (-len(data) % _ALIGNMENT))
+        span = [offset, len(array)]
+        offset += len(chunks[-1])
+        return span
+
+    instruments = []
+    for instrument in midi_obj.instruments:
+        control_changes = np.array(
+            [(cc.time, cc.number, cc.value) for cc in instrument.control_changes],
+            dtype=_INT_DTYPE).reshape(-1, 3)
+        pitch_bends = np.array(
+            [(bend.time, bend.pitch) for bend in instrument.pitch_bends],
+            dtype=_INT_DTYPE).reshape(-1, 2)
+        instruments.append({
+            'program': int(instrument.program),
+            'is_drum': bool(instrument.is_drum),
+            'name': instrument.name,
+            'notes': add_array(instrument.note_array.astype(_NOTE_DTYPE)),
+            'control_changes': add_array(control_changes),
+            'pitch_bends': add_array(pitch_bends)})
+
+    header = json.dumps({
+        'ticks_per_beat': int(midi_obj.ticks_per_beat),
+        'max_tick': int(midi_obj.max_tick),
+        'tempo_changes': [
+            [float(t.tempo), int(t.time)] for t in midi_obj.tempo_changes],
+        'time_signature_changes': [
+            [int(ts.numerator), int(ts.denominator), int(ts.time)]
+            for ts in midi_obj.time_signature_changes],
+        'key_signature_changes': [
+            [ks.key_name, int(ks.time)] for ks in midi_obj.key_signature_changes],
+        'markers': [[m.text, int(m.time)] for m in midi_obj.markers],
+        'lyrics': [[l.text, int(l.time)] for l in midi_obj.lyrics],
+        'instruments': instruments}).encode('utf-8')
+
+    prefix = _PREFIX.pack(MAGIC, VERSION, len(header)) + header
+    prefix += b'\0' * (-len(prefix) % _ALIGNMENT)
+    return prefix + b''.join(chunks)
+
+
+def decode_cache(data, midi_obj):
+    """Fill a MidiFile from the bytes of a cache.
+
+    Parameters
+    ----------
+    data : bytes-like
+        The cache, e.g. bytes or a memory map. Note arrays are read-only
+        views of it.
+    midi_obj : MidiFile
+        Empty file to fill.
+
+    """
+    if len(data) < _PREFIX.size:
+        raise ValueError('Truncated cache')
+    magic, version, size = _PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a miditoolkit cache')
+    if version != VERSION:
+        raise ValueError('Unsupported cache version {}'.format(version))
+    header_end = _PREFIX.size + size
+    if len(data) < header_end:
+        raise ValueError('Truncated cache')
+    header = json.loads(bytes(data[_PREFIX.size:header_end]).decode('utf-8'))
+    data_offset = header_end + (-header_end % _ALIGNMENT)
+
+    def get_array(span, dtype, shape=()):
+        offset, count = span
+        count *= int(np.prod(shape))
+        return np.frombuffer(
+            data, dtype=dtype, count=count, offset=data_offset + offset).reshape((-1,) + shape)
+
+    midi_obj.ticks_per_beat = header['ticks_per_beat']
+    midi_obj.max_tick = header['max_tick']
+    midi_obj.tempo_changes = [
+        TempoChange(tempo, time) for tempo, time in header['tempo_changes']]
+    midi_obj.time_signature_changes = [
+        TimeSignature(numerator, denominator, time)
+        for numerator, denominator, time in header['time_signature_changes']]
+    midi_obj.key_signature_changes = [
+        KeySignature(key_name, time) for key_name, time in header['key_signature_changes']]
+    midi_obj.markers = [Marker(text, time) for text, time in header['markers']]
+    midi_obj.lyrics = [Lyric(text, time) for text, time in header['lyrics']]
+
+    midi_obj.instruments = []
+    for entry in header['instruments']:
+        instrument = Instrument(entry['program'], entry['is_drum'], entry['name'])
+        instrument.note_array = get_array(entry['notes'], _NOTE_DTYPE)
+        instrument.control_changes = [
+            ControlChange(number, value, time)
+            for time, number, value in get_array(entry['control_changes'], _INT_DTYPE, (3,)).tolist()]
+        instrument.pitch_bends = [
+            PitchBend(pitch, time)
+            for time, pitch in get_array(entry['pitch_bends'], _INT_DTYPE, (2,)).tolist()]
+        midi_obj.instruments.append(instrument)
+    return midi_obj
@@ -1,7 +1,49 @@
 import re
+import numpy as np
+from .intervals import NoteIntervalIndex
 
 
-class Note(object):
+# columnar layout of notes, see `Instrument.note_array`
+NOTE_DTYPE = np.dtype([
+    ('start', np.int32),
+    ('end', np.int32),
+    ('pitch', np.int16),
+    ('velocity', np.int16)])
+
+
+class _Event(object):
+    """Base of the event containers.
+
+    Attributes live in ``__slots__`` instead of a per-instance ``__dict__``,
+    and events compare and hash by value.
+
+    """
+    __slots__ = ()
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._values() == other._values()
+
+    def __hash__(self):
+        return hash(self._values())
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        # a dict from pickles of earlier versions, whose events had a
+        # `__dict__`, or a ``(dict, slots)`` pair from the default protocol
+        if isinstance(state, tuple):
+            state = dict(state[0] or {}, **(state[1] or {}))
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class Note(_Event):
     """A note event.
 
     Parameters
@@ -17,6 +59,8 @@ class Note(object):
 
     """
 
+    __slots__ = ('velocity', 'pitch', 'start', 'end')
+
     def __init__(self, velocity, pitch, start, end):
         self.velocity = velocity
         self.pitch = pitch
@@ -32,7 +76,7 @@ class Note(object):
             self.start, self.end, self.pitch, self.velocity)
 
 
-class PitchBend(object):
+class PitchBend(_Event):
     """A pitch bend event.
 
     Parameters
@@ -44,6 +88,8 @@ class PitchBend(object):
 
     """
 
+    __slots__ = ('pitch', 'time')
+
     def __init__(self, pitch, time):
         self.pitch = pitch
         self.time = time
@@ -52,7 +98,7 @@ class PitchBend(object):
         return 'PitchBend(pitch={:d}, time={:d})'.format(self.pitch, self.time)
 
 
-class ControlChange(object):
+class ControlChange(_Event):
     """A control change event.
 
     Parameters
@@ -66,6 +112,8 @@ class ControlChange(object):
 
     """
 
+    __slots__ = ('number', 'value', 'time')
+
     def __init__(self, number, value, time):
         self.number = number
         self.value = value
@@ -76,7 +124,7 @@ class ControlChange(object):
                 'time={:d})'.format(self.number, self.value, self.time))
 
 
-class TimeSignature(object):
+class TimeSignature(_Event):
     """Container for a Time Signature event, which contains the time signature
     numerator, denominator and the event time in ticks.
 
@@ -99,6 +147,8 @@ class TimeSignature(object):
 
     """
 
+    __slots__ = ('numerator', 'denominator', 'time')
+
     def __init__(self, numerator, denominator, time):
         if not (isinstance(numerator, int) and numerator > 0):
             raise ValueError(
@@ -125,7 +175,7 @@ class TimeSignature(object):
             self.numerator, self.denominator, self.time)
 
 
-class KeySignature(object):
+class KeySignature(_Event):
     """Contains the key signature and the event time in ticks.
     Only supports major and minor keys.
 
@@ -146,6 +196,8 @@ class KeySignature(object):
     C# minor at 3.14 ticks
     """
 
+    __slots__ = ('key_name', 'key_number', 'time')
+
     def __init__(self, key_name, time):
         if not isinstance(key_name, str):
             raise ValueError(
@@ -170,7 +222,9 @@ class KeySignature(object):
     def __str__(self):
         return '{} [{}] at {:d} ticks'.format(self.key_name, self.key_number, self.time)
 
-class Marker(object):
+class Marker(_Event):
+    __slots__ = ('text', 'time')
+
     def __init__(self, text, time):
         self.text = text
         self.time = time
@@ -182,7 +236,7 @@ class Marker(object):
     def __str__(self):
         return '"{}" at {:d} ticks'.format(self.text, self.time)
 
-class Lyric(object):
+class Lyric(_Event):
     """TContains the key signature and the event time in ticks.
     Only supports major and minor keys.
 
@@ -194,6 +248,8 @@ class Lyric(object):
     time : float
         The time in ticks of the lyric.
     """
+    __slots__ = ('text', 'time')
+
     def __init__(self, text, time):
         self.text = text
         self.time = time
@@ -206,7 +262,7 @@ class Lyric(object):
         return '"{}" at {:d} ticks'.format(self.text, self.time)
 
 
-class TempoChange(object):
+class TempoChange(_Event):
     """Container for a Tempo event, which contains the tempo in BPM and the event time in ticks.
 
     Attributes
@@ -228,6 +284,8 @@ class TempoChange(object):
 
     """
 
+    __slots__ = ('tempo', 'time')
+
     def __init__(self, tempo, time):
         self.tempo = tempo
         self.time = time
@@ -262,6 +320,8 @@ class Instrument(object):
         Name of the instrument.
     notes : list
         List of :class:`pretty_midi.Note` objects.
+    note_array : np.ndarray
+        The same notes, as a structured array of ``NOTE_DTYPE``.
     pitch_bends : list
         List of of :class:`pretty_midi.PitchBend` objects.
     control_changes : list
@@ -276,19 +336,98 @@ class Instrument(object):
         self.program = program
         self.is_drum = is_drum
         self.name = name
-        self.notes = []
+        self._notes = []
+        self._note_array = None
+        self._interval_index = None
+        self._interval_index_key = None
         self.pitch_bends = []
         self.control_changes = []
 
+    def __setstate__(self, state):
+        # pickles of earlier versions hold the list of notes as `notes`
+        state = dict(state)
+        if 'notes' in state:
+            state['_notes'] = state.pop('notes')
+            state.setdefault('_note_array', None)
+        state.setdefault('_interval_index', None)
+        # the cache key holds an id, stale in a new process
+        state['_interval_index_key'] = None
+        self.__dict__.update(state)
+
+    @property
+    def notes(self):
+        """List of :class:`Note` objects.
+
+        If the notes are held as an array, the list is built on first access
+        and becomes the storage from then on.
+
+        """
+        if self._notes is None:
+            self._notes = array_to_notes(self._note_array)
+            self._note_array = None
+        return self._notes
+
+    @notes.setter
+    def notes(self, notes):
+        self._notes = notes
+        self._note_array = None
+        self._interval_index_key = None
+
+    @property
+    def note_array(self):
+        """Notes as a structured array of ``NOTE_DTYPE``, with fields
+        ``start``, ``end``, ``pitch`` and ``velocity``.
+
+        If the notes are held as an array, it is returned as is: its fields
+        are views, and in-place edits modify the instrument. Otherwise the
+        array is a copy of the list of notes.
+
+        """
+        if self._note_array is None:
+            return notes_to_array(self._notes)
+        return self._note_array
+
+    @note_array.setter
+    def note_array(self, note_array):
+        self._note_array = np.asarray(note_array, dtype=NOTE_DTYPE)
+        self._notes = None
+        self._interval_index_key = None
+
+    def get_interval_index(self):
+        """Get a :class:`NoteIntervalIndex` of the notes, for time-range and
+        polyphony queries. Query results index `notes` (or `note_array`).
+
+        The index is built on first call and cached until the notes are
+        replaced, added or removed. Edits of the times of existing notes in
+        place are not detected: assign the notes back to rebuild it.
+
+        """
+        storage = self._notes if self._notes is not None else self._note_array
+        key = (id(storage), len(storage))
+        if self._interval_index_key != key:
+            note_array = self.note_array
+            self._interval_index = NoteIntervalIndex(note_array['start'], note_array['end'])
+            self._interval_index_key = key
+        return self._interval_index
+
+    def get_num_notes(self):
+        """Get the number of notes, without building the list of notes."""
+        if self._notes is None:
+            return len(self._note_array)
+        return len(self._notes)
+
     def remove_invalid_notes(self, verbose=True):
         """Removes any notes whose end time is before or at their start time.
 
+        With `verbose`, the invalid notes are only printed, and kept.
+
         """
-        # Crete a list of all invalid notes
-        notes_to_delete = []
-        for note in self.notes:
-            if note.end <= note.start:
-                notes_to_delete.append(note)
+        # Find the invalid notes, in a single pass
+        if self._notes is None:
+            invalid = self._note_array['end'] <= self._note_array['start']
+            notes_to_delete = array_to_notes(self._note_array[invalid]) if verbose else None
+        else:
+            notes_to_delete = [note for note in self._notes if note.end <= note.start]
         if verbose:
             if len(notes_to_delete):
                 print('\nInvalid notes:')
@@ -297,9 +436,13 @@ class Instrument(object):
                 print('no invalid notes found')
             return True
 
-        # Remove the notes found
-        for note in notes_to_delete:
-            self.notes.remove(note)
+        # Remove the notes found, keeping the order of the others
+        if self._notes is None:
+            if invalid.any():
+                self.note_array = self._note_array[~invalid]
+        elif notes_to_delete:
+            self._notes[:] = [note for note in self._notes if note.end > note.start]
+            self._interval_index_key = None
         return False
 
     def __repr__(self):
@@ -307,6 +450,36 @@ class Instrument(object):
             self.program, self.is_drum, self.name.replace('"', r'\"'))
 
 
+def make_note_array(start, end, pitch, velocity):
+    """Build a structured array of ``NOTE_DTYPE`` from its columns."""
+    note_array = np.empty(len(start), dtype=NOTE_DTYPE)
+    note_array['start'] = start
+    note_array['end'] = end
+    note_array['pitch'] = pitch
+    note_array['velocity'] = velocity
+    return note_array
+
+
+def notes_to_array(notes):
+    """Convert a list of :class:`Note` objects to a structured array of
+    ``NOTE_DTYPE``.
+
+    """
+    return np.array(
+        [(note.start, note.end, note.pitch, note.velocity) for note in notes],
+        dtype=NOTE_DTYPE)
+
+
+def array_to_notes(note_array):
+    """Convert a structured array of ``NOTE_DTYPE`` to a list of
+    :class:`Note` objects.
+
+    """
+    return [
+        Note(velocity, pitch, start, end)
+        for start, end, pitch, velocity in note_array.tolist()]
+
+
 def _key_name_to_key_number(key_string):
     # Create lists of possible mode names (major or minor)
     major_strs = ['M', 'Maj', 'Major', 'maj', 'major']
@@ -0,0 +1,134 @@
+import numpy as np
+
+
+class NoteIntervalIndex(object):
+    """Index of the time intervals ``[start, end)`` of notes, for vectorized
+    time-range and polyphony queries.
+
+    Notes are grouped by duration into powers of two, and sorted by start
+    within each group: the notes of a group overlapping a range can only
+    start within twice their duration before it, a binary search away, so a
+    query costs O(log n) plus the notes found, in practice. Counts only
+    need all the starts and all the ends, sorted.
+
+    Notes with ``end <= start`` never sound and are left out. Queries
+    return indices into the notes the index was built from.
+
+    Parameters
+    ----------
+    start, end : array_like
+        Note on and off times of the notes, in ticks.
+
+    """
+
+    def __init__(self, start, end):
+        start = np.asarray(start, dtype=np.int64)
+        end = np.asarray(end, dtype=np.int64)
+        if start.shape != end.shape or start.ndim != 1:
+            raise ValueError('start and end must be 1-d arrays of the same length')
+        self.num_notes = len(start)
+
+        valid = np.nonzero(end > start)[0]
+        self._sorted_starts = np.sort(start[valid])
+        self._sorted_ends = np.sort(end[valid])
+
+        # (longest duration bound, starts, ends, note indices) per group
+        self._groups = []
+        level = np.frexp(end[valid] - start[valid])[1]
+        for value in np.unique(level).tolist():
+            idx = valid[level == value]
+            idx = idx[np.argsort(start[idx], kind='stable')]
+            self._groups.append((1 << value, start[idx], end[idx], idx))
+
+    def overlapping(self, start_tick, end_tick):
+        """Get the notes overlapping ``[start_tick, end_tick)``.
+
+        Parameters
+        ----------
+        start_tick, end_tick : int or array_like
+            Bounds of one or many ranges.
+
+        Returns
+        -------
+        note_idx : np.ndarray
+            For a single range, the sorted indices of the notes.
+        (range_idx, note_idx) : tuple of np.ndarray
+            For many ranges, one pair per note and range it overlaps,
+            sorted by range then note.
+
+        """
+        if np.ndim(start_tick) == 0 and np.ndim(end_tick) == 0:
+            return self._query_one(int(start_tick), int(end_tick))
+        start_tick, end_tick = np.broadcast_arrays(
+            np.asarray(start_tick, dtype=np.int64), np.asarray(end_tick, dtype=np.int64))
+        return self._query(start_tick.ravel(), end_tick.ravel())
+
+    def active_at(self, ticks):
+        """Get the notes sounding at the given ticks, i.e. with
+        ``start <= tick < end``.
+
+        Returns
+        -------
+        Same as `overlapping`, for the ranges ``[tick, tick + 1)``.
+
+        """
+        ticks = np.asarray(ticks, dtype=np.int64)
+        return self.overlapping(ticks, ticks + 1)
+
+    def get_polyphony(self, ticks):
+        """Get the number of notes sounding at the given ticks."""
+        ticks = np.asarray(ticks, dtype=np.int64)
+        return (np.searchsorted(self._sorted_starts, ticks, side='right') -
+                np.searchsorted(self._sorted_ends, ticks, side='right'))
+
+    def get_polyphony_curve(self):
+        """Get the number of notes sounding over time, as a step function.
+
+        Returns
+        -------
+        ticks : np.ndarray
+            Sorted ticks at which the polyphony changes.
+        polyphony : np.ndarray
+            Number of notes sounding from each tick to the next.
+
+        """
+        ticks = np.union1d(self._sorted_starts, self._sorted_ends)
+        return ticks, self.get_polyphony(ticks)
+
+    def _query_one(self, start_tick, end_tick):
+        # a single range, with scalar bounds: two binary searches per group
+        if end_tick <= start_tick:
+            return np.zeros(0, dtype=np.int64)
+        note_idx = []
+        for bound, starts, ends, idx in self._groups:
+            lo = starts.searchsorted(start_tick - bound, side='right')
+            hi = starts.searchsorted(end_tick, side='left')
+            if hi > lo:
+                note_idx.append(idx[lo:hi][ends[lo:hi] > start_tick])
+        if not note_idx:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(note_idx))
+
+    def _query(self, start_tick, end_tick):
+        range_idx = []
+        note_idx = []
+        for bound, starts, ends, idx in self._groups:
+            # candidates start within the range, or less than `bound` before
+            lo = np.searchsorted(starts, start_tick - bound, side='right')
+            hi = np.searchsorted(starts, end_tick, side='left')
+            counts = np.where(end_tick > start_tick, np.maximum(hi - lo, 0), 0)
+            query = np.repeat(np.arange(len(start_tick)), counts)
+            pos = np.arange(counts.sum()) + np.repeat(lo - (np.cumsum(counts) - counts), counts)
+            found = ends[pos] > start_tick[query]
+            range_idx.append(query[found])
+            note_idx.append(idx[pos[found]])
+
+        if not range_idx:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        range_idx = np.concatenate(range_idx)
+        note_idx = np.concatenate(note_idx)
+        order = np.lexsort((note_idx, range_idx))
+        return range_idx[order], note_idx[order]
+
+    def __repr__(self):
+        return 'NoteIntervalIndex(num_notes={})'.format(self.num_notes)
@@ -0,0 +1,212 @@
+import io
+import os
+import mmap
+import mido
+from . import smf
+from .parser import MidiFile, _MidiLoader, _load_mido_tracks, _read_midi_data
+
+
+class LazyMidiFile(object):
+    """A midi file decoded on demand.
+
+    The file is memory-mapped and only its header and the offsets of its
+    track chunks are read up front. The meta events (tempo, time and key
+    signatures, markers, lyrics) are scanned from all tracks on first
+    access, skipping over the channel events, and the instruments of a
+    track are decoded on first access to that track. Everything decoded is
+    cached.
+
+    Instruments come out the same as with `MidiFile`, in the same order:
+    the instruments of a track only depend on the events of that track.
+    Files the native decoder does not cover are fully loaded with mido on
+    first access instead.
+
+    Parameters
+    ----------
+    midi_file : str, path-like, bytes-like or file-like
+        Path to the file, which is memory-mapped, or its content.
+    note_array : bool
+        Load the notes of the instruments as arrays, see `MidiFile`.
+
+    """
+
+    def __init__(self, midi_file, note_array=False):
+        self.note_array = note_array
+        self._file = None
+        if isinstance(midi_file, os.PathLike):
+            midi_file = os.fspath(midi_file)
+        if isinstance(midi_file, str):
+            self._file = open(midi_file, 'rb')
+            try:
+                self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file, cannot be mapped
+                self._data = b''
+        else:
+            self._data = _read_midi_data(midi_file)
+
+        # meta loader, and instruments of each decoded track
+        self._meta = None
+        self._track_instruments = {}
+
+        try:
+            _, num_tracks, self.ticks_per_beat, offset = smf.read_header(self._data)
+            self.track_spans = smf.index_tracks(self._data, offset, num_tracks)
+        except (ValueError, IndexError):
+            self._load_mido()
+
+    def _get_data(self):
+        if self._data is None:
+            raise ValueError('I/O operation on closed file')
+        return self._data
+
+    @property
+    def num_tracks(self):
+        return len(self.track_spans)
+
+    # -- meta events -- #
+    def _get_meta(self):
+        if self._meta is None:
+            loader = _MidiLoader(self.note_array)
+            try:
+                for track_idx, (start, end) in enumerate(self.track_spans):
+                    loader.start_track(track_idx)
+                    loader.end_track(smf.scan_track(self._get_data(), start, end, loader))
+            except (ValueError, IndexError):
+                self._load_mido()
+            else:
+                _sort_meta_events(loader)
+                self._meta = loader
+        return self._meta
+
+    @property
+    def tempo_changes(self):
+        return self._get_meta().tempo_changes
+
+    @property
+    def time_signature_changes(self):
+        return self._get_meta().time_signature_changes
+
+    @property
+    def key_signature_changes(self):
+        return self._get_meta().key_signature_changes
+
+    @property
+    def markers(self):
+        return self._get_meta().markers
+
+    @property
+    def lyrics(self):
+        return self._get_meta().lyrics
+
+    @property
+    def max_tick(self):
+        return self._get_meta().max_tick + 1
+
+    # -- instruments -- #
+    def get_track_instruments(self, track_idx):
+        """Get the instruments of one track, decoding it if needed.
+
+        Parameters
+        ----------
+        track_idx : int
+            Index of the track chunk in the file.
+
+        Returns
+        -------
+        instruments : list of Instrument
+
+        """
+        if track_idx not in self._track_instruments:
+            if not 0 <= track_idx < self.num_tracks:
+                raise IndexError('track index out of range')
+            start, end = self.track_spans[track_idx]
+            loader = _MidiLoader(self.note_array)
+            loader.start_track(track_idx)
+            try:
+                smf.decode_track(self._get_data(), start, end, loader)
+            except (ValueError, IndexError):
+                self._load_mido()
+            else:
+                self._track_instruments[track_idx] = loader.get_instruments()
+        return self._track_instruments[track_idx]
+
+    def get_instrument(self, instrument_idx):
+        """Get one instrument, as indexed in `MidiFile.instruments`,
+        decoding the tracks up to the one holding it only.
+
+        """
+        if instrument_idx < 0:
+            return self.instruments[instrument_idx]
+        for track_idx in range(self.num_tracks):
+            instruments = self.get_track_instruments(track_idx)
+            if instrument_idx < len(instruments):
+                return instruments[instrument_idx]
+            instrument_idx -= len(instruments)
+        raise IndexError('instrument index out of range')
+
+    @property
+    def instruments(self):
+        instruments = []
+        for track_idx in range(self.num_tracks):
+            instruments.extend(self.get_track_instruments(track_idx))
+        return instruments
+
+    def to_midi_file(self):
+        """Decode everything into a `MidiFile`, sharing the containers
+        decoded so far."""
+        midi_obj = MidiFile()
+        midi_obj.ticks_per_beat = self.ticks_per_beat
+        midi_obj.max_tick = self.max_tick
+        midi_obj.tempo_changes = self.tempo_changes
+        midi_obj.time_signature_changes = self.time_signature_changes
+        midi_obj.key_signature_changes = self.key_signature_changes
+        midi_obj.markers = self.markers
+        midi_obj.lyrics = self.lyrics
+        midi_obj.instruments = self.instruments
+        return midi_obj
+
+    def _load_mido(self):
+        """Load everything at once with mido, as `MidiFile` falls back to."""
+        mido_obj = mido.MidiFile(file=io.BytesIO(bytes(self._get_data())))
+        loader = _MidiLoader(self.note_array)
+        _load_mido_tracks(mido_obj, loader)
+        _sort_meta_events(loader)
+        loader.get_instruments()
+
+        self.ticks_per_beat = mido_obj.ticks_per_beat
+        self.track_spans = [None] * len(mido_obj.tracks)
+        self._meta = loader
+        self._track_instruments = {
+            track_idx: [] for track_idx in range(len(mido_obj.tracks))}
+        for (_, _, track_idx), instrument in loader.instrument_map.items():
+            self._track_instruments[track_idx].append(instrument)
+
+    # -- resources -- #
+    def close(self):
+        """Release the memory map and the file. Decoded events stay
+        available."""
+        if self._file is not None:
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+            self._file.close()
+            self._file = None
+            self._data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return 'LazyMidiFile(ticks_per_beat={}, num_tracks={}, decoded_tracks={})'.format(
+            self.ticks_per_beat, self.num_tracks, len(self._track_instruments))
+
+
+def _sort_meta_events(loader):
+    # sort events by time, as in MidiFile
+    loader.tempo_changes.sort(key=lambda t: t.time)
+    loader.time_signature_changes.sort(key=lambda ts: ts.time)
+    loader.key_signature_changes.sort(key=lambda ks: ks.time)
+    loader.lyrics.sort(key=lambda lyc: lyc.time)
@@ -0,0 +1,61 @@
+"""Beat grids following the time signatures of a midi file.
+
+A beat lasts ``4 / denominator`` quarter notes, and a bar ``numerator``
+beats. Each time signature change starts a new bar, even in the middle of
+the previous one, which is then cut short. Before the first time signature,
+the meter is 4/4.
+
+"""
+import numpy as np
+
+
+def get_beat_grid(ticks_per_beat, time_signature_changes, end_tick, subdivision=1):
+    """Get the ticks of the beats in ``[0, end_tick)``, with their bar.
+
+    Parameters
+    ----------
+    ticks_per_beat : int
+        Resolution, in ticks per quarter note.
+    time_signature_changes : list of TimeSignature
+    end_tick : int
+        End of the grid, exclusive. The grid holds at least tick 0.
+    subdivision : int
+        Steps per beat.
+
+    Returns
+    -------
+    ticks : np.ndarray
+        Sorted ticks of the steps, int64. Steps that do not fall on a tick
+        are floored.
+    bars : np.ndarray
+        Bar index of each step, from 0.
+    steps : np.ndarray
+        Index of each step within its bar, from 0: the steps with 0 are the
+        downbeats.
+
+    """
+    end_tick = max(int(end_tick), 1)
+    signatures = {}
+    for ts in sorted(time_signature_changes, key=lambda ts: ts.time):
+        if ts.time < end_tick:
+            # the last of simultaneous changes wins
+            signatures[ts.time] = (ts.numerator, ts.denominator)
+    if 0 not in signatures:
+        signatures[0] = (4, 4)
+    signatures = sorted(signatures.items())
+
+    ticks, bars, steps = [], [], []
+    bar_offset = 0
+    for idx, (time, (numerator, denominator)) in enumerate(signatures):
+        end = signatures[idx + 1][0] if idx + 1 < len(signatures) else end_tick
+        # exact steps of ticks_per_beat * 4 / (denominator * subdivision)
+        step_num = ticks_per_beat * 4
+        step_den = denominator * subdivision
+        steps_per_bar = numerator * subdivision
+        num_steps = -(-(end - time) * step_den // step_num)
+        step_idx = np.arange(num_steps, dtype=np.int64)
+        ticks.append(time + step_idx * step_num // step_den)
+        bars.append(bar_offset + step_idx // steps_per_bar)
+        steps.append(step_idx % steps_per_bar)
+        bar_offset += -(-num_steps // steps_per_bar)
+    return np.concatenate(ticks), np.concatenate(bars), np.concatenate(steps)
@@ -1,18 +1,24 @@
-import re
+import io
+import os
+import mmap
 import mido
-import warnings
-import functools
 import collections
 import numpy as np
-from copy import deepcopy
+from copy import copy
+from . import smf
+from . import cache
+from . import meter
+from . import quantization
+from . import transforms
 from .containers import KeySignature, TimeSignature, Lyric, Note, PitchBend, ControlChange, Instrument, TempoChange, Marker
+from .containers import make_note_array, notes_to_array
 
 
 DEFAULT_BPM = int(120)
 
 
 class MidiFile(object):
-    def __init__(self, midi_file=None, mode='tick'):
+    def __init__(self, midi_file=None, mode='tick', native=True, note_array=False):
         # create empty file
         if midi_file is None:
             self.ticks_per_beat = 480
@@ -26,276 +32,285 @@ class MidiFile(object):
         
         # load
         else:
-            if isinstance(midi_file, str):
-                # filename
-                mido_obj = mido.MidiFile(filename=midi_file)
-            else:
-                raise ValueError('[!] Invalid file name')
-
-            # ticks_per_beat
-            self.ticks_per_beat = mido_obj.ticks_per_beat
-
-            # convert delta time to cumulative time
-            mido_obj = self._convert_delta_to_cumulative(mido_obj)
-
-            # load tempo changes
-            self.tempo_changes = self._load_tempo_changes(mido_obj)
-
-            # load key signatures
-            self.key_signature_changes = self._load_key_signatures(mido_obj)
+            data = _read_midi_data(midi_file)
 
-            # load time signatures
-            self.time_signature_changes = self._load_time_signatures(mido_obj)
+            # load every event in a single traversal
+            loader, self.ticks_per_beat = _read_events(
+                data, lambda: _MidiLoader(note_array), native=native)
 
-            # load markers
-            self.markers = self._load_markers(mido_obj)
-            
-            # load lyrics
-            self.lyrics = self._load_lyrics(mido_obj)
+            # meta events
+            self.tempo_changes = loader.tempo_changes
+            self.key_signature_changes = loader.key_signature_changes
+            self.time_signature_changes = loader.time_signature_changes
+            self.markers = loader.markers
+            self.lyrics = loader.lyrics
 
             # sort events by time
+            self.tempo_changes.sort(key=lambda t: t.time)
             self.time_signature_changes.sort(key=lambda ts: ts.time)
             self.key_signature_changes.sort(key=lambda ks: ks.time)
             self.lyrics.sort(key=lambda lyc: lyc.time)
 
-            # compute max tick
-            self.max_tick = max([max([e.time for e in t]) for t in mido_obj.tracks]) + 1
+            # max tick
+            self.max_tick = loader.max_tick + 1
 
-            # load instruments
-            self.instruments = self._load_instruments(mido_obj)
-        
-        # tick and sec mapping
-        
+            # instruments
+            self.instruments = loader.get_instruments()
 
-    def _convert_delta_to_cumulative(self, mido_obj):
-        for track in mido_obj.tracks:
-            tick = int(0)
-            for event in track:
-                event.time += tick
-                tick = event.time
-        return mido_obj
-
-    def _load_tempo_changes(self, mido_obj):
-        # default bpm
-        tempo_changes = [TempoChange(DEFAULT_BPM, 0)]
-
-        # traversing
-        for track in mido_obj.tracks:
-            for event in track:
-                if event.type == 'set_tempo':
-                    # convert tempo to BPM
-                    tempo = mido.tempo2bpm(event.tempo)
-                    tick = event.time
-                    if tick == 0:
-                        tempo_changes = [TempoChange(tempo, 0)]
-                    else:
-                        last_tempo = tempo_changes[-1].tempo
-                        if tempo != last_tempo:
-                            tempo_changes.append(TempoChange(tempo, tick))
-        return tempo_changes
-
-    def _load_time_signatures(self, mido_obj):
-        # no default
-        time_signature_changes = []
-
-        # traversing
-        for track in mido_obj.tracks:
-            for event in track:
-                if event.type == 'time_signature':
-                    ts_obj = TimeSignature(
-                        event.numerator,
-                        event.denominator,
-                        event.time)
-                    time_signature_changes.append(ts_obj)
-        return time_signature_changes
-
-    def _load_key_signatures(self, mido_obj):
-        # no default
-        key_signature_changes = []
-
-        # traversing
-        for track in mido_obj.tracks:
-            for event in track:
-                if event.type == 'key_signature':
-                    key_obj = KeySignature(
-                        event.key, 
-                        event.time)
-                    key_signature_changes.append(key_obj)
-        return key_signature_changes
-
-    def _load_markers(self, mido_obj):
-        # no default
-        markers = []
-
-        # traversing
-        for track in mido_obj.tracks:
-            for event in track:
-                if event.type == 'marker':
-                    markers.append(Marker(event.text, event.time))
-        return markers
-
-    def _load_lyrics(self, mido_obj):
-        # no default
-        lyrics = []
-        
-        # traversing
-        for track in mido_obj.tracks:
-            for event in track:
-                if event.type == 'lyrics':
-                    lyrics.append(Lyric(event.text, event.time))
-        return lyrics
-
-    def _load_instruments(self, midi_data):
-        instrument_map = collections.OrderedDict()
-        # Store a similar mapping to instruments storing "straggler events",
-        # e.g. events which appear before we want to initialize an Instrument
-        stragglers = {}
-        # This dict will map track indices to any track names encountered
-        track_name_map = collections.defaultdict(str)
-
-        def __get_instrument(program, channel, track, create_new):
-            """Gets the Instrument corresponding to the given program number,
-            drum/non-drum type, channel, and track index.  If no such
-            instrument exists, one is created.
-
-            """
-            # If we have already created an instrument for this program
-            # number/track/channel, return it
-            if (program, channel, track) in instrument_map:
-                return instrument_map[(program, channel, track)]
-            # If there's a straggler instrument for this instrument and we
-            # aren't being requested to create a new instrument
-            if not create_new and (channel, track) in stragglers:
-                return stragglers[(channel, track)]
-            # If we are told to, create a new instrument and store it
-            if create_new:
-                is_drum = (channel == 9)
-                instrument = Instrument(
-                    program, is_drum, track_name_map[track_idx])
-                # If any events appeared for this instrument before now,
-                # include them in the new instrument
-                if (channel, track) in stragglers:
-                    straggler = stragglers[(channel, track)]
-                    instrument.control_changes = straggler.control_changes
-                    instrument.pitch_bends = straggler.pitch_bends
-                # Add the instrument to the instrument map
-                instrument_map[(program, channel, track)] = instrument
-            # Otherwise, create a "straggler" instrument which holds events
-            # which appear before we actually want to create a proper new
-            # instrument
-            else:
-                # Create a "straggler" instrument
-                instrument = Instrument(program, track_name_map[track_idx])
-                # Note that stragglers ignores program number, because we want
-                # to store all events on a track which appear before the first
-                # note-on, regardless of program
-                stragglers[(channel, track)] = instrument
-            return instrument
+        # tick and sec mapping
+        self._tick_to_time = None
+        self._tick_to_time_key = None
+        self._tempo_segments = None
+        self._tempo_segments_key = None
+        self._beat_grid = None
+        self._beat_grid_key = None
+
+    def __setstate__(self, state):
+        # pickles of earlier versions lack the caches
+        self.__dict__.update(state)
+        for name in ('_tick_to_time', '_tempo_segments', '_beat_grid'):
+            self.__dict__.setdefault(name, None)
+            self.__dict__.setdefault(name + '_key', None)
+
+    def _get_tempo_key(self):
+        # everything the timing depends on, compared to detect mutations
+        return (self.ticks_per_beat, tuple((t.time, t.tempo) for t in self.tempo_changes))
 
-        for track_idx, track in enumerate(midi_data.tracks):
-            # Keep track of last note on location:
-            # key = (instrument, note),
-            # value = (note-on tick, velocity)
-            last_note_on = collections.defaultdict(list)
-            # Keep track of which instrument is playing in each channel
-            # initialize to program 0 for all channels
-            current_instrument = np.zeros(16, dtype=np.int)
-            for event in track:
-                # Look for track name events
-                if event.type == 'track_name':
-                    # Set the track name for the current track
-                    track_name_map[track_idx] = event.name
-                # Look for program change events
-                if event.type == 'program_change':
-                    # Update the instrument for this channel
-                    current_instrument[event.channel] = event.program
-                # Note ons are note on events with velocity > 0
-                elif event.type == 'note_on' and event.velocity > 0:
-                    # Store this as the last note-on location
-                    note_on_index = (event.channel, event.note)
-                    last_note_on[note_on_index].append((
-                        event.time, event.velocity))
-                # Note offs can also be note on events with 0 velocity
-                elif event.type == 'note_off' or (event.type == 'note_on' and
-                                                  event.velocity == 0):
-                    # Check that a note-on exists (ignore spurious note-offs)
-                    key = (event.channel, event.note)
-                    if key in last_note_on:
-                        # Get the start/stop times and velocity of every note
-                        # which was turned on with this instrument/drum/pitch.
-                        # One note-off may close multiple note-on events from
-                        # previous ticks. In case there's a note-off and then
-                        # note-on at the same tick we keep the open note from
-                        # this tick.
-                        end_tick = event.time
-                        open_notes = last_note_on[key]
-
-                        notes_to_close = [
-                            (start_tick, velocity)
-                            for start_tick, velocity in open_notes
-                            if start_tick != end_tick]
-                        notes_to_keep = [
-                            (start_tick, velocity)
-                            for start_tick, velocity in open_notes
-                            if start_tick == end_tick]
-
-                        for start_tick, velocity in notes_to_close:
-                            start_time = start_tick
-                            end_time = end_tick
-                            # Create the note event
-                            note = Note(velocity, event.note, start_time,
-                                        end_time)
-                            # Get the program and drum type for the current
-                            # instrument
-                            program = current_instrument[event.channel]
-                            # Retrieve the Instrument instance for the current
-                            # instrument
-                            # Create a new instrument if none exists
-                            instrument = __get_instrument(
-                                program, event.channel, track_idx, 1)
-                            # Add the note event
-                            instrument.notes.append(note)
-
-                        if len(notes_to_close) > 0 and len(notes_to_keep) > 0:
-                            # Note-on on the same tick but we already closed
-                            # some previous notes -> it will continue, keep it.
-                            last_note_on[key] = notes_to_keep
-                        else:
-                            # Remove the last note on for this instrument
-                            del last_note_on[key]
-                # Store pitch bends
-                elif event.type == 'pitchwheel':
-                    # Create pitch bend class instance
-                    bend = PitchBend(event.pitch, event.time)
-                    # Get the program for the current inst
-                    program = current_instrument[event.channel]
-                    # Retrieve the Instrument instance for the current inst
-                    # Don't create a new instrument if none exists
-                    instrument = __get_instrument(
-                        program, event.channel, track_idx, 0)
-                    # Add the pitch bend event
-                    instrument.pitch_bends.append(bend)
-                # Store control changes
-                elif event.type == 'control_change':
-                    control_change = ControlChange(
-                        event.control, event.value, event.time)
-                    # Get the program for the current inst
-                    program = current_instrument[event.channel]
-                    # Retrieve the Instrument instance for the current inst
-                    # Don't create a new instrument if none exists
-                    instrument = __get_instrument(
-                        program, event.channel, track_idx, 0)
-                    # Add the control change event
-                    instrument.control_changes.append(control_change)
-        # Initialize list of instruments from instrument_map
-        instruments = [i for i in instrument_map.values()]
-        return instruments
-    
     def get_tick_to_time_mapping(self):
-        return _get_tick_to_time_mapping(
-            self.ticks_per_beat, 
-            self.max_tick, 
-            self.tempo_changes)
+        """Get the time in seconds of every tick up to `max_tick`.
+
+        The mapping is cached, and recomputed once `tempo_changes`,
+        `ticks_per_beat` or `max_tick` change. The returned array is shared
+        with the cache, hence read-only.
+
+        """
+        key = (self.max_tick, self._get_tempo_key())
+        if self._tick_to_time_key != key:
+            tick_to_time = _get_tick_to_time_mapping(
+                self.ticks_per_beat, 
+                self.max_tick, 
+                self.tempo_changes)
+            tick_to_time.flags.writeable = False
+            self._tick_to_time = tick_to_time
+            self._tick_to_time_key = key
+        return self._tick_to_time
+
+    def _get_tempo_segments(self):
+        """Piecewise-linear tick to seconds mapping, one piece per tempo
+        change, cached until the tempo changes or the resolution change.
+
+        """
+        key = self._get_tempo_key()
+        if self._tempo_segments_key != key:
+            self._tempo_segments = _get_tempo_segments(self.ticks_per_beat, self.tempo_changes)
+            self._tempo_segments_key = key
+        return self._tempo_segments
+
+    def ticks_to_seconds(self, ticks):
+        """Convert ticks to seconds, following the tempo changes.
+
+        Matches `get_tick_to_time_mapping` without building a table of
+        `max_tick` entries: each lookup is a binary search over the tempo
+        changes. Ticks past `max_tick` follow the last tempo.
+
+        Parameters
+        ----------
+        ticks : int or array_like
+
+        Returns
+        -------
+        seconds : float or np.ndarray
+
+        """
+        seg_ticks, seg_seconds, seg_scales = self._get_tempo_segments()
+        ticks = np.asarray(ticks)
+        if len(seg_ticks) == 0:
+            seconds = np.zeros(ticks.shape)
+        else:
+            idx = np.searchsorted(seg_ticks, ticks, side='right') - 1
+            # no time elapses before the first tempo change
+            before = idx < 0
+            idx = np.maximum(idx, 0)
+            seconds = seg_seconds[idx] + seg_scales[idx] * (ticks - seg_ticks[idx])
+            seconds = np.where(before, 0., seconds)
+        return float(seconds) if seconds.ndim == 0 else seconds
+
+    def seconds_to_ticks(self, seconds):
+        """Convert seconds to the nearest ticks, following the tempo changes.
+
+        Inverse of `ticks_to_seconds`, by binary search over the tempo
+        changes.
+
+        Parameters
+        ----------
+        seconds : float or array_like
+
+        Returns
+        -------
+        ticks : int or np.ndarray
+
+        """
+        seg_ticks, seg_seconds, seg_scales = self._get_tempo_segments()
+        seconds = np.asarray(seconds, dtype=np.float64)
+        if len(seg_ticks) == 0:
+            ticks = np.zeros(seconds.shape, dtype=np.int64)
+        else:
+            idx = np.maximum(np.searchsorted(seg_seconds, seconds, side='right') - 1, 0)
+            ticks = seg_ticks[idx] + (seconds - seg_seconds[idx]) / seg_scales[idx]
+            # nearest tick, the earlier one on ties
+            ticks = np.maximum(np.ceil(ticks - 0.5), 0).astype(np.int64)
+        return int(ticks) if ticks.ndim == 0 else ticks
+
+    def get_note_seconds(self):
+        """Get the onset and offset times in seconds of the notes of every
+        instrument, converted in a single vectorized call.
+
+        Returns
+        -------
+        note_seconds : list of np.ndarray
+            One array of shape (num_notes, 2) per instrument, in the order of
+            its notes.
+
+        """
+        note_arrays = [instrument.note_array for instrument in self.instruments]
+        ticks = np.empty((sum(len(a) for a in note_arrays), 2), dtype=np.int64)
+        offset = 0
+        for note_array in note_arrays:
+            ticks[offset:offset + len(note_array), 0] = note_array['start']
+            ticks[offset:offset + len(note_array), 1] = note_array['end']
+            offset += len(note_array)
+        seconds = self.ticks_to_seconds(ticks)
+        splits = np.cumsum([len(a) for a in note_arrays])[:-1]
+        return np.split(seconds, splits) if note_arrays else []
+
+    def get_event_seconds(self, events):
+        """Get the times in seconds of a list of events with a `time` in
+        ticks, e.g. control changes or markers.
+
+        """
+        ticks = np.fromiter((event.time for event in events), dtype=np.int64, count=len(events))
+        return self.ticks_to_seconds(ticks)
+
+    def _get_beat_grid(self):
+        """Ticks, bars and beats in bar of the beats up to `max_tick`,
+        cached until the time signatures, resolution or length change.
+
+        """
+        key = (self.ticks_per_beat, self.max_tick, tuple(
+            (ts.time, ts.numerator, ts.denominator) for ts in self.time_signature_changes))
+        if self._beat_grid_key != key:
+            beat_grid = meter.get_beat_grid(
+                self.ticks_per_beat, self.time_signature_changes, self.max_tick)
+            for array in beat_grid:
+                array.flags.writeable = False
+            self._beat_grid = beat_grid
+            self._beat_grid_key = key
+        return self._beat_grid
+
+    def get_beats(self, unit='tick'):
+        """Get the times of the beats, following the time signatures.
+
+        A beat lasts ``4 / denominator`` quarter notes. Each time signature
+        change starts a new bar on a beat, even in the middle of a bar. The
+        meter is 4/4 before the first time signature.
+
+        Parameters
+        ----------
+        unit : str
+            ``'tick'`` or ``'second'``.
+
+        Returns
+        -------
+        beats : np.ndarray
+            Sorted times of the beats from 0 up to `max_tick`. Ticks are
+            cached, hence read-only.
+
+        """
+        return self._convert_grid_times(self._get_beat_grid()[0], unit)
+
+    def get_downbeats(self, unit='tick'):
+        """Get the times of the first beat of each bar, see `get_beats`."""
+        ticks, _, beats = self._get_beat_grid()
+        return self._convert_grid_times(ticks[beats == 0], unit)
+
+    def get_bar_beat(self, ticks):
+        """Locate ticks in the bars, see `get_beats`.
+
+        Parameters
+        ----------
+        ticks : int or array_like
+            Ticks within ``[0, max_tick)``, others fall into the first or
+            last beat.
+
+        Returns
+        -------
+        bar : int or np.ndarray
+            Index of the bar of each tick, from 0.
+        beat : int or np.ndarray
+            Index of the beat within the bar, from 0.
+
+        """
+        beat_ticks, bars, beats = self._get_beat_grid()
+        idx = np.maximum(np.searchsorted(beat_ticks, ticks, side='right') - 1, 0)
+        if idx.ndim == 0:
+            return int(bars[idx]), int(beats[idx])
+        return bars[idx], beats[idx]
+
+    def _convert_grid_times(self, ticks, unit):
+        if unit == 'tick':
+            return ticks
+        elif unit == 'second':
+            return self.ticks_to_seconds(ticks)
+        raise ValueError("unit must be 'tick' or 'second'")
+
+    def save_cache(self, filename=None):
+        """Save the parsed file to a binary cache, see `load_cache`.
+
+        Parameters
+        ----------
+        filename : str, path-like or file-like
+            Path to write to, or an object opened in binary mode.
+
+        Returns
+        -------
+        data : bytes
+            The cache, when no `filename` is given.
+
+        """
+        data = cache.encode_cache(self)
+        if filename is None:
+            return data
+        elif hasattr(filename, 'write'):
+            filename.write(data)
+        else:
+            with open(filename, 'wb') as f:
+                f.write(data)
+
+    @classmethod
+    def load_cache(cls, midi_cache, use_mmap=True):
+        """Load a file saved with `save_cache`.
+
+        Notes are held as arrays reading the cache in place (see
+        `Instrument.note_array`), hence read-only, so loading costs little
+        more than reading the metadata.
+
+        Parameters
+        ----------
+        midi_cache : str, path-like, bytes-like or file-like
+            Path to the cache, or its content.
+        use_mmap : bool
+            Memory-map a cache given by path instead of reading it. The map
+            stays open as long as note arrays refer to it.
+
+        """
+        if isinstance(midi_cache, os.PathLike):
+            midi_cache = os.fspath(midi_cache)
+        if isinstance(midi_cache, str) and use_mmap:
+            with open(midi_cache, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = _read_midi_data(midi_cache)
+        return cache.decode_cache(data, cls())
 
     def __repr__(self):
         return self.__str__()
@@ -314,38 +329,135 @@ class MidiFile(object):
         output_str = "\n".join(output_list)
         return output_str
 
-    def dump(self, filename, segment=None, shift=True, instrument_idx=None):
-        # comparison function
-        def event_compare(event1, event2):
-            secondary_sort = {
-                'set_tempo': lambda e: (1 * 256 * 256),
-                'time_signature': lambda e: (2 * 256 * 256),
-                'key_signature': lambda e: (3 * 256 * 256),
-                'marker': lambda e: (4 * 256 * 256),
-                'lyrics': lambda e: (5 * 256 * 256),
-                'program_change': lambda e: (6 * 256 * 256),
-                'pitchwheel': lambda e: ((7 * 256 * 256) + e.pitch),
-                'control_change': lambda e: (
-                    (8 * 256 * 256) + (e.control * 256) + e.value),
-                'note_off': lambda e: ((9 * 256 * 256) + (e.note * 256)),
-                'note_on': lambda e: (
-                    (10 * 256 * 256) + (e.note * 256) + e.velocity),
-                'end_of_track': lambda e: (11 * 256 * 256)
-            }
-            if (event1.time == event2.time and
-                    event1.type in secondary_sort and
-                    event2.type in secondary_sort):
-                return (secondary_sort[event1.type](event1) -
-                        secondary_sort[event2.type](event2))
-            return event1.time - event2.time
+    def resample(self, ticks_per_beat, rounding='round', duration='snap'):
+        """Change the resolution, rescaling the times of all events in place.
+        See `quantization.resample`.
+
+        """
+        quantization.resample(self, ticks_per_beat, rounding=rounding, duration=duration)
+
+    def quantize(self, grid=None, subdivision=4, rounding='round', duration='snap'):
+        """Snap the times of all events to a grid in place, fixed or
+        following the time signatures. See `quantization.quantize`.
+
+        """
+        quantization.quantize(
+            self, grid=grid, subdivision=subdivision, rounding=rounding, duration=duration)
+
+    def transpose(self, semitones, mode='clip', drums=False):
+        """Shift the pitch of all notes in place, clipping or dropping the
+        notes out of range. See `transforms.transpose`.
+
+        """
+        transforms.transpose(self, semitones, mode=mode, drums=drums)
+
+    def apply_velocity_curve(self, curve):
+        """Map the velocity of all notes through a factor, table or function,
+        in place. See `transforms.apply_velocity_curve`.
+
+        """
+        transforms.apply_velocity_curve(self, curve)
+
+    def stretch_time(self, factor, change_tempo=False):
+        """Stretch the file in time in place, scaling the times of all events
+        or the tempi. See `transforms.stretch_time`.
+
+        """
+        transforms.stretch_time(self, factor, change_tempo=change_tempo)
+
+    def merge_instruments(self):
+        """Merge the instruments sharing a program, in place. See
+        `transforms.merge_instruments`.
+
+        """
+        transforms.merge_instruments(self)
+
+    def slice(self, start_tick, end_tick, shift=True):
+        """Get the segment ``[start_tick, end_tick)`` as a new MidiFile,
+        leaving this one untouched.
+
+        Notes overlapping the segment are clipped to it. Tempo, time and key
+        signature changes, control changes and pitch bends still active at
+        `start_tick` are carried over to it; markers and lyrics are kept
+        within the segment only. Notes are looked up in the interval index of
+        each instrument (see `Instrument.get_interval_index`), built once
+        and cached, and events by binary search on their times. As for the
+        index, notes edited in place must be assigned back to be seen.
+
+        Parameters
+        ----------
+        start_tick, end_tick : int
+            Bounds of the segment.
+        shift : bool
+            Move the segment to start at tick 0.
+
+        Returns
+        -------
+        midi_obj : MidiFile
+            With the same instruments, in the same order, holding their
+            notes as arrays (see `Instrument.note_array`).
+
+        """
+        offset = start_tick if shift else 0
+        midi_obj = MidiFile()
+        midi_obj.ticks_per_beat = self.ticks_per_beat
+        midi_obj.max_tick = end_tick - offset
+        midi_obj.tempo_changes = _crop_events(
+            self.tempo_changes, start_tick, end_tick, front=True, shift=shift)
+        midi_obj.time_signature_changes = _crop_events(
+            self.time_signature_changes, start_tick, end_tick, front=True, shift=shift)
+        midi_obj.key_signature_changes = _crop_events(
+            self.key_signature_changes, start_tick, end_tick, front=True, shift=shift)
+        midi_obj.markers = _crop_events(
+            self.markers, start_tick, end_tick, front=False, shift=shift)
+        midi_obj.lyrics = _crop_events(
+            self.lyrics, start_tick, end_tick, front=False, shift=shift)
+
+        for instrument in self.instruments:
+            cropped = Instrument(instrument.program, instrument.is_drum, instrument.name)
+            cropped.control_changes = _crop_events(
+                instrument.control_changes, start_tick, end_tick, front=True, shift=shift)
+            cropped.pitch_bends = _crop_events(
+                instrument.pitch_bends, start_tick, end_tick, front=True, shift=shift)
+
+            # the notes overlapping the segment, clipped to it
+            note_array = _take_notes(instrument, start_tick, end_tick)
+            cropped.note_array = make_note_array(
+                np.maximum(note_array['start'], start_tick) - offset,
+                np.minimum(note_array['end'], end_tick) - offset,
+                note_array['pitch'], note_array['velocity'])
+            midi_obj.instruments.append(cropped)
+        return midi_obj
+
+    def dump(self, filename=None, segment=None, shift=True, instrument_idx=None, file=None):
+        """Write the midi file.
+
+        Parameters
+        ----------
+        filename : str, path-like or file-like
+            Path to write to, or an object opened in binary mode.
+        segment : tuple of int
+            Only write the segment ``(start_tick, end_tick)``, see `slice`.
+        shift : bool
+            Move the segment to start at tick 0, see `slice`.
+        instrument_idx : int or list of int
+            Only write these instruments.
+        file : file-like
+            Object opened in binary mode to write to, as in `mido`.
+
+        Returns
+        -------
+        data : bytes
+            The encoded file, when neither `filename` nor `file` is given.
+
+        """
         if instrument_idx is None:
             pass
-        elif len(instrument_idx)==0:
-            return
         elif isinstance(instrument_idx, int):
             instrument_idx = [instrument_idx]
         elif isinstance(instrument_idx, list):
-            pass
+            if len(instrument_idx) == 0:
+                return
         else:
             raise ValueError('Invalid instrument index')
 
@@ -353,16 +465,11 @@ class MidiFile(object):
         if segment is not None:
             if not isinstance(segment, list) and not isinstance(segment, tuple):
                 raise ValueError('Invalid segment format')
-            start_tick = segment[0]
-            end_tick= segment[1]
-
-        # Create file
-        midi_parsed = mido.MidiFile(ticks_per_beat=self.ticks_per_beat)
-
-        # Create track 0 with timing information
-        meta_track = mido.MidiTrack()
+            return self.slice(segment[0], segment[1], shift=shift).dump(
+                filename, instrument_idx=instrument_idx, file=file)
 
         # -- meta track -- #
+        # events are (time, encoded event) pairs, per type
         # 1. Time signature
         # add default
         add_ts = True
@@ -370,88 +477,55 @@ class MidiFile(object):
         if self.time_signature_changes:
             add_ts = min([ts.time for ts in self.time_signature_changes]) > 0.0
         if add_ts:
-            ts_list.append(
-                mido.MetaMessage(
-                    'time_signature', 
-                    time=0, 
-                    numerator=4, 
-                    denominator=4))
+            ts_list.append((0, smf.encode_time_signature(4, 4)))
 
         # add each
         for ts in self.time_signature_changes:
             ts_list.append(
-                mido.MetaMessage(
-                    'time_signature', 
-                    time=ts.time,
-                    numerator=ts.numerator, 
-                    denominator=ts.denominator))
-        
+                (ts.time, smf.encode_time_signature(ts.numerator, ts.denominator)))
+
         # 2. Tempo
         # - add default
         add_t = True
-        tempo_list = [] 
+        tempo_list = []
         if self.tempo_changes:
             add_t = min([t.time for t in self.tempo_changes]) > 0.0
         if add_t:
-            tempo_list.append(
-                mido.MetaMessage(
-                    'set_tempo', 
-                    time=0, 
-                    tempo=mido.bpm2tempo(DEFAULT_BPM)))
+            tempo_list.append((0, smf.encode_tempo(mido.bpm2tempo(DEFAULT_BPM))))
 
         # - add each
         for t in self.tempo_changes:
-            t.tempo = mido.bpm2tempo(t.tempo)
-            tempo_list.append(
-                mido.MetaMessage(
-                    'set_tempo',
-                    time=t.time,
-                    tempo=int(t.tempo)))
-        
+            tempo_list.append((t.time, smf.encode_tempo(int(mido.bpm2tempo(t.tempo)))))
+
         # 3. Lyrics
-        lyrics_list = []
-        for l in self.lyrics:
-            lyrics_list.append(
-                mido.MetaMessage(
-                    'lyrics', 
-                    time=l.time, 
-                    text=l.text))   
+        lyrics_list = [
+            (l.time, smf.encode_text(smf.META_LYRICS, l.text)) for l in self.lyrics]
 
         # 4. Markers
-        markers_list = []
-        for m in self.markers:
-            markers_list.append(
-                mido.MetaMessage(
-                    'marker', 
-                    time=m.time, 
-                    text=m.text))   
+        markers_list = [
+            (m.time, smf.encode_text(smf.META_MARKER, m.text)) for m in self.markers]
 
         # 5. Key
-        key_number_to_mido_key_name = [
-            'C', 'Db', 'D', 'Eb', 'E', 'F', 'F#', 'G', 'Ab', 'A', 'Bb', 'B',
-            'Cm', 'C#m', 'Dm', 'D#m', 'Em', 'Fm', 'F#m', 'Gm', 'G#m', 'Am',
-            'Bbm', 'Bm']
-        key_list = []
-        for ks in self.key_signature_changes:
-            key_list.append(mido.MetaMessage(
-                'key_signature', time=ks.time,
-                key=key_number_to_mido_key_name[ks.key_number]))
-
-        if segment:
-            ts_list = _include_meta_events_within_range(ts_list, start_tick, end_tick, shift=shift, front=True)
-            tempo_list = _include_meta_events_within_range(tempo_list, start_tick, end_tick, shift=shift, front=True)
-            lyrics_list = _include_meta_events_within_range(lyrics_list, start_tick, end_tick, shift=shift, front=False)
-            markers_list = _include_meta_events_within_range(markers_list, start_tick, end_tick, shift=shift, front=False)
-            key_list = _include_meta_events_within_range(key_list, start_tick, end_tick, shift=shift, front=True)
-        meta_track = ts_list + tempo_list + lyrics_list+ markers_list + key_list 
-
-        # sort
-        meta_track.sort(key=functools.cmp_to_key(event_compare))
-
+        key_list = [
+            (ks.time, smf.encode_key_signature(smf.KEY_NUMBER_NAMES[ks.key_number]))
+            for ks in self.key_signature_changes]
+
+        # sort by time, then by type (as listed in _META_PRIORITY)
+        meta_track = ts_list + tempo_list + lyrics_list + markers_list + key_list
+        times = _get_event_times([time for time, _ in meta_track])
+        priority = np.repeat(
+            [_META_PRIORITY[name] for name in ['ts', 'tempo', 'lyrics', 'marker', 'key']],
+            [len(ts_list), len(tempo_list), len(lyrics_list), len(markers_list), len(key_list)])
+        order = np.lexsort((priority, times))
+        times = times[order]
+
+        meta_data = bytearray()
+        for delta, idx in zip(np.diff(times, prepend=0).tolist(), order.tolist()):
+            meta_data += smf.encode_varlen(delta)
+            meta_data += meta_track[idx][1]
         # end of meta track
-        meta_track.append(mido.MetaMessage(
-            'end_of_track', time=meta_track[-1].time + 1))
-        midi_parsed.tracks.append(meta_track) 
+        meta_data += smf.encode_varlen(1) + smf.END_OF_TRACK
+        tracks = [meta_data]
 
         # -- instruments -- #
         channels = list(range(16))
@@ -461,13 +535,6 @@ class MidiFile(object):
                 if cur_idx not in instrument_idx:
                     continue
 
-            track = mido.MidiTrack()
-            # segment-free
-            # track name
-            if instrument.name:
-                track.append(mido.MetaMessage(
-                    'track_name', time=0, name=instrument.name))
-
             # If it's a drum event, we need to set channel to 9
             if instrument.is_drum:
                 channel = 9
@@ -476,133 +543,476 @@ class MidiFile(object):
             else:
                 channel = channels[cur_idx % len(channels)]
 
+            # track name
+            track_data = bytearray()
+            if instrument.name:
+                track_data += smf.encode_varlen(0)
+                track_data += smf.encode_text(smf.META_TRACK_NAME, instrument.name)
+
             # Set the program number
-            track.append(mido.Message(
-                'program_change', time=0, program=instrument.program,
-                channel=channel))
-            
-            # segment-related
-            # Add all pitch bend events
-            bend_list = []
-            for bend in instrument.pitch_bends:
-                bend_list.append(mido.Message(
-                    'pitchwheel', time=bend.time,
-                    channel=channel, pitch=bend.pitch))
-           
-            # Add all control change events
-            cc_list = []
-            for control_change in instrument.control_changes:
-                cc_list.append(mido.Message(
-                    'control_change',
-                    time=control_change.time,
-                    channel=channel, control=control_change.number,
-                    value=control_change.value))
-
-            if segment:
-                bend_list = _include_meta_events_within_range(bend_list, start_tick, end_tick, shift=shift, front=True)
-                cc_list = _include_meta_events_within_range(cc_list, start_tick, end_tick, shift=shift, front=True)
-            track += (bend_list + cc_list)
-
-            # Add all note events
-            for note in instrument.notes:
-                if segment:
-                    note = _check_note_within_range(note, start_tick, end_tick, shift=True)
-                if note:
-                    track.append(mido.Message(
-                        'note_on', time=note.start,
-                        channel=channel, note=note.pitch, velocity=note.velocity))
-                    # Also need a note-off event (note on with velocity 0)
-                    track.append(mido.Message(
-                        'note_on', time=note.end,
-                        channel=channel, note=note.pitch, velocity=0))
-            track = sorted(track, key=functools.cmp_to_key(event_compare))
-
-            # If there's a note off event and a note on event with the same
-            # tick and pitch, put the note off event first
-            for n, (event1, event2) in enumerate(zip(track[:-1], track[1:])):
-                if (event1.time == event2.time and
-                        event1.type == 'note_on' and
-                        event2.type == 'note_on' and
-                        event1.note == event2.note and
-                        event1.velocity != 0 and
-                        event2.velocity == 0):
-                    track[n] = event2
-                    track[n + 1] = event1
+            program = _check_data_bytes('program', [instrument.program])
+
+            # pitch bend events
+            bend_times = _get_event_times([bend.time for bend in instrument.pitch_bends])
+            bend_pitch = np.array([bend.pitch for bend in instrument.pitch_bends], dtype=np.int64)
+            if len(bend_pitch) and (bend_pitch.min() < -8192 or bend_pitch.max() > 8191):
+                raise ValueError('pitch must be in range -8192..8191')
+
+            # control change events
+            cc_times = _get_event_times([cc.time for cc in instrument.control_changes])
+            cc_number = _check_data_bytes(
+                'control', [cc.number for cc in instrument.control_changes])
+            cc_value = _check_data_bytes(
+                'value', [cc.value for cc in instrument.control_changes])
+
+            # note events
+            note_start, note_end, note_pitch, note_velocity = _get_note_columns(instrument)
+            _check_data_bytes('note', note_pitch)
+            _check_data_bytes('velocity', note_velocity)
+
+            # events: program change, pitch bends, control changes, then a
+            # note-on and a note-off (note-on with velocity 0) per note
+            num_bends, num_ccs, num_notes = len(bend_times), len(cc_times), len(note_start)
+            times = np.concatenate([
+                [0], bend_times, cc_times,
+                np.stack([note_start, note_end], axis=1).ravel()]).astype(np.int64)
+            if times.min() < 0:
+                raise ValueError('message time must be non-negative in MIDI file')
+            status = np.repeat(
+                [0xc0 | channel, 0xe0 | channel, 0xb0 | channel, 0x90 | channel],
+                [1, num_bends, num_ccs, 2 * num_notes])
+            bend_value = bend_pitch + 8192
+            on_off_velocity = np.stack([note_velocity, np.zeros_like(note_velocity)], axis=1).ravel()
+            note_pitch = np.repeat(note_pitch, 2)
+            data1 = np.concatenate([
+                program, bend_value & 0x7f, cc_number, note_pitch]).astype(np.int64)
+            data2 = np.concatenate([
+                [0], bend_value >> 7, cc_value, on_off_velocity]).astype(np.int64)
+            num_data = np.repeat([1, 2], [1, len(times) - 1])
+
+            # sort by time, then by type and data, see _CHANNEL_PRIORITY
+            priority = np.concatenate([
+                [_CHANNEL_PRIORITY['program_change']],
+                _CHANNEL_PRIORITY['pitchwheel'] + bend_pitch,
+                _CHANNEL_PRIORITY['control_change'] + cc_number * 256 + cc_value,
+                _CHANNEL_PRIORITY['note_on'] + note_pitch * 256 + on_off_velocity])
+            order = np.lexsort((priority, times))
+            times = times[order]
+
+            track_data += smf.encode_channel_events(
+                np.diff(times, prepend=0), status[order], data1[order],
+                data2[order], num_data[order])
 
             # Finally, add in an end of track event
-            track.append(mido.MetaMessage(
-                'end_of_track', time=track[-1].time + 1))
-            # Add to the list of output tracks
-            midi_parsed.tracks.append(track)
-
-        # Cumulative timing to delta
-        for track in midi_parsed.tracks:
-            tick = 0
-            for event in track:
-                event.time -= tick
-                tick += event.time
+            track_data += smf.encode_varlen(1) + smf.END_OF_TRACK
+            tracks.append(track_data)
 
         # Write it out
-        midi_parsed.save(filename=filename)
-
-
-def _check_note_within_range(note, st, ed, shift=True):
-    tmp_st = max(st, note.start)
-    tmp_ed = max(st, min(note.end, ed))
-
-    if (tmp_ed - tmp_st) <= 0:
-        return None
-    if shift:
-        tmp_st -= st
-        tmp_ed -= st
-    note.start = int(tmp_st)
-    note.end = int(tmp_ed)
-    return note
-
-
-def _include_meta_events_within_range(events, st, ed, shift=True, front=True):
-    '''
-    For time, key signatutr
-    '''
-    proc_events = []
-    num = len(events)
-    if not events:
-        return events
-        
-    # include events from back
-    i = num - 1
-    while i >= 0:
-        event = events[i]
-        if event.time < st:
-            break
-        if event.time < ed:
-            proc_events.append(event)
-        i -= 1
+        data = smf.encode_midi(self.ticks_per_beat, tracks)
+        if filename is not None and hasattr(filename, 'write'):
+            file, filename = filename, None
+        if filename is not None:
+            with open(filename, 'wb') as f:
+                f.write(data)
+        elif file is not None:
+            file.write(data)
+        else:
+            return data
 
-    # if the first tick has no event, add the previous one
-    if front and (i >= 0):
-        if not proc_events:
-            proc_events = [events[i]]
-        elif proc_events[-1].time != st:
-            proc_events.append(events[i])
+
+class _MidiLoader(object):
+    """Builds the containers of a midi file from a single pass over its events.
+
+    Each event is routed by type to the handler of its container, so a file
+    is traversed exactly once no matter how many kinds of events it holds.
+    Handlers take plain values (absolute ticks, channels, data bytes), which
+    keeps them independent of the source of the events.
+
+    With ``note_array``, notes are collected as flat integers and handed to
+    the instruments as structured arrays, without creating Note objects.
+
+    """
+
+    def __init__(self, note_array=False):
+        # meta events (default bpm)
+        self.tempo_changes = [TempoChange(DEFAULT_BPM, 0)]
+        self.time_signature_changes = []
+        self.key_signature_changes = []
+        self.markers = []
+        self.lyrics = []
+        self.max_tick = 0
+
+        # instruments, keyed by (program, channel, track)
+        self.instrument_map = collections.OrderedDict()
+        # Store a similar mapping to instruments storing "straggler events",
+        # e.g. events which appear before we want to initialize an Instrument
+        self.stragglers = {}
+        # This dict will map track indices to any track names encountered
+        self.track_name_map = collections.defaultdict(str)
+        # flat (start, end, pitch, velocity) buffers, keyed as instrument_map
+        self.note_array = note_array
+        self.note_buffers = collections.defaultdict(list)
+
+        # per-track state
+        self.track_idx = -1
+        self.last_note_on = None
+        self.current_instrument = None
+
+    def start_track(self, track_idx):
+        self.track_idx = track_idx
+        # Keep track of last note on location:
+        # key = (channel, note),
+        # value = (note-on tick, velocity)
+        self.last_note_on = collections.defaultdict(list)
+        # Keep track of which instrument is playing in each channel
+        # initialize to program 0 for all channels
+        self.current_instrument = [0] * 16
+
+    def end_track(self, tick):
+        if tick > self.max_tick:
+            self.max_tick = tick
+
+    def get_instruments(self):
+        if self.note_array:
+            for key, instrument in self.instrument_map.items():
+                buffer = np.array(self.note_buffers[key], dtype=np.int64).reshape(-1, 4)
+                instrument.note_array = make_note_array(
+                    buffer[:, 0], buffer[:, 1], buffer[:, 2], buffer[:, 3])
+        # Initialize list of instruments from instrument_map
+        return list(self.instrument_map.values())
+
+    def _get_instrument(self, program, channel, create_new):
+        """Gets the Instrument corresponding to the given program number,
+        drum/non-drum type, channel, and track index.  If no such
+        instrument exists, one is created.
+
+        """
+        track = self.track_idx
+        # If we have already created an instrument for this program
+        # number/track/channel, return it
+        instrument = self.instrument_map.get((program, channel, track))
+        if instrument is not None:
+            return instrument
+        # If there's a straggler instrument for this instrument and we
+        # aren't being requested to create a new instrument
+        if not create_new and (channel, track) in self.stragglers:
+            return self.stragglers[(channel, track)]
+        # If we are told to, create a new instrument and store it
+        if create_new:
+            is_drum = (channel == 9)
+            instrument = Instrument(
+                program, is_drum, self.track_name_map[track])
+            # If any events appeared for this instrument before now,
+            # include them in the new instrument
+            if (channel, track) in self.stragglers:
+                straggler = self.stragglers[(channel, track)]
+                instrument.control_changes = straggler.control_changes
+                instrument.pitch_bends = straggler.pitch_bends
+            # Add the instrument to the instrument map
+            self.instrument_map[(program, channel, track)] = instrument
+        # Otherwise, create a "straggler" instrument which holds events
+        # which appear before we actually want to create a proper new
+        # instrument
+        else:
+            # Note that stragglers ignores program number, because we want
+            # to store all events on a track which appear before the first
+            # note-on, regardless of program
+            instrument = Instrument(program, name=self.track_name_map[track])
+            self.stragglers[(channel, track)] = instrument
+        return instrument
+
+    # -- meta events -- #
+    def track_name(self, name):
+        # Set the track name for the current track
+        self.track_name_map[self.track_idx] = name
+
+    def set_tempo(self, tick, tempo):
+        # convert tempo to BPM
+        tempo = mido.tempo2bpm(tempo)
+        if tick == 0:
+            self.tempo_changes = [TempoChange(tempo, 0)]
+        elif tempo != self.tempo_changes[-1].tempo:
+            self.tempo_changes.append(TempoChange(tempo, tick))
+
+    def time_signature(self, tick, numerator, denominator):
+        self.time_signature_changes.append(
+            TimeSignature(numerator, denominator, tick))
+
+    def key_signature(self, tick, key):
+        self.key_signature_changes.append(KeySignature(key, tick))
+
+    def marker(self, tick, text):
+        self.markers.append(Marker(text, tick))
+
+    def lyric(self, tick, text):
+        self.lyrics.append(Lyric(text, tick))
+
+    # -- channel events -- #
+    def program_change(self, channel, program):
+        # Update the instrument for this channel
+        self.current_instrument[channel] = program
+
+    def note_on(self, tick, channel, pitch, velocity):
+        # Note ons with velocity 0 are note offs
+        if velocity == 0:
+            self.note_off(tick, channel, pitch)
         else:
+            # Store this as the last note-on location
+            self.last_note_on[(channel, pitch)].append((tick, velocity))
+
+    def note_off(self, tick, channel, pitch):
+        # Check that a note-on exists (ignore spurious note-offs)
+        key = (channel, pitch)
+        if key not in self.last_note_on:
+            return
+
+        # Get the start/stop times and velocity of every note which was
+        # turned on with this instrument/drum/pitch. One note-off may close
+        # multiple note-on events from previous ticks. In case there's a
+        # note-off and then note-on at the same tick we keep the open note
+        # from this tick.
+        open_notes = self.last_note_on[key]
+        notes_to_close = [
+            (start_tick, velocity)
+            for start_tick, velocity in open_notes
+            if start_tick != tick]
+        notes_to_keep = [
+            (start_tick, velocity)
+            for start_tick, velocity in open_notes
+            if start_tick == tick]
+
+        if notes_to_close:
+            # Retrieve the Instrument instance for the current instrument
+            # Create a new instrument if none exists
+            program = self.current_instrument[channel]
+            instrument = self._get_instrument(program, channel, 1)
+            self._add_notes(instrument, program, channel, pitch, tick, notes_to_close)
+
+        if notes_to_close and notes_to_keep:
+            # Note-on on the same tick but we already closed
+            # some previous notes -> it will continue, keep it.
+            self.last_note_on[key] = notes_to_keep
+        else:
+            # Remove the last note on for this instrument
+            del self.last_note_on[key]
+
+    def _add_notes(self, instrument, program, channel, pitch, tick, notes_to_close):
+        if self.note_array:
+            buffer = self.note_buffers[(program, channel, self.track_idx)]
+            for start_tick, velocity in notes_to_close:
+                buffer.extend((start_tick, tick, pitch, velocity))
+        else:
+            notes = instrument.notes
+            for start_tick, velocity in notes_to_close:
+                notes.append(Note(velocity, pitch, start_tick, tick))
+
+    def pitchwheel(self, tick, channel, pitch):
+        # Don't create a new instrument if none exists
+        instrument = self._get_instrument(
+            self.current_instrument[channel], channel, 0)
+        instrument.pitch_bends.append(PitchBend(pitch, tick))
+
+    def control_change(self, tick, channel, number, value):
+        # Don't create a new instrument if none exists
+        instrument = self._get_instrument(
+            self.current_instrument[channel], channel, 0)
+        instrument.control_changes.append(ControlChange(number, value, tick))
+
+
+def _read_events(data, make_loader, native=True):
+    """Feed every event of a midi file to a new loader.
+
+    The raw bytes are decoded natively, falling back to mido on anything
+    unusual, with a fresh loader.
+
+    Returns
+    -------
+    loader, ticks_per_beat
+
+    """
+    if native:
+        try:
+            loader = make_loader()
+            return loader, smf.read_midi(data, loader)
+        except (ValueError, IndexError):
             pass
+    mido_obj = mido.MidiFile(file=io.BytesIO(data))
+    loader = make_loader()
+    _load_mido_tracks(mido_obj, loader)
+    return loader, mido_obj.ticks_per_beat
+
+
+def _load_mido_tracks(mido_obj, loader):
+    """Feeds every event of a mido file to the loader, in one traversal.
+
+    Delta times are accumulated on the fly, so the mido messages are left
+    untouched.
+
+    """
+    for track_idx, track in enumerate(mido_obj.tracks):
+        loader.start_track(track_idx)
+        tick = 0
+        for event in track:
+            tick += event.time
+            event_type = event.type
+            if event_type == 'note_on':
+                loader.note_on(tick, event.channel, event.note, event.velocity)
+            elif event_type == 'note_off':
+                loader.note_off(tick, event.channel, event.note)
+            elif event_type == 'control_change':
+                loader.control_change(
+                    tick, event.channel, event.control, event.value)
+            elif event_type == 'pitchwheel':
+                loader.pitchwheel(tick, event.channel, event.pitch)
+            elif event_type == 'program_change':
+                loader.program_change(event.channel, event.program)
+            elif event_type == 'set_tempo':
+                loader.set_tempo(tick, event.tempo)
+            elif event_type == 'time_signature':
+                loader.time_signature(tick, event.numerator, event.denominator)
+            elif event_type == 'key_signature':
+                loader.key_signature(tick, event.key)
+            elif event_type == 'marker':
+                loader.marker(tick, event.text)
+            elif event_type == 'lyrics':
+                loader.lyric(tick, event.text)
+            elif event_type == 'track_name':
+                loader.track_name(event.name)
+        loader.end_track(tick)
+
+
+def _read_midi_data(midi_file):
+    """Get the raw bytes of a midi file, from a filename, path-like,
+    bytes-like or file-like object."""
+    if isinstance(midi_file, os.PathLike):
+        midi_file = os.fspath(midi_file)
+    if isinstance(midi_file, str):
+        # filename
+        with open(midi_file, 'rb') as f:
+            return f.read()
+    elif isinstance(midi_file, (bytes, bytearray, memoryview)):
+        return bytes(midi_file)
+    elif hasattr(midi_file, 'read'):
+        # file-like, opened in binary mode
+        data = midi_file.read()
+        if not isinstance(data, (bytes, bytearray)):
+            raise ValueError('[!] File object must be opened in binary mode')
+        return bytes(data)
+    else:
+        raise ValueError('[!] Invalid file name')
+
+
+# secondary sort of the events of a tick, by type
+_META_PRIORITY = {
+    'tempo': 1 * 256 * 256,
+    'ts': 2 * 256 * 256,
+    'key': 3 * 256 * 256,
+    'marker': 4 * 256 * 256,
+    'lyrics': 5 * 256 * 256}
+
+# secondary sort of the events of a tick, by type then data
+# (pitch bend amount, control number and value, note pitch and velocity)
+_CHANNEL_PRIORITY = {
+    'program_change': 6 * 256 * 256,
+    'pitchwheel': 7 * 256 * 256,
+    'control_change': 8 * 256 * 256,
+    'note_on': 10 * 256 * 256}
+
+
+def _get_event_times(times):
+    times = np.array(times, dtype=None if len(times) else np.int64)
+    if times.dtype.kind not in 'iu':
+        raise ValueError('message time must be int in MIDI file')
+    return times.astype(np.int64)
+
+
+def _check_data_bytes(name, values):
+    values = np.array(values, dtype=None if len(values) else np.int64)
+    if values.dtype.kind not in 'iu':
+        raise TypeError('{} must be int'.format(name))
+    if len(values) and (values.min() < 0 or values.max() > 127):
+        raise ValueError('{} must be in range 0..127'.format(name))
+    return values.astype(np.int64)
+
+
+def _get_note_columns(instrument):
+    """Get the start, end, pitch and velocity arrays of an instrument."""
+    if instrument._note_array is not None:
+        note_array = instrument._note_array
+        columns = [note_array[name] for name in ('start', 'end', 'pitch', 'velocity')]
+    else:
+        columns = np.array(
+            [(note.start, note.end, note.pitch, note.velocity) for note in instrument.notes],
+            dtype=None if instrument.notes else np.int64).reshape(-1, 4).T
+        if columns.dtype.kind not in 'iu':
+            raise ValueError('message time must be int in MIDI file')
+    return [column.astype(np.int64) for column in columns]
+
+
+def _select_events_within_range(times, st, ed, front=True):
+    """Select the events of a segment, from their times.
+
+    Events after the last one before `st` and before `ed` are kept. With
+    `front`, the last event before `st` is kept too (it is still active at
+    `st`) unless an event falls exactly on `st`. Times in order, as loaded,
+    are looked up by binary search.
+
+    Returns
+    -------
+    idx : np.ndarray
+        Indices of the selected events, in order.
+
+    """
+    times = np.asarray(times)
+    if np.all(times[1:] >= times[:-1]):
+        last_below = np.searchsorted(times, st, side='left') - 1
+        idx = np.arange(last_below + 1, np.searchsorted(times, ed, side='left'))
+    else:
+        below = np.nonzero(times < st)[0]
+        last_below = below[-1] if len(below) else -1
+        idx = np.arange(last_below + 1, len(times))
+        idx = idx[times[idx] < ed]
+
+    # if the first tick has no event, add the previous one
+    if front and last_below >= 0 and (len(idx) == 0 or times[idx[0]] != st):
+        idx = np.concatenate([[last_below], idx]).astype(np.int64)
+    return idx
+
+
+def _crop_events(events, st, ed, front=True, shift=True):
+    """Copy the events of a segment, see `_select_events_within_range`.
+    Events carried over from before `st` are moved to `st`.
+
+    """
+    times = np.fromiter((event.time for event in events), dtype=np.int64, count=len(events))
+    cropped = []
+    for idx in _select_events_within_range(times, st, ed, front=front).tolist():
+        event = copy(events[idx])
+        event.time = max(event.time, st) - st if shift else max(event.time, st)
+        cropped.append(event)
+    return cropped
+
+
+def _take_notes(instrument, st, ed):
+    """Get the notes overlapping ``[st, ed)`` as an array, in order, looked
+    up in the interval index rather than scanned.
+
+    """
+    if ed <= st:
+        return make_note_array([], [], [], [])
+    idx = instrument.get_interval_index().overlapping(st, ed)
+    if instrument._notes is None:
+        return instrument._note_array[idx]
+    notes = instrument._notes
+    return notes_to_array([notes[i] for i in idx.tolist()])
 
-    # reverse
-    proc_events = proc_events[::-1]
-
-    # shift
-    result = []
-    shift = st if shift else 0
-    for event in proc_events:
-        event.time -= st
-        event.time = int(max(event.time, 0))
-        result.append(event)
-    return proc_events
-        
 
 def _find_nearest_np(array, value):
-    return (np.abs(array - value)).argmin()
+    # the array is sorted: binary search, first occurrence on ties
+    idx = np.searchsorted(array, value)
+    if idx > 0 and (idx == len(array) or value - array[idx - 1] <= array[idx] - value):
+        idx = np.searchsorted(array, array[idx - 1])
+    return idx
 
 
 def _get_tick_index_by_seconds(sec, tick_to_time):
@@ -615,7 +1025,33 @@ def _get_tick_index_by_seconds(sec, tick_to_time):
         return _find_nearest_np(tick_to_time, sec)
 
 
+def _get_tempo_segments(ticks_per_beat, tempo_changes):
+    """Get the start tick, start time and seconds per tick of the interval of
+    each tempo change, accumulated as in `_get_tick_to_time_mapping`.
+
+    """
+    tempo_changes = sorted(tempo_changes, key=lambda t: t.time)
+    num_tempi = len(tempo_changes)
+    seg_ticks = np.zeros(num_tempi, dtype=np.int64)
+    seg_seconds = np.zeros(num_tempi)
+    seg_scales = np.zeros(num_tempi)
+
+    acc_time = 0
+    for idx, tempo_change in enumerate(tempo_changes):
+        # compute tick scale
+        seconds_per_beat = 60 / tempo_change.tempo
+        seconds_per_tick = seconds_per_beat / float(ticks_per_beat)
+
+        seg_ticks[idx] = tempo_change.time
+        seg_seconds[idx] = acc_time
+        seg_scales[idx] = seconds_per_tick
+        if idx + 1 < num_tempi:
+            acc_time = acc_time + seconds_per_tick * (tempo_changes[idx + 1].time - tempo_change.time)
+    return seg_ticks, seg_seconds, seg_scales
+
+
 def _get_tick_to_time_mapping(ticks_per_beat, max_tick, tempo_changes):
+    tempo_changes = sorted(tempo_changes, key=lambda t: t.time)
     tick_to_time = np.zeros(max_tick + 1)
     num_tempi = len(tempo_changes)
 
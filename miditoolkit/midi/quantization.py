@@ -0,0 +1,214 @@
+"""Resampling and quantization of the times of a MidiFile, in place.
+
+All the notes of all instruments are processed as columns at once. Times
+are mapped by a monotonic function, so events keep their order.
+
+Notes held as an array (see `Instrument.note_array`) are mapped without a
+Python loop. Notes held as a list keep their :class:`Note` objects, which
+are read and updated one by one: this costs about as much as a plain loop
+over the notes, so load files with ``note_array=True`` for speed.
+
+Rounding methods: ``'round'`` to the nearest (ties up), ``'floor'`` or
+``'ceil'``. Duration policies, for note ends:
+
+* ``'snap'``: ends are mapped like starts.
+* ``'preserve'``: durations are kept (rescaled, when resampling).
+* ``'nonzero'``: as ``'snap'``, but notes collapsing to zero length are
+  extended to the next tick of the grid.
+
+"""
+import operator
+import numpy as np
+from . import meter
+from .containers import make_note_array
+
+
+ROUNDING_METHODS = ('round', 'floor', 'ceil')
+DURATION_POLICIES = ('snap', 'preserve', 'nonzero')
+
+
+def resample(midi_obj, ticks_per_beat, rounding='round', duration='snap'):
+    """Change the resolution of a midi file, rescaling all times.
+
+    Parameters
+    ----------
+    midi_obj : MidiFile
+    ticks_per_beat : int
+        New resolution.
+    rounding : str
+        See `ROUNDING_METHODS`.
+    duration : str
+        See `DURATION_POLICIES`.
+
+    """
+    _check_options(rounding, duration)
+    factor = ticks_per_beat / midi_obj.ticks_per_beat
+
+    def map_times(times):
+        return _round(np.asarray(times, dtype=np.int64) * factor, rounding)
+
+    def next_tick(times):
+        return times + 1
+
+    _map_midi(midi_obj, map_times, map_times, next_tick, duration)
+    midi_obj.ticks_per_beat = ticks_per_beat
+
+
+def quantize(midi_obj, grid=None, subdivision=4, rounding='round', duration='snap'):
+    """Snap all times of a midi file to a grid, at the same resolution.
+
+    Parameters
+    ----------
+    midi_obj : MidiFile
+    grid : int
+        Step of a fixed grid from tick 0, in ticks. By default, the grid
+        follows the time signatures: each beat (``4 / denominator`` quarter
+        notes) split into `subdivision` steps, from each time signature
+        change on, in 4/4 before the first one.
+    subdivision : int
+        Steps per beat of the default grid.
+    rounding : str
+        See `ROUNDING_METHODS`.
+    duration : str
+        See `DURATION_POLICIES`.
+
+    """
+    _check_options(rounding, duration)
+    points = get_grid(midi_obj, grid=grid, subdivision=subdivision)
+
+    def map_times(times):
+        times = np.asarray(times, dtype=np.int64)
+        if rounding == 'floor':
+            return points[np.searchsorted(points, times, side='right') - 1]
+        after = np.minimum(np.searchsorted(points, times, side='left'), len(points) - 1)
+        if rounding == 'ceil':
+            return points[after]
+        before = np.maximum(after - 1, 0)
+        nearest = np.where(
+            times - points[before] < points[after] - times, before, after)
+        return points[nearest]
+
+    def map_durations(durations):
+        return np.asarray(durations, dtype=np.int64)
+
+    def next_point(times):
+        return points[np.minimum(np.searchsorted(points, times, side='right'), len(points) - 1)]
+
+    _map_midi(midi_obj, map_times, map_durations, next_point, duration)
+
+
+def get_grid(midi_obj, grid=None, subdivision=4):
+    """Get the ticks of a quantization grid covering a midi file, see
+    `quantize`."""
+    max_time = _get_max_time(midi_obj)
+    if grid is not None:
+        if grid <= 0:
+            raise ValueError('grid must be positive')
+        return np.arange(0, max_time + 2 * grid, grid, dtype=np.int64)
+
+    # margin of two steps, so that every time has a grid point after it
+    ticks_per_beat = midi_obj.ticks_per_beat
+    denominators = [ts.denominator for ts in midi_obj.time_signature_changes] + [4]
+    margin = 2 * -(-ticks_per_beat * 4 // (min(denominators) * subdivision))
+    points, _, _ = meter.get_beat_grid(
+        ticks_per_beat, midi_obj.time_signature_changes, max_time + margin,
+        subdivision=subdivision)
+    return np.unique(points)
+
+
+def _check_options(rounding, duration):
+    if rounding not in ROUNDING_METHODS:
+        raise ValueError('rounding must be one of {}'.format(ROUNDING_METHODS))
+    if duration not in DURATION_POLICIES:
+        raise ValueError('duration must be one of {}'.format(DURATION_POLICIES))
+
+
+def _round(values, rounding):
+    if rounding == 'floor':
+        values = np.floor(values)
+    elif rounding == 'ceil':
+        values = np.ceil(values)
+    else:
+        values = np.floor(values + 0.5)
+    return values.astype(np.int64)
+
+
+def _get_max_time(midi_obj):
+    times = [midi_obj.max_tick]
+    for events in _get_event_lists(midi_obj):
+        times.extend(event.time for event in events)
+    for instrument in midi_obj.instruments:
+        _, end = _get_note_times(instrument)
+        if len(end):
+            times.append(int(end.max()))
+    return max(times)
+
+
+def _get_note_times(instrument):
+    if instrument._notes is None:
+        note_array = instrument.note_array
+        return note_array['start'].astype(np.int64), note_array['end'].astype(np.int64)
+    notes = instrument.notes
+    start = np.fromiter(map(operator.attrgetter('start'), notes), dtype=np.int64, count=len(notes))
+    end = np.fromiter(map(operator.attrgetter('end'), notes), dtype=np.int64, count=len(notes))
+    return start, end
+
+
+def _get_event_lists(midi_obj):
+    event_lists = [
+        midi_obj.tempo_changes, midi_obj.time_signature_changes,
+        midi_obj.key_signature_changes, midi_obj.markers, midi_obj.lyrics]
+    for instrument in midi_obj.instruments:
+        event_lists.append(instrument.control_changes)
+        event_lists.append(instrument.pitch_bends)
+    return event_lists
+
+
+def _map_midi(midi_obj, map_times, map_durations, next_point, duration):
+    # events, all lists at once
+    event_lists = _get_event_lists(midi_obj)
+    times = np.fromiter(
+        (event.time for events in event_lists for event in events), dtype=np.int64)
+    times = map_times(times).tolist()
+    idx = 0
+    for events in event_lists:
+        for event in events:
+            event.time = times[idx]
+            idx += 1
+
+    # notes, all instruments at once
+    instruments = midi_obj.instruments
+    note_times = [_get_note_times(instrument) for instrument in instruments]
+    start = np.concatenate([t[0] for t in note_times] + [[]]).astype(np.int64)
+    end = np.concatenate([t[1] for t in note_times] + [[]]).astype(np.int64)
+    new_start = map_times(start)
+    if duration == 'preserve':
+        new_end = new_start + map_durations(end - start)
+    else:
+        new_end = map_times(end)
+        if duration == 'nonzero':
+            collapsed = (new_end <= new_start) & (end > start)
+            new_end[collapsed] = next_point(new_start[collapsed])
+
+    offset = 0
+    for instrument, (instrument_start, _) in zip(instruments, note_times):
+        num_notes = len(instrument_start)
+        starts = new_start[offset:offset + num_notes]
+        ends = new_end[offset:offset + num_notes]
+        offset += num_notes
+        if instrument._notes is None:
+            note_array = instrument.note_array
+            instrument.note_array = make_note_array(
+                starts, ends, note_array['pitch'], note_array['velocity'])
+        else:
+            # keep the Note objects
+            for note, note_start, note_end in zip(instrument.notes, starts.tolist(), ends.tolist()):
+                note.start = note_start
+                note.end = note_end
+            instrument._interval_index_key = None
+
+    # the last tick stays past every event
+    last = max(times + [int(new_end.max(initial=-1))])
+    if midi_obj.max_tick > 0:
+        last = max(last, int(map_times(midi_obj.max_tick - 1)))
+    midi_obj.max_tick = last + 1
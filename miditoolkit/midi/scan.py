@@ -0,0 +1,91 @@
+import collections
+from .parser import _MidiLoader, _read_events, _read_midi_data
+
+
+def scan_midi_file(midi_file, native=True):
+    """Summarize a midi file in a single pass, without building notes.
+
+    Events go through the same handlers as in `MidiFile` (instruments split
+    by program, channel and track, straggler events, channel 9 as drums),
+    so the counts match a full load, but notes are only counted.
+
+    Parameters
+    ----------
+    midi_file : str, path-like, bytes-like or file-like
+        Path to the file, or its content.
+    native : bool
+        Use the native decoder, see `MidiFile`.
+
+    Returns
+    -------
+    summary : dict
+        ``ticks_per_beat``, ``num_tracks``, ``max_tick`` (as in `MidiFile`),
+        ``tempo_changes``, ``time_signature_changes`` and
+        ``key_signature_changes``, ``num_notes``, ``pitch_range`` as
+        (lowest, highest) or None without notes, and ``instruments``: one
+        dict per instrument of `MidiFile.instruments`, in the same order,
+        with its ``program``, ``is_drum``, ``name``, ``num_notes`` and
+        ``pitch_range``.
+
+    """
+    loader, ticks_per_beat = _read_events(
+        _read_midi_data(midi_file), _ScanLoader, native=native)
+
+    instruments = []
+    for key, instrument in loader.instrument_map.items():
+        num_notes, low, high = loader.note_stats[key]
+        instruments.append({
+            'program': instrument.program,
+            'is_drum': instrument.is_drum,
+            'name': instrument.name,
+            'num_notes': num_notes,
+            'pitch_range': (low, high)})
+    lows = [i['pitch_range'][0] for i in instruments]
+    highs = [i['pitch_range'][1] for i in instruments]
+
+    return {
+        'ticks_per_beat': ticks_per_beat,
+        'num_tracks': loader.track_idx + 1,
+        'max_tick': loader.max_tick + 1,
+        'tempo_changes': sorted(loader.tempo_changes, key=lambda t: t.time),
+        'time_signature_changes': sorted(
+            loader.time_signature_changes, key=lambda ts: ts.time),
+        'key_signature_changes': sorted(
+            loader.key_signature_changes, key=lambda ks: ks.time),
+        'num_notes': sum(i['num_notes'] for i in instruments),
+        'pitch_range': (min(lows), max(highs)) if instruments else None,
+        'instruments': instruments}
+
+
+class _ScanLoader(_MidiLoader):
+    """Counts the notes of each instrument instead of storing them.
+
+    Pitch bends and control changes are dropped, so that memory only grows
+    with the number of instruments and of notes held at a time.
+
+    """
+
+    def __init__(self):
+        super(_ScanLoader, self).__init__()
+        # [num notes, lowest pitch, highest pitch], keyed as instrument_map
+        self.note_stats = collections.defaultdict(lambda: [0, 127, 0])
+
+    def _add_notes(self, instrument, program, channel, pitch, tick, notes_to_close):
+        stats = self.note_stats[(program, channel, self.track_idx)]
+        stats[0] += len(notes_to_close)
+        if pitch < stats[1]:
+            stats[1] = pitch
+        if pitch > stats[2]:
+            stats[2] = pitch
+
+    def pitchwheel(self, tick, channel, pitch):
+        pass
+
+    def control_change(self, tick, channel, number, value):
+        pass
+
+    def marker(self, tick, text):
+        pass
+
+    def lyric(self, tick, text):
+        pass
@@ -0,0 +1,188 @@
+"""Sharded store of parsed midi files.
+
+A store is a directory holding a few large shard files and an index::
+
+    index.json        version, shard file names, and the key (source
+                      filename) of each file, by file id
+    index.npy         int64 (num_files, 3): shard, byte offset and size of
+                      each file, by file id
+    shard-00000.mtks  records of the files, back to back, 8-byte aligned,
+    ...               each in the format of `MidiFile.save_cache`
+
+Files are read straight from memory-mapped shards, so random access by file
+id costs an index lookup and the decoding of one record.
+
+"""
+import os
+import glob
+import json
+import mmap
+import traceback
+import multiprocessing
+import numpy as np
+from . import cache
+from .parser import MidiFile
+from .batch import LoadResult
+
+
+__all__ = ['write_midi_shards', 'MidiShards']
+
+
+_SHARD_FORMAT_VERSION = 1
+
+_ALIGNMENT = 8
+
+
+def write_midi_shards(
+        filenames,
+        path,
+        files_per_shard=1024,
+        num_workers=None,
+        note_array=True,
+        native=True):
+    """Parse midi files into a sharded store, one shard per process at a time.
+
+    Parameters
+    ----------
+    filenames : list of str, or str
+        Paths, or a glob pattern (``**`` matches subdirectories).
+    path : str
+        Directory of the store, created if needed.
+    files_per_shard : int
+        Number of source files per shard.
+    num_workers : int
+        Number of processes, the number of CPUs by default. With 0, shards
+        are written in the current process.
+    note_array, native : bool
+        See `MidiFile`.
+
+    Returns
+    -------
+    results : list of LoadResult
+        One (filename, file id, error) per source file, in order. Files that
+        fail to load are left out of the store: their file id is None and
+        error holds the traceback.
+
+    """
+    if isinstance(filenames, str):
+        filenames = sorted(glob.glob(filenames, recursive=True))
+    os.makedirs(path, exist_ok=True)
+
+    tasks = []
+    for shard_idx, start in enumerate(range(0, len(filenames), files_per_shard)):
+        shard_name = 'shard-{:05d}.mtks'.format(shard_idx)
+        tasks.append((
+            os.path.join(path, shard_name),
+            filenames[start:start + files_per_shard], note_array, native))
+
+    if num_workers == 0:
+        shard_records = [_write_shard(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(num_workers) as pool:
+            shard_records = pool.map(_write_shard, tasks, chunksize=1)
+
+    # global index, file ids in the order of the source files
+    keys = []
+    index = []
+    results = []
+    for shard_idx, records in enumerate(shard_records):
+        for filename, offset, size, error in records:
+            if error is not None:
+                results.append(LoadResult(filename, None, error))
+                continue
+            results.append(LoadResult(filename, len(keys), None))
+            keys.append(filename)
+            index.append((shard_idx, offset, size))
+
+    np.save(os.path.join(path, 'index.npy'), np.array(index, dtype=np.int64).reshape(-1, 3))
+    with open(os.path.join(path, 'index.json'), 'w') as f:
+        json.dump({
+            'version': _SHARD_FORMAT_VERSION,
+            'shards': [os.path.basename(task[0]) for task in tasks],
+            'keys': keys}, f)
+    return results
+
+
+def _write_shard(task):
+    shard_path, filenames, note_array, native = task
+    records = []
+    offset = 0
+    with open(shard_path, 'wb') as f:
+        for filename in filenames:
+            try:
+                data = cache.encode_cache(
+                    MidiFile(filename, native=native, note_array=note_array))
+            except Exception:
+                records.append((filename, None, None, traceback.format_exc()))
+                continue
+            f.write(data + b'\0' * (-len(data) % _ALIGNMENT))
+            records.append((filename, offset, len(data), None))
+            offset += len(data) + (-len(data) % _ALIGNMENT)
+    return records
+
+
+class MidiShards(object):
+    """Read a store written by `write_midi_shards`.
+
+    Indexing with a file id returns its `MidiFile`, with note arrays reading
+    the memory-mapped shard in place (see `MidiFile.load_cache`). Iterating
+    streams the files in order, shard by shard.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the store.
+
+    Attributes
+    ----------
+    keys : list of str
+        Source filename of each file id.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'index.json')) as f:
+            info = json.load(f)
+        if info['version'] != _SHARD_FORMAT_VERSION:
+            raise ValueError('Unsupported store version {}'.format(info['version']))
+        self.shard_names = info['shards']
+        self.keys = info['keys']
+        self.index = np.load(os.path.join(path, 'index.npy'), mmap_mode='r')
+        self._shards = [None] * len(self.shard_names)
+
+    def _get_shard(self, shard_idx):
+        if self._shards[shard_idx] is None:
+            with open(os.path.join(self.path, self.shard_names[shard_idx]), 'rb') as f:
+                self._shards[shard_idx] = memoryview(
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._shards[shard_idx]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, file_id):
+        if not -len(self) <= file_id < len(self):
+            raise IndexError('file id out of range')
+        shard_idx, offset, size = self.index[file_id].tolist()
+        data = self._get_shard(shard_idx)[offset:offset + size]
+        return cache.decode_cache(data, MidiFile())
+
+    def __iter__(self):
+        for file_id in range(len(self)):
+            yield self[file_id]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Drop the memory maps of the shards. They are closed once the
+        files read from them are released."""
+        self._shards = [None] * len(self.shard_names)
+
+    def __repr__(self):
+        return 'MidiShards(path="{}", num_files={}, num_shards={})'.format(
+            self.path, len(self), len(self.shard_names))
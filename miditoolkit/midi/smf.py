@@ -0,0 +1,403 @@
+"""Standard MIDI File decoding and encoding, straight from/to raw bytes.
+
+The decoder walks the chunks, variable-length quantities and running status
+of a file and hands every event it knows about to a loader (see
+``parser._MidiLoader``), without building an intermediate message object per
+event. It follows the decoding rules of mido, and raises ``ValueError`` on
+anything it does not cover, so that callers can fall back to mido.
+
+The encoder writes the same bytes as mido does: running status for channel
+events, default time signature fields, and latin1 text.
+
+"""
+import math
+import struct
+import numpy as np
+
+
+# (sharps/flats, mode) to key name, as decoded by mido
+KEY_SIGNATURE_NAMES = {
+    (-7, 0): 'Cb', (-6, 0): 'Gb', (-5, 0): 'Db', (-4, 0): 'Ab',
+    (-3, 0): 'Eb', (-2, 0): 'Bb', (-1, 0): 'F', (0, 0): 'C',
+    (1, 0): 'G', (2, 0): 'D', (3, 0): 'A', (4, 0): 'E',
+    (5, 0): 'B', (6, 0): 'F#', (7, 0): 'C#',
+    (-7, 1): 'Abm', (-6, 1): 'Ebm', (-5, 1): 'Bbm', (-4, 1): 'Fm',
+    (-3, 1): 'Cm', (-2, 1): 'Gm', (-1, 1): 'Dm', (0, 1): 'Am',
+    (1, 1): 'Em', (2, 1): 'Bm', (3, 1): 'F#m', (4, 1): 'C#m',
+    (5, 1): 'G#m', (6, 1): 'D#m', (7, 1): 'A#m'}
+
+# key name to (sharps/flats, mode)
+KEY_SIGNATURE_CODES = {name: code for code, name in KEY_SIGNATURE_NAMES.items()}
+
+# key name of each `KeySignature.key_number`
+KEY_NUMBER_NAMES = [
+    'C', 'Db', 'D', 'Eb', 'E', 'F', 'F#', 'G', 'Ab', 'A', 'Bb', 'B',
+    'Cm', 'C#m', 'Dm', 'D#m', 'Em', 'Fm', 'F#m', 'Gm', 'G#m', 'Am',
+    'Bbm', 'Bm']
+
+# text meta events are decoded with mido's default charset
+CHARSET = 'latin1'
+
+# meta event types
+META_TRACK_NAME = 0x03
+META_LYRICS = 0x05
+META_MARKER = 0x06
+META_END_OF_TRACK = 0x2f
+META_SET_TEMPO = 0x51
+META_TIME_SIGNATURE = 0x58
+META_KEY_SIGNATURE = 0x59
+
+
+def read_header(data):
+    """Parse the header chunk.
+
+    Returns
+    -------
+    format, num_tracks, ticks_per_beat, offset of the first track chunk
+
+    """
+    if bytes(data[:4]) != b'MThd':
+        raise ValueError('MThd not found. Probably not a MIDI file')
+    if len(data) < 14:
+        raise ValueError('Truncated MThd chunk')
+    size, = struct.unpack('>L', data[4:8])
+    if size < 6 or len(data) < 8 + size:
+        raise ValueError('Truncated MThd chunk')
+    fmt, num_tracks, ticks_per_beat = struct.unpack('>hhh', data[8:14])
+    return fmt, num_tracks, ticks_per_beat, 8 + size
+
+
+def index_tracks(data, offset, num_tracks):
+    """Return the (start, end) byte offsets of the body of each track chunk."""
+    spans = []
+    for _ in range(num_tracks):
+        if len(data) < offset + 8:
+            raise ValueError('Truncated MTrk chunk')
+        if bytes(data[offset:offset + 4]) != b'MTrk':
+            raise ValueError('no MTrk header at start of track')
+        size, = struct.unpack('>L', data[offset + 4:offset + 8])
+        start = offset + 8
+        offset = start + size
+        if offset > len(data):
+            raise ValueError('Truncated MTrk chunk')
+        spans.append((start, offset))
+    return spans
+
+
+def read_midi(data, loader):
+    """Decode a whole file into the loader.
+
+    Returns
+    -------
+    ticks_per_beat : int
+
+    """
+    _, num_tracks, ticks_per_beat, offset = read_header(data)
+    for track_idx, (start, end) in enumerate(index_tracks(data, offset, num_tracks)):
+        loader.start_track(track_idx)
+        loader.end_track(decode_track(data, start, end, loader))
+    return ticks_per_beat
+
+
+def decode_track(data, pos, end, loader):
+    """Decode the events of one track chunk body, ``data[pos:end]``.
+
+    Returns
+    -------
+    tick : int
+        Absolute time of the last event of the track.
+
+    """
+    note_on = loader.note_on
+    note_off = loader.note_off
+    control_change = loader.control_change
+    pitchwheel = loader.pitchwheel
+    program_change = loader.program_change
+
+    tick = 0
+    status = 0
+    while pos < end:
+        # delta time
+        byte = data[pos]
+        pos += 1
+        delta = byte & 0x7f
+        while byte & 0x80:
+            byte = data[pos]
+            pos += 1
+            delta = (delta << 7) | (byte & 0x7f)
+        tick += delta
+
+        # status byte, or running status
+        byte = data[pos]
+        if byte & 0x80:
+            pos += 1
+            if byte == 0xff:
+                pos = _decode_meta(data, pos, tick, loader)
+                continue
+            status = byte
+        elif not 0x80 <= status < 0xf0:
+            raise ValueError('running status without last channel status')
+
+        kind = status & 0xf0
+        if kind == 0x90:
+            pitch = data[pos]
+            velocity = data[pos + 1]
+            pos += 2
+            if (pitch | velocity) & 0x80:
+                raise ValueError('data byte must be in range 0..127')
+            note_on(tick, status & 0x0f, pitch, velocity)
+        elif kind == 0x80:
+            pitch = data[pos]
+            velocity = data[pos + 1]
+            pos += 2
+            if (pitch | velocity) & 0x80:
+                raise ValueError('data byte must be in range 0..127')
+            note_off(tick, status & 0x0f, pitch)
+        elif kind == 0xb0:
+            number = data[pos]
+            value = data[pos + 1]
+            pos += 2
+            if (number | value) & 0x80:
+                raise ValueError('data byte must be in range 0..127')
+            control_change(tick, status & 0x0f, number, value)
+        elif kind == 0xe0:
+            lsb = data[pos]
+            msb = data[pos + 1]
+            pos += 2
+            if (lsb | msb) & 0x80:
+                raise ValueError('data byte must be in range 0..127')
+            pitchwheel(tick, status & 0x0f, ((msb << 7) | lsb) - 8192)
+        elif kind == 0xc0:
+            program = data[pos]
+            pos += 1
+            if program & 0x80:
+                raise ValueError('data byte must be in range 0..127')
+            program_change(status & 0x0f, program)
+        elif kind == 0xa0:
+            # polyphonic aftertouch
+            if (data[pos] | data[pos + 1]) & 0x80:
+                raise ValueError('data byte must be in range 0..127')
+            pos += 2
+        elif kind == 0xd0:
+            # channel aftertouch
+            if data[pos] & 0x80:
+                raise ValueError('data byte must be in range 0..127')
+            pos += 1
+        elif status == 0xf0 or status == 0xf7:
+            # sysex: skip the payload
+            length, pos = _read_varlen(data, pos)
+            pos += length
+        else:
+            raise ValueError('unsupported status byte 0x{:02x}'.format(status))
+
+    if pos != end:
+        raise ValueError('Event runs past the end of its track chunk')
+    return tick
+
+
+# number of data bytes of the channel events, by status & 0xf0
+_CHANNEL_DATA_LENGTHS = {
+    0x80: 2, 0x90: 2, 0xa0: 2, 0xb0: 2, 0xc0: 1, 0xd0: 1, 0xe0: 2}
+
+
+def scan_track(data, pos, end, loader):
+    """Decode the meta events of one track chunk body only.
+
+    Channel events are skipped over from their length, without being
+    decoded nor checked, so only the meta handlers of the loader are called.
+
+    Returns
+    -------
+    tick : int
+        Absolute time of the last event of the track.
+
+    """
+    data_lengths = _CHANNEL_DATA_LENGTHS
+    tick = 0
+    status = 0
+    while pos < end:
+        # delta time
+        byte = data[pos]
+        pos += 1
+        delta = byte & 0x7f
+        while byte & 0x80:
+            byte = data[pos]
+            pos += 1
+            delta = (delta << 7) | (byte & 0x7f)
+        tick += delta
+
+        # status byte, or running status
+        byte = data[pos]
+        if byte & 0x80:
+            pos += 1
+            if byte == 0xff:
+                pos = _decode_meta(data, pos, tick, loader)
+                continue
+            status = byte
+        elif not 0x80 <= status < 0xf0:
+            raise ValueError('running status without last channel status')
+
+        if status < 0xf0:
+            pos += data_lengths[status & 0xf0]
+        elif status == 0xf0 or status == 0xf7:
+            length, pos = _read_varlen(data, pos)
+            pos += length
+        else:
+            raise ValueError('unsupported status byte 0x{:02x}'.format(status))
+
+    if pos != end:
+        raise ValueError('Event runs past the end of its track chunk')
+    return tick
+
+
+def _read_varlen(data, pos):
+    byte = data[pos]
+    pos += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7f)
+    return value, pos
+
+
+def _decode_meta(data, pos, tick, loader):
+    meta_type = data[pos]
+    length, pos = _read_varlen(data, pos + 1)
+    start = pos
+    pos += length
+    if meta_type == 0x51:
+        if length < 3:
+            raise ValueError('Invalid set_tempo length')
+        loader.set_tempo(
+            tick, (data[start] << 16) | (data[start + 1] << 8) | data[start + 2])
+    elif meta_type == 0x58:
+        if length < 4:
+            raise ValueError('Invalid time_signature length')
+        loader.time_signature(tick, data[start], 2 ** data[start + 1])
+    elif meta_type == 0x59:
+        if length < 2:
+            raise ValueError('Invalid key_signature length')
+        sharps = data[start]
+        if sharps > 127:
+            sharps -= 256
+        key = KEY_SIGNATURE_NAMES.get((sharps, data[start + 1]))
+        if key is None:
+            raise ValueError('Could not decode key signature')
+        loader.key_signature(tick, key)
+    elif meta_type == 0x03:
+        loader.track_name(bytes(data[start:pos]).decode(CHARSET))
+    elif meta_type == 0x06:
+        loader.marker(tick, bytes(data[start:pos]).decode(CHARSET))
+    elif meta_type == 0x05:
+        loader.lyric(tick, bytes(data[start:pos]).decode(CHARSET))
+    return pos
+
+
+def encode_varlen(value):
+    """Encode a variable-length quantity."""
+    data = [value & 0x7f]
+    value >>= 7
+    while value:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    return bytes(data[::-1])
+
+
+def encode_meta(meta_type, data):
+    """Encode a meta event, without its delta time."""
+    return b'\xff' + bytes([meta_type]) + encode_varlen(len(data)) + data
+
+
+def encode_text(meta_type, text):
+    return encode_meta(meta_type, text.encode(CHARSET))
+
+
+def encode_tempo(tempo):
+    """Encode a set_tempo event, from microseconds per beat."""
+    if not 0 <= tempo <= 0xffffff:
+        raise ValueError('tempo must be in range 0..16777215')
+    return encode_meta(
+        META_SET_TEMPO, bytes([tempo >> 16, (tempo >> 8) & 0xff, tempo & 0xff]))
+
+
+def encode_time_signature(numerator, denominator):
+    """Encode a time_signature event, with mido's default clocks per click
+    and notated 32nd notes per beat.
+
+    """
+    if not 0 <= numerator <= 255:
+        raise ValueError('numerator must be in range 0..255')
+    exponent = math.log(denominator, 2)
+    if exponent != int(exponent):
+        raise ValueError('denominator must be a power of 2')
+    return encode_meta(
+        META_TIME_SIGNATURE, bytes([numerator, int(exponent), 24, 8]))
+
+
+def encode_key_signature(key_name):
+    sharps, mode = KEY_SIGNATURE_CODES[key_name]
+    return encode_meta(META_KEY_SIGNATURE, bytes([sharps & 0xff, mode]))
+
+
+END_OF_TRACK = encode_meta(META_END_OF_TRACK, b'')
+
+
+def encode_channel_events(deltas, status, data1, data2, num_data):
+    """Encode a run of channel events, vectorized.
+
+    Each event is laid out on one row of fixed width (delta time, status,
+    two data bytes) along with a mask of the bytes it actually uses, and the
+    masked rows are flattened to bytes at once. Running status drops the
+    status byte of an event repeating the previous status. The run is
+    assumed to follow a meta event or the start of the track, so its first
+    status is always written.
+
+    Parameters
+    ----------
+    deltas, status, data1, data2 : np.ndarray
+        Delta times, status bytes and data bytes of the events.
+    num_data : np.ndarray
+        Number of data bytes of each event, 1 or 2.
+
+    """
+    num_events = len(deltas)
+    if num_events == 0:
+        return b''
+
+    # variable-length delta times, left-aligned on the first columns
+    num_bytes = np.ones(num_events, dtype=np.int64)
+    for shift in range(7, 64, 7):
+        num_bytes += deltas >= (1 << shift)
+    width = int(num_bytes.max())
+    rows = np.zeros((num_events, width + 3), dtype=np.uint8)
+    mask = np.zeros((num_events, width + 3), dtype=np.bool_)
+    for col in range(width):
+        shift = 7 * (num_bytes - 1 - col)
+        valid = shift >= 0
+        shift = np.maximum(shift, 0)
+        rows[:, col] = ((deltas >> shift) & 0x7f) | np.where(shift > 0, 0x80, 0)
+        mask[:, col] = valid
+
+    # status, with running status
+    rows[:, width] = status
+    mask[0, width] = True
+    mask[1:, width] = status[1:] != status[:-1]
+
+    # data
+    rows[:, width + 1] = data1
+    rows[:, width + 2] = data2
+    mask[:, width + 1] = True
+    mask[:, width + 2] = num_data == 2
+    return rows[mask].tobytes()
+
+
+def encode_chunk(name, data):
+    return name + struct.pack('>L', len(data)) + bytes(data)
+
+
+def encode_midi(ticks_per_beat, tracks):
+    """Encode a type 1 file from the data of its track chunks."""
+    chunks = [encode_chunk(b'MThd', struct.pack('>hhh', 1, len(tracks), ticks_per_beat))]
+    chunks.extend(encode_chunk(b'MTrk', track) for track in tracks)
+    return b''.join(chunks)
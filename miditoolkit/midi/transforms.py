@@ -0,0 +1,182 @@
+"""Vectorized edits of the notes and events of a MidiFile, in place.
+
+Each transform works on the note columns of an instrument (see
+`Instrument.note_array`) in a single NumPy pass. Notes held as an array are
+replaced by a new array rather than written into, so arrays shared with a
+cache or another file are left untouched. Notes held as a list keep their
+:class:`Note` objects, which are updated: only the columns a transform
+changes are read and written back, one Python pass each, which still costs
+several times more than notes held as an array.
+
+Transforms taking `obj` accept a MidiFile, applied to all of its
+instruments, or a single Instrument.
+
+"""
+import operator
+import numpy as np
+from . import quantization
+from .containers import Instrument, make_note_array
+
+
+CLIP_MODES = ('clip', 'drop')
+
+
+def transpose(obj, semitones, mode='clip', drums=False):
+    """Shift the pitch of notes.
+
+    Parameters
+    ----------
+    obj : MidiFile or Instrument
+    semitones : int
+    mode : str
+        For notes shifted out of ``[0, 127]``: ``'clip'`` them to the range,
+        or ``'drop'`` them.
+    drums : bool
+        Transpose drum instruments too, off by default since their pitches
+        are instruments rather than notes.
+
+    """
+    if mode not in CLIP_MODES:
+        raise ValueError('mode must be one of {}'.format(CLIP_MODES))
+    for instrument in _get_instruments(obj):
+        if instrument.is_drum and not drums:
+            continue
+        pitch = _get_column(instrument, 'pitch') + semitones
+        keep = None
+        if mode == 'drop':
+            keep = (pitch >= 0) & (pitch <= 127)
+            if keep.all():
+                keep = None
+        _set_notes(instrument, keep, pitch=np.clip(pitch, 0, 127))
+
+
+def apply_velocity_curve(obj, curve):
+    """Map the velocity of notes through a curve.
+
+    Parameters
+    ----------
+    obj : MidiFile or Instrument
+    curve : float, array_like or callable
+        A factor scaling the velocities, a table of 128 velocities indexed
+        by velocity, or a function mapping an array of velocities. Results
+        are rounded and clipped to ``[1, 127]``.
+
+    """
+    func = _get_velocity_func(curve)
+    for instrument in _get_instruments(obj):
+        velocity = _get_column(instrument, 'velocity')
+        _set_notes(instrument, velocity=_map_velocity(velocity, func))
+
+
+def stretch_time(midi_obj, factor, change_tempo=False):
+    """Stretch a midi file in time, e.g. for tempo augmentation.
+
+    Parameters
+    ----------
+    midi_obj : MidiFile
+    factor : float
+        Ratio of the new duration to the old one.
+    change_tempo : bool
+        Divide the tempi by `factor` and leave the ticks as they are, which
+        is exact. By default, the times of all notes and events (tempo and
+        time signature changes, control changes, pitch bends, ...) are
+        scaled instead and rounded to ticks, keeping the tempi.
+
+    """
+    if factor <= 0:
+        raise ValueError('factor must be positive')
+    if change_tempo:
+        for tempo_change in midi_obj.tempo_changes:
+            tempo_change.tempo = tempo_change.tempo / factor
+        return
+
+    def map_times(times):
+        return quantization._round(np.asarray(times, dtype=np.int64) * factor, 'round')
+
+    def next_tick(times):
+        return times + 1
+
+    # one pass over all events, then all notes, as for resampling
+    quantization._map_midi(midi_obj, map_times, map_times, next_tick, 'snap')
+
+
+def merge_instruments(midi_obj):
+    """Merge the instruments sharing a program into one, in place.
+
+    Drums are merged apart from the other instruments. Merged instruments
+    take the place and name of the first of their group, and their notes,
+    control changes and pitch bends are sorted by time, earlier instruments
+    first on ties.
+
+    """
+    groups = {}
+    for instrument in midi_obj.instruments:
+        groups.setdefault((instrument.program, instrument.is_drum), []).append(instrument)
+
+    instruments = []
+    for (program, is_drum), group in groups.items():
+        if len(group) == 1:
+            instruments.append(group[0])
+            continue
+        merged = Instrument(program, is_drum=is_drum, name=group[0].name)
+        notes = np.concatenate([instrument.note_array for instrument in group])
+        merged.note_array = notes[np.argsort(notes['start'], kind='stable')]
+        merged.control_changes = sorted(
+            [cc for instrument in group for cc in instrument.control_changes],
+            key=lambda cc: cc.time)
+        merged.pitch_bends = sorted(
+            [bend for instrument in group for bend in instrument.pitch_bends],
+            key=lambda bend: bend.time)
+        instruments.append(merged)
+    midi_obj.instruments = instruments
+
+
+def _get_velocity_func(curve):
+    """Vectorized function of a velocity curve, see `apply_velocity_curve`."""
+    if callable(curve):
+        return curve
+    elif np.ndim(curve) == 0:
+        return lambda velocity: velocity * curve
+    table = np.asarray(curve)
+    if table.shape != (128,):
+        raise ValueError('a velocity table must have 128 entries')
+    return lambda velocity: table[velocity]
+
+
+def _map_velocity(velocity, func):
+    velocity = np.asarray(func(np.clip(np.asarray(velocity, dtype=np.int64), 0, 127)))
+    return np.clip(np.floor(velocity + 0.5), 1, 127).astype(np.int64)
+
+
+def _get_instruments(obj):
+    if hasattr(obj, 'instruments'):
+        return obj.instruments
+    return [obj]
+
+
+def _get_column(instrument, name):
+    """Read one note column, without building the whole note array of
+    notes held as a list."""
+    if instrument._notes is None:
+        return instrument._note_array[name].astype(np.int64)
+    notes = instrument._notes
+    return np.fromiter(map(operator.attrgetter(name), notes), dtype=np.int64, count=len(notes))
+
+
+def _set_notes(instrument, keep=None, **columns):
+    """Write new note columns, keeping the notes of a mask."""
+    if instrument._notes is None:
+        # copy on write
+        note_array = instrument._note_array
+        note_array = make_note_array(*[
+            columns.get(name, note_array[name]) for name in note_array.dtype.names])
+        instrument.note_array = note_array if keep is None else note_array[keep]
+        return
+
+    notes = instrument._notes
+    for name, values in columns.items():
+        for note, value in zip(notes, values.tolist()):
+            setattr(note, name, value)
+    if keep is not None:
+        notes[:] = [note for note, kept in zip(notes, keep.tolist()) if kept]
+    instrument._interval_index_key = None
@@ -1,5 +1,5 @@
+import math
 import numpy as np
-from copy import deepcopy
 from scipy.sparse import csc_matrix
 import miditoolkit.midi.containers as ct
 
@@ -33,86 +33,368 @@ def get_pianoroll(
         to_sparse=False, 
         keep_note=True):
     
-    # pass by value
-    note_stream = deepcopy(note_stream_ori)
+    # note columns (the note stream is left untouched)
+    start, end, pitch, velocity = _get_note_columns(note_stream_ori)
 
-    # sort by end time
-    note_stream = sorted(note_stream, key=lambda x: x.end)
-    
     # set max tick
     if max_tick is None:
-        max_tick = 0 if len(note_stream) == 0 else note_stream[-1].end
-        
+        max_tick = 0 if len(end) == 0 else int(end.max())
+
     # set resampling factor
     resample_factor = 1.0
     if resample_resolution is not None:
         resample_factor = resample_resolution / ticks_per_beat
-    
+
     # resampling
     if resample_factor != 1.0:
         max_tick = int(resample_method(max_tick * resample_factor))
-        for note in note_stream:
-            note.start = int(resample_method(note.start * resample_factor))
-            note.end = int(resample_method(note.end * resample_factor))
-    
-    # create pianoroll
-    time_coo = []
-    pitch_coo = []
-    velocity = []
-    
-    for note in note_stream:
-        # discard notes having no velocity
-        if note.velocity == 0:
-            continue
-
-        # duration
-        duration = note.end - note.start
-
-        # keep notes with zero length (set to 1)
-        if keep_note and (duration == 0):
-            duration = 1
-            note.end += 1
-
-        # set time
-        time_coo.extend(np.arange(note.start, note.end))
-        
-        # set pitch
-        pitch_coo.extend([note.pitch] * duration)
-        
-        # set velocity
-        v_tmp = note.velocity
-        if binary_thres is not None:
-            v_tmp = v_tmp > binary_thres
-        velocity.extend([v_tmp] * duration)
-    
+        start = _resample_ticks(start, resample_factor, resample_method)
+        end = _resample_ticks(end, resample_factor, resample_method)
+
+    # select the notes to draw
+    start, end, pitch, values = _get_note_values(
+        start, end, pitch, velocity, binary_thres, keep_note)
+    _check_note_range(start, end, pitch, max_tick)
+
     # output
-    pianoroll = csc_matrix((velocity, (time_coo, pitch_coo)), shape=(max_tick, PITCH_RANGE))
-    pianoroll = pianoroll if to_sparse else pianoroll.toarray()
-    
-    return pianoroll      
-
-
-def convert_pianoroll_to_notes(pianoroll):
-    binarized = pianoroll > 0
-    padded = np.pad(binarized, ((1, 1), (0, 0)), "constant")
-    diff = np.diff(padded.astype(np.int8), axis=0)
-
-    positives = np.nonzero((diff > 0).T)
-    pitches = positives[0]
-    note_ons = positives[1]
-    note_offs = np.nonzero((diff < 0).T)[1]
-
-    notes = []
-    for idx, pitch in enumerate(pitches):
-        st = note_ons[idx]
-        ed = note_offs[idx]
-        velocity = pianoroll[st, pitch]
-        velocity = max(0, min(127, velocity))
-        notes.append(
-            ct.Note(
-                velocity=int(velocity), 
-                pitch=pitch, 
-                start=st, 
-                end=ed))
-
-    return notes
\ No newline at end of file
+    if to_sparse:
+        return _render_sparse(start, end, pitch, values, max_tick)
+    pianoroll = np.empty((max_tick, PITCH_RANGE), dtype=values.dtype)
+    _render_dense(start, end, pitch, values, pianoroll)
+    return pianoroll
+
+
+def get_pianorolls(
+        note_streams,
+        ticks_per_beat=None,
+        resample_resolution=None,
+        resample_method=round,
+        binary_thres=None,
+        max_tick=None,
+        keep_note=True,
+        out=None):
+    """Render several note streams onto one (n_tracks, time, pitch) array.
+
+    All the streams share a time axis, and are drawn as with
+    :func:`get_pianoroll`.
+
+    Parameters
+    ----------
+    note_streams : list or MidiFile
+        Lists of notes or structured note arrays. A MidiFile stands for the
+        notes of its instruments, and its ticks per beat.
+    ticks_per_beat : int
+        Resolution of the notes, 480 by default.
+    max_tick : int
+        Length of the time axis, before resampling. Defaults to the length of
+        `out` if given, or else to the latest note offset over all streams.
+    out : np.ndarray
+        Array of shape (n_tracks, time, 128) to draw into, e.g. a slice of a
+        minibatch. Its dtype sets the one of the pianorolls.
+
+    Returns
+    -------
+    pianorolls : np.ndarray
+        Velocities (int64), or booleans given `binary_thres`.
+
+    """
+    # streams
+    if hasattr(note_streams, 'instruments'):
+        if ticks_per_beat is None:
+            ticks_per_beat = note_streams.ticks_per_beat
+        note_streams = [instrument.note_array for instrument in note_streams.instruments]
+    if ticks_per_beat is None:
+        ticks_per_beat = 480
+    columns = [_get_note_columns(note_stream) for note_stream in note_streams]
+
+    # set resampling factor
+    resample_factor = 1.0
+    if resample_resolution is not None:
+        resample_factor = resample_resolution / ticks_per_beat
+
+    # set max tick (shared)
+    if max_tick is None and out is None:
+        max_tick = max([int(end.max()) for _, end, _, _ in columns if len(end)] + [0])
+    if max_tick is not None and resample_factor != 1.0:
+        max_tick = int(resample_method(max_tick * resample_factor))
+
+    # output
+    if out is None:
+        dtype = np.bool_ if binary_thres is not None else np.int64
+        out = np.empty((len(columns), max_tick, PITCH_RANGE), dtype=dtype)
+    elif out.ndim != 3 or out.shape[0] != len(columns) or out.shape[2] != PITCH_RANGE:
+        raise ValueError('Invalid output shape {}, expected ({}, time, {})'.format(
+            out.shape, len(columns), PITCH_RANGE))
+    elif max_tick is None:
+        max_tick = out.shape[1]
+    elif out.shape[1] != max_tick:
+        raise ValueError('Output has {} ticks, expected {}'.format(out.shape[1], max_tick))
+
+    for idx, (start, end, pitch, velocity) in enumerate(columns):
+        # resampling
+        if resample_factor != 1.0:
+            start = _resample_ticks(start, resample_factor, resample_method)
+            end = _resample_ticks(end, resample_factor, resample_method)
+
+        # draw
+        start, end, pitch, values = _get_note_values(
+            start, end, pitch, velocity, binary_thres, keep_note)
+        _check_note_range(start, end, pitch, max_tick)
+        if out.dtype == np.bool_:
+            values = values.astype(np.bool_)
+        elif values.dtype != np.bool_:
+            values = values.astype(out.dtype)
+        _render_dense(start, end, pitch, values, out[idx])
+    return out
+
+
+def iter_pianoroll_windows(
+        note_stream_ori,
+        window,
+        hop=None,
+        ticks_per_beat=480,
+        resample_resolution=None,
+        resample_method=round,
+        binary_thres=None,
+        max_tick=None,
+        keep_note=True):
+    """Yield fixed-size time windows of the pianoroll of a note stream.
+
+    Window ``i`` holds ticks ``[i * hop, i * hop + window)`` of the pianoroll
+    :func:`get_pianoroll` would return with the same arguments, and the last
+    window is zero-padded past `max_tick`. Each window is drawn from the
+    notes overlapping it only, found by binary search over the sorted note
+    onsets, so the whole pianoroll is never held in memory.
+
+    Parameters
+    ----------
+    window : int
+        Length of the windows, in ticks after resampling.
+    hop : int
+        Distance between the starts of consecutive windows, in ticks after
+        resampling. Defaults to `window` (no overlap).
+
+    Yields
+    ------
+    pianoroll : np.ndarray
+        Array of shape (window, 128).
+
+    """
+    if hop is None:
+        hop = window
+    if window <= 0 or hop <= 0:
+        raise ValueError('Window and hop must be positive')
+
+    # note columns
+    start, end, pitch, velocity = _get_note_columns(note_stream_ori)
+
+    # set max tick
+    if max_tick is None:
+        max_tick = 0 if len(end) == 0 else int(end.max())
+
+    # resampling
+    resample_factor = 1.0
+    if resample_resolution is not None:
+        resample_factor = resample_resolution / ticks_per_beat
+    if resample_factor != 1.0:
+        max_tick = int(resample_method(max_tick * resample_factor))
+        start = _resample_ticks(start, resample_factor, resample_method)
+        end = _resample_ticks(end, resample_factor, resample_method)
+
+    # select the notes to draw
+    start, end, pitch, values = _get_note_values(
+        start, end, pitch, velocity, binary_thres, keep_note)
+    _check_note_range(start, end, pitch, max_tick)
+
+    # index: notes sorted by onset, and the longest duration, so that the
+    # notes overlapping [a, b) have their onset within (a - longest, b)
+    order = np.argsort(start, kind='stable')
+    start, end, pitch, values = start[order], end[order], pitch[order], values[order]
+    longest = int((end - start).max()) if len(start) else 0
+
+    for window_start in range(0, max_tick, hop):
+        window_end = window_start + window
+        lo = np.searchsorted(start, window_start - longest + 1)
+        hi = np.searchsorted(start, window_end)
+        overlap = np.nonzero(end[lo:hi] > window_start)[0] + lo
+
+        pianoroll = np.empty((window, PITCH_RANGE), dtype=values.dtype)
+        _render_dense(
+            np.maximum(start[overlap], window_start) - window_start,
+            np.minimum(end[overlap], window_end) - window_start,
+            pitch[overlap],
+            values[overlap],
+            pianoroll)
+        yield pianoroll
+
+
+def _get_note_columns(note_stream):
+    """Get start, end, pitch and velocity arrays from a list of notes or a
+    structured note array.
+
+    """
+    if isinstance(note_stream, np.ndarray):
+        return (
+            note_stream['start'].astype(np.int64),
+            note_stream['end'].astype(np.int64),
+            note_stream['pitch'].astype(np.int64),
+            note_stream['velocity'].astype(np.int64))
+    if len(note_stream) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    columns = np.array([
+        (note.start, note.end, note.pitch, note.velocity)
+        for note in note_stream])
+    return columns[:, 0], columns[:, 1], columns[:, 2], columns[:, 3]
+
+
+# vectorized counterparts of the usual resampling methods
+_RESAMPLE_METHODS = {
+    round: np.rint,
+    math.floor: np.floor,
+    math.ceil: np.ceil,
+    int: np.trunc}
+
+
+def _resample_ticks(ticks, factor, method):
+    ticks = ticks * factor
+    if method in _RESAMPLE_METHODS:
+        ticks = _RESAMPLE_METHODS[method](ticks)
+    else:
+        ticks = np.array([method(tick) for tick in ticks.tolist()])
+    return ticks.astype(np.int64)
+
+
+def _get_note_values(start, end, pitch, velocity, binary_thres, keep_note):
+    """Select the notes drawn on a pianoroll, and their values.
+
+    Notes having no velocity are discarded, notes with zero length are
+    extended to one tick if `keep_note`, and notes with no length left draw
+    nothing. The values are velocities, or booleans given `binary_thres`.
+    With no notes to draw, the values are float, as in an empty matrix.
+
+    """
+    # discard notes having no velocity
+    keep = velocity != 0
+    start, end, pitch, velocity = start[keep], end[keep], pitch[keep], velocity[keep]
+
+    # keep notes with zero length (set to 1)
+    if keep_note:
+        end = np.where(end == start, end + 1, end)
+
+    keep = end > start
+    start, end, pitch, velocity = start[keep], end[keep], pitch[keep], velocity[keep]
+
+    # set velocity
+    if len(start) == 0:
+        values = velocity.astype(np.float64)
+    elif binary_thres is not None:
+        values = velocity > binary_thres
+    else:
+        values = velocity.astype(np.int64)
+    return start, end, pitch, values
+
+
+def _check_note_range(start, end, pitch, max_tick):
+    if len(start) == 0:
+        return
+    if start.min() < 0:
+        raise ValueError('negative row index found')
+    if end.max() > max_tick:
+        raise ValueError('row index exceeds matrix dimensions')
+    if pitch.min() < 0:
+        raise ValueError('negative column index found')
+    if pitch.max() >= PITCH_RANGE:
+        raise ValueError('column index exceeds matrix dimensions')
+
+
+def _render_dense(start, end, pitch, values, out):
+    """Draw notes onto a dense (time, pitch) array, in place.
+
+    Each note adds its value at its onset and removes it at its offset on a
+    difference array, and a cumulative sum along time fills the durations.
+    Overlapping notes of the same pitch sum up, or are or-ed for booleans
+    (which draw ones onto a numeric array).
+
+    """
+    # offsets at the very end of the array have nothing left to remove
+    inside = end < out.shape[0]
+    if values.dtype == np.bool_:
+        # count the sounding notes and keep where any is on
+        diff = np.zeros(out.shape, dtype=np.int32)
+        np.add.at(diff, (start[values], pitch[values]), 1)
+        inside &= values
+        np.subtract.at(diff, (end[inside], pitch[inside]), 1)
+        np.cumsum(diff, axis=0, out=diff)
+        np.greater(diff, 0, out=out)
+    else:
+        out[:] = 0
+        np.add.at(out, (start, pitch), values)
+        np.subtract.at(out, (end[inside], pitch[inside]), values[inside])
+        np.cumsum(out, axis=0, out=out)
+    return out
+
+
+def _render_sparse(start, end, pitch, values, max_tick):
+    # one (time, pitch) entry per tick of each note
+    duration = end - start
+    offsets = np.arange(duration.sum()) - np.repeat(np.cumsum(duration) - duration, duration)
+    time_coo = np.repeat(start, duration) + offsets
+    pitch_coo = np.repeat(pitch, duration)
+    velocity = np.repeat(values, duration)
+    return csc_matrix((velocity, (time_coo, pitch_coo)), shape=(max_tick, PITCH_RANGE))
+
+
+def convert_pianoroll_to_notes(pianoroll, split_velocity=False, return_array=False):
+    """Convert pianorolls back to notes, all at once.
+
+    A note spans each run of positive frames of a pitch, with the value of
+    its first frame as velocity, clipped to ``[0, 127]``.
+
+    Parameters
+    ----------
+    pianoroll : np.ndarray
+        Pianoroll of shape (T, 128), or a batch of shape (B, T, 128).
+    split_velocity : bool
+        Also start a new note where the value changes within a run, e.g.
+        repeated notes with different velocities.
+    return_array : bool
+        Return notes as structured arrays of ``NOTE_DTYPE`` instead of lists
+        of :class:`Note`.
+
+    Returns
+    -------
+    notes : list of Note, or np.ndarray
+        Sorted by pitch then start. For a batch, a list with the notes of
+        each pianoroll.
+
+    """
+    pianoroll = np.asarray(pianoroll)
+    if pianoroll.ndim not in (2, 3):
+        raise ValueError('pianoroll must be of shape (T, 128) or (B, T, 128)')
+    batch = pianoroll if pianoroll.ndim == 3 else pianoroll[None]
+
+    # onsets and offsets, from the frames before and after each frame
+    active = batch > 0
+    padded = np.pad(active, ((0, 0), (1, 1), (0, 0)), 'constant')
+    onsets = active & ~padded[:, :-2]
+    offsets = active & ~padded[:, 2:]
+    if split_velocity:
+        changes = active[:, 1:] & active[:, :-1] & (batch[:, 1:] != batch[:, :-1])
+        onsets[:, 1:] |= changes
+        offsets[:, :-1] |= changes
+
+    # (item, pitch, frame), sorted by item, pitch then frame
+    item, pitch, start = np.nonzero(onsets.transpose(0, 2, 1))
+    end = np.nonzero(offsets.transpose(0, 2, 1))[2] + 1
+    velocity = batch[item, start, pitch]
+    if velocity.dtype == np.bool_:
+        velocity = velocity.astype(np.int64)
+    velocity = np.clip(velocity, 0, 127).astype(np.int64)
+
+    note_arrays = np.split(
+        ct.make_note_array(start, end, pitch, velocity),
+        np.searchsorted(item, np.arange(1, len(batch))))
+    if not return_array:
+        note_arrays = [ct.array_to_notes(note_array) for note_array in note_arrays]
+    return note_arrays if pianoroll.ndim == 3 else note_arrays[0]
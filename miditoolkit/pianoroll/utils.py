@@ -1,31 +1,65 @@
-import numpy as np
-from sklearn.neighbors import NearestNeighbors
-from sklearn.metrics import pairwise_distances
-from scipy import signal
-
-
-def downsample(pianoroll, ori_resol, factor):
-    pass
-
-
-def tochroma(pianoroll):
-    chroma = np.zeros((pianoroll.shape[0], 12))
-    for note in range(12):
-        chroma[:, note] = np.sum(pianoroll[:, note::12], axis=1)
-    return chroma
-
-
-def pitch_padding(pianroll, pitch_range, padding_range=(0, 127), value=0):
-    st, ed = pitch_range
-    st_pad, ed_pad = padding_range
-    res = np.pad(
-        pianroll,
-        [(0, 0), (st - st_pad, ed_pad - ed + 1)],
-        mode='constant',
-        constant_values=value)
-    return res
-
-
-def normalize(tensor):
-    res = (tensor - np.min(tensor)) / (np.max(tensor) - np.min(tensor))
-    return res
+import numpy as np
+from scipy import sparse
+from sklearn.neighbors import NearestNeighbors
+from sklearn.metrics import pairwise_distances
+from scipy import signal
+
+
+def downsample(pianoroll, ori_resol, factor):
+    pass
+
+
+def tochroma(pianoroll):
+    """Fold a pianoroll into 12 pitch classes, as one product with a
+    (num_pitches, 12) folding matrix. Sparse pianorolls give sparse chroma.
+
+    """
+    fold = _get_chroma_fold(pianoroll.shape[1])
+    if sparse.issparse(pianoroll):
+        return (pianoroll @ fold).asformat(pianoroll.format)
+    return np.asarray(pianoroll, dtype=np.float64) @ fold.toarray()
+
+
+def pitch_padding(pianroll, pitch_range, padding_range=(0, 127), value=0):
+    """Pad the pitch axis of a pianoroll covering `pitch_range` to cover
+    `padding_range`. Sparse pianorolls are padded by shifting their column
+    indices, and can only be padded with zeros.
+
+    """
+    st, ed = pitch_range
+    st_pad, ed_pad = padding_range
+    if sparse.issparse(pianroll):
+        if value != 0:
+            raise ValueError('sparse pianorolls can only be padded with 0')
+        coo = pianroll.tocoo()
+        res = sparse.coo_matrix(
+            (coo.data, (coo.row, coo.col + (st - st_pad))),
+            shape=(pianroll.shape[0], pianroll.shape[1] + (st - st_pad) + (ed_pad - ed + 1)))
+        return res.asformat(pianroll.format)
+    res = np.pad(
+        pianroll,
+        [(0, 0), (st - st_pad, ed_pad - ed + 1)],
+        mode='constant',
+        constant_values=value)
+    return res
+
+
+def normalize(tensor):
+    """Scale values to ``[0, 1]``. A sparse tensor whose minimum is 0 stays
+    sparse; otherwise its zeros would not be, and it is densified.
+
+    """
+    if sparse.issparse(tensor):
+        min_value, max_value = tensor.min(), tensor.max()
+        if min_value != 0:
+            return normalize(tensor.toarray())
+        return (tensor * (1. / max_value)).asformat(tensor.format)
+    res = (tensor - np.min(tensor)) / (np.max(tensor) - np.min(tensor))
+    return res
+
+
+def _get_chroma_fold(num_pitches):
+    # (num_pitches, 12), with a one at (pitch, pitch % 12)
+    pitch = np.arange(num_pitches)
+    return sparse.csc_matrix(
+        (np.ones(num_pitches), (pitch, pitch % 12)), shape=(num_pitches, 12))
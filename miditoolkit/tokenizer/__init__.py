@@ -0,0 +1,3 @@
+from .remi import *
+
+__all__ = ['REMITokenizer']
@@ -0,0 +1,344 @@
+import numpy as np
+from ..midi.parser import MidiFile
+from ..midi.containers import (
+    Instrument, TempoChange, TimeSignature, make_note_array)
+
+
+__all__ = ['REMITokenizer']
+
+
+# token types, in the order of the vocabulary
+PAD, BAR, TIME_SIGNATURE, POSITION, TEMPO, PROGRAM, PITCH, VELOCITY, DURATION = range(9)
+TOKEN_TYPES = (
+    'Pad', 'Bar', 'TimeSig', 'Position', 'Tempo', 'Program', 'Pitch', 'Velocity', 'Duration')
+
+DENOMINATORS = (1, 2, 4, 8, 16, 32)
+DRUM_PROGRAM = 128
+
+
+class REMITokenizer(object):
+    """Tokenize midi files into REMI sequences of ``np.int32`` token ids.
+
+    Time is a grid of `resolution` steps per quarter note. Bars follow the
+    time signatures of the file (see `MidiFile.get_downbeats`), and a bar
+    reads::
+
+        Bar [TimeSig] (Position [Tempo] ([Program] Pitch Velocity Duration)*)*
+
+    with a ``TimeSig`` on the first bar and wherever the time signature
+    changes, and a ``Tempo`` where the tempo changes. Notes at the same
+    position are sorted by program and pitch. Empty bars are kept, up to the
+    last event.
+
+    Velocities, tempi and durations are bucketed, so decoding is lossy:
+    velocities to `num_velocities` uniform bins, tempi to `num_tempi`
+    geometric bins over `tempo_range`, and durations to 1 up to
+    `max_duration` steps. Positions past `num_positions`, numerators past
+    `max_numerator`, and out-of-range values are clipped, and time signature
+    denominators are mapped to the nearest of `DENOMINATORS`. A bar cut
+    short by a time signature change is decoded in full.
+
+    Parameters
+    ----------
+    resolution : int
+        Steps per quarter note.
+    num_positions : int
+        Positions in a bar, 8 quarter notes by default.
+    num_velocities, num_tempi : int
+        Number of bins.
+    tempo_range : tuple
+        Lowest and highest tempo bins, in bpm.
+    max_duration : int
+        Longest duration, in steps.
+    max_numerator : int
+        Largest time signature numerator.
+    use_programs : bool
+        Prefix each note with the program of its instrument (128 for
+        drums), or else merge all instruments.
+
+    """
+
+    def __init__(
+            self,
+            resolution=4,
+            num_positions=None,
+            num_velocities=32,
+            num_tempi=32,
+            tempo_range=(30, 240),
+            max_duration=64,
+            max_numerator=16,
+            use_programs=True):
+        self.resolution = resolution
+        self.num_positions = 8 * resolution if num_positions is None else num_positions
+        self.num_velocities = num_velocities
+        self.max_duration = max_duration
+        self.max_numerator = max_numerator
+        self.use_programs = use_programs
+
+        # representative values of the bins
+        self.velocities = np.linspace(1, 127, num_velocities + 1)
+        self.velocities = np.round((self.velocities[:-1] + self.velocities[1:]) / 2).astype(np.int64)
+        self.tempi = np.geomspace(tempo_range[0], tempo_range[1], num_tempi)
+        log_tempi = np.log(self.tempi)
+        self._tempo_bounds = (log_tempi[:-1] + log_tempi[1:]) / 2
+
+        sizes = [
+            1, 1, max_numerator * len(DENOMINATORS), self.num_positions, num_tempi,
+            DRUM_PROGRAM + 1 if use_programs else 0, 128, num_velocities, max_duration]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)])
+        self._types = np.repeat(np.arange(len(sizes)), sizes)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    @property
+    def vocab(self):
+        """Names of the tokens, by id."""
+        return [self._get_name(token_type, value) for token_type, value in zip(
+            self._types.tolist(), (np.arange(len(self)) - self.offsets[self._types]).tolist())]
+
+    def _get_name(self, token_type, value):
+        if token_type in (PAD, BAR):
+            return TOKEN_TYPES[token_type]
+        elif token_type == TIME_SIGNATURE:
+            numerator, denominator = divmod(value, len(DENOMINATORS))
+            return 'TimeSig_{}/{}'.format(numerator + 1, DENOMINATORS[denominator])
+        elif token_type == TEMPO:
+            return 'Tempo_{:.1f}'.format(self.tempi[value])
+        elif token_type == VELOCITY:
+            return 'Velocity_{}'.format(self.velocities[value])
+        elif token_type == DURATION:
+            return 'Duration_{}'.format(value + 1)
+        return '{}_{}'.format(TOKEN_TYPES[token_type], value)
+
+    def tokens_to_strings(self, tokens):
+        """Get the names of token ids, for inspection."""
+        vocab = self.vocab
+        return [vocab[token] for token in np.asarray(tokens).tolist()]
+
+    def encode(self, midi_obj):
+        """Tokenize a MidiFile.
+
+        Notes are read as arrays (see `Instrument.note_array`), and all the
+        tokens are laid out in a single sort, without a loop over notes.
+
+        Returns
+        -------
+        tokens : np.ndarray
+            Token ids, int32.
+
+        """
+        step = midi_obj.ticks_per_beat / self.resolution
+
+        # notes of all instruments, with their program
+        note_arrays = [instrument.note_array for instrument in midi_obj.instruments]
+        notes = np.concatenate(note_arrays) if note_arrays else make_note_array([], [], [], [])
+        programs = np.repeat(
+            [DRUM_PROGRAM if instrument.is_drum else instrument.program
+             for instrument in midi_obj.instruments],
+            [len(note_array) for note_array in note_arrays]).astype(np.int64)
+        onsets = np.floor(notes['start'] / step + 0.5).astype(np.int64)
+        durations = np.floor((notes['end'] - notes['start']) / step + 0.5).astype(np.int64)
+
+        # tempo changes, the last one wins at a step
+        tempo_ticks = np.array([t.time for t in midi_obj.tempo_changes], dtype=np.int64)
+        tempo_values = np.array([t.tempo for t in midi_obj.tempo_changes], dtype=np.float64)
+        tempo_steps = np.floor(tempo_ticks / step + 0.5).astype(np.int64)
+        tempo_steps, last = np.unique(tempo_steps[::-1], return_index=True)
+        tempo_values = tempo_values[::-1][last]
+
+        # bars, from the downbeats of the file
+        downbeats = midi_obj.get_downbeats()
+        bar_steps = np.floor(downbeats / step + 0.5).astype(np.int64)
+        note_bars = np.maximum(np.searchsorted(bar_steps, onsets, side='right') - 1, 0)
+        tempo_bars = np.maximum(np.searchsorted(bar_steps, tempo_steps, side='right') - 1, 0)
+        num_bars = max(note_bars.max(initial=0), tempo_bars.max(initial=0)) + 1
+        note_pos = np.clip(onsets - bar_steps[note_bars], 0, self.num_positions - 1)
+        tempo_pos = np.clip(tempo_steps - bar_steps[tempo_bars], 0, self.num_positions - 1)
+
+        # rows of tokens, padded with -1: (bar, position, kind, program,
+        # pitch) sort keys, then the tokens
+        width = 4 if self.use_programs else 3
+        offsets = self.offsets
+        rows = []
+
+        bar_rows = np.full((num_bars, 5 + width), -1, dtype=np.int64)
+        bar_rows[:, 0] = np.arange(num_bars)
+        bar_rows[:, 5] = offsets[BAR]
+        signatures = self._get_time_signature_tokens(midi_obj, downbeats[:num_bars])
+        bar_rows[:, 6] = signatures
+        rows.append(bar_rows)
+
+        positions = np.unique(np.concatenate([
+            note_bars * self.num_positions + note_pos,
+            tempo_bars * self.num_positions + tempo_pos]))
+        position_rows = np.full((len(positions), 5 + width), -1, dtype=np.int64)
+        position_rows[:, 0], position_rows[:, 1] = np.divmod(positions, self.num_positions)
+        position_rows[:, 2] = 0
+        position_rows[:, 5] = offsets[POSITION] + position_rows[:, 1]
+        rows.append(position_rows)
+
+        tempo_rows = np.full((len(tempo_steps), 5 + width), -1, dtype=np.int64)
+        tempo_rows[:, 0] = tempo_bars
+        tempo_rows[:, 1] = tempo_pos
+        tempo_rows[:, 2] = 1
+        tempo_rows[:, 5] = offsets[TEMPO] + np.searchsorted(
+            self._tempo_bounds, np.log(np.maximum(tempo_values, 1e-6)))
+        rows.append(tempo_rows)
+
+        note_rows = np.full((len(notes), 5 + width), -1, dtype=np.int64)
+        note_rows[:, 0] = note_bars
+        note_rows[:, 1] = note_pos
+        note_rows[:, 2] = 2
+        note_rows[:, 3] = programs if self.use_programs else 0
+        note_rows[:, 4] = notes['pitch']
+        columns = [
+            offsets[PITCH] + np.clip(notes['pitch'], 0, 127),
+            offsets[VELOCITY] + self._get_velocity_bins(notes['velocity']),
+            offsets[DURATION] + np.clip(durations, 1, self.max_duration) - 1]
+        if self.use_programs:
+            columns.insert(0, offsets[PROGRAM] + np.clip(programs, 0, DRUM_PROGRAM))
+        note_rows[:, 5:] = np.stack(columns, axis=1)
+        rows.append(note_rows)
+
+        # sorted by key, then by tokens for a canonical order: bar rows
+        # (position -1) come first in their bar
+        rows = np.concatenate(rows)
+        rows = rows[_argsort_rows(rows)]
+        tokens = rows[:, 5:].ravel()
+        return tokens[tokens >= 0].astype(np.int32)
+
+    def _get_velocity_bins(self, velocity):
+        velocity = np.clip(np.asarray(velocity, dtype=np.int64), 1, 127)
+        return np.minimum((velocity - 1) * self.num_velocities // 126, self.num_velocities - 1)
+
+    def _get_time_signature_tokens(self, midi_obj, downbeats):
+        """TimeSig token of each bar, or -1 where the time signature does not
+        change."""
+        signatures = sorted(midi_obj.time_signature_changes, key=lambda ts: ts.time)
+        times = np.array([ts.time for ts in signatures], dtype=np.int64)
+        values = np.array(
+            [(min(max(ts.numerator, 1), self.max_numerator) - 1) * len(DENOMINATORS) +
+             self._get_denominator_idx(ts.denominator) for ts in signatures] + [-1],
+            dtype=np.int64)
+        # signature of each bar, 4/4 before the first one
+        default = 3 * len(DENOMINATORS) + DENOMINATORS.index(4)
+        idx = np.searchsorted(times, downbeats, side='right') - 1
+        bar_values = np.where(idx >= 0, values[idx], default)
+        changed = np.ones(len(bar_values), dtype=bool)
+        changed[1:] = bar_values[1:] != bar_values[:-1]
+        return np.where(changed, self.offsets[TIME_SIGNATURE] + bar_values, -1)
+
+    def _get_denominator_idx(self, denominator):
+        # nearest supported denominator, on a log scale
+        log_denominator = np.log2(max(denominator, 1))
+        return int(np.argmin(np.abs(np.log2(DENOMINATORS) - log_denominator)))
+
+    def decode(self, tokens, ticks_per_beat=480):
+        """Rebuild a MidiFile from token ids.
+
+        Notes missing their velocity or duration, and tokens out of place,
+        are skipped, so that sampled sequences always decode.
+
+        Parameters
+        ----------
+        tokens : array_like
+            Token ids.
+        ticks_per_beat : int
+            Resolution of the MidiFile.
+
+        """
+        tokens = np.asarray(tokens, dtype=np.int64).ravel()
+        if len(tokens) and (tokens.min() < 0 or tokens.max() >= len(self)):
+            raise ValueError('Token ids out of the vocabulary')
+        # pad so that the tokens around every note can be looked up
+        tokens = np.concatenate([[PAD], tokens, [PAD, PAD]])
+        types = self._types[tokens]
+        values = tokens - self.offsets[types]
+        token_idx = np.arange(len(tokens))
+
+        # bar of each token, and bar lengths in steps from the time signatures
+        is_bar = types == BAR
+        bars = np.maximum(np.cumsum(is_bar) - 1, 0)
+        num_bars = max(int(is_bar.sum()), 1)
+        signature_idx = np.full(num_bars, -1, dtype=np.int64)
+        is_signature = types == TIME_SIGNATURE
+        signature_idx[bars[is_signature]] = token_idx[is_signature]
+        signature_idx = np.maximum.accumulate(signature_idx)
+        signature_values = np.where(
+            signature_idx >= 0, values[signature_idx],
+            3 * len(DENOMINATORS) + DENOMINATORS.index(4))
+        numerators = signature_values // len(DENOMINATORS) + 1
+        denominators = np.array(DENOMINATORS)[signature_values % len(DENOMINATORS)]
+        bar_lengths = np.maximum(
+            np.floor(numerators * 4 * self.resolution / denominators + 0.5).astype(np.int64), 1)
+        bar_starts = np.concatenate([[0], np.cumsum(bar_lengths)[:-1]])
+
+        # position of each token: the last Position token within its bar
+        last_bar = np.maximum.accumulate(np.where(is_bar, token_idx, -1))
+        last_position = np.maximum.accumulate(np.where(types == POSITION, token_idx, -1))
+        positions = np.where(last_position > last_bar, values[last_position], 0)
+        steps = bar_starts[bars] + positions
+        step = ticks_per_beat / self.resolution
+
+        def to_ticks(steps):
+            return np.floor(steps * step + 0.5).astype(np.int64)
+
+        midi_obj = MidiFile()
+        midi_obj.ticks_per_beat = ticks_per_beat
+
+        # tempo and time signature changes
+        is_tempo = np.nonzero(types == TEMPO)[0]
+        midi_obj.tempo_changes = [
+            TempoChange(tempo, time) for tempo, time in zip(
+                self.tempi[values[is_tempo]].tolist(), to_ticks(steps[is_tempo]).tolist())]
+        signature_bars = np.nonzero(np.diff(np.concatenate([[-1], signature_idx])))[0]
+        signature_bars = signature_bars[signature_idx[signature_bars] >= 0]
+        midi_obj.time_signature_changes = [
+            TimeSignature(numerator, denominator, time) for numerator, denominator, time in zip(
+                numerators[signature_bars].tolist(), denominators[signature_bars].tolist(),
+                to_ticks(bar_starts[signature_bars]).tolist())]
+
+        # notes: Pitch Velocity Duration, after a Program
+        pitch_idx = np.nonzero(types == PITCH)[0]
+        pitch_idx = pitch_idx[
+            (types[pitch_idx + 1] == VELOCITY) & (types[pitch_idx + 2] == DURATION)]
+        if self.use_programs:
+            has_program = types[pitch_idx - 1] == PROGRAM
+            pitch_idx = pitch_idx[has_program]
+            programs = values[pitch_idx - 1]
+        else:
+            programs = np.zeros(len(pitch_idx), dtype=np.int64)
+        start = to_ticks(steps[pitch_idx])
+        end = to_ticks(steps[pitch_idx] + values[pitch_idx + 2] + 1)
+        pitch = values[pitch_idx]
+        velocity = self.velocities[values[pitch_idx + 1]]
+
+        midi_obj.instruments = []
+        order = np.argsort(programs, kind='stable')
+        unique_programs, counts = np.unique(programs[order], return_counts=True)
+        for program, idx in zip(unique_programs.tolist(), np.split(order, np.cumsum(counts)[:-1])):
+            is_drum = program == DRUM_PROGRAM
+            instrument = Instrument(0 if is_drum else program, is_drum=is_drum)
+            instrument.note_array = make_note_array(start[idx], end[idx], pitch[idx], velocity[idx])
+            midi_obj.instruments.append(instrument)
+
+        # the last tick stays past every event
+        times = [end.max(initial=-1)] + [t.time for t in midi_obj.tempo_changes] + \
+            [ts.time for ts in midi_obj.time_signature_changes]
+        midi_obj.max_tick = int(max(times)) + 1
+        return midi_obj
+
+    def __repr__(self):
+        return 'REMITokenizer(resolution={}, vocab_size={})'.format(self.resolution, len(self))
+
+
+def _argsort_rows(rows):
+    """Sort the rows of an int array, by first column then next ones."""
+    # one int64 key per row, when the ranges of the columns allow it
+    rows = rows - rows.min(axis=0, initial=0)
+    try:
+        keys = np.ravel_multi_index(rows.T, rows.max(axis=0, initial=0) + 1)
+    except ValueError:
+        return np.lexsort(rows.T[::-1])
+    return np.argsort(keys, kind='stable')
@@ -0,0 +1,83 @@
+import io
+import random
+
+import mido
+import pytest
+
+
+def make_midi_data(num_tracks=4, num_notes=300, ticks_per_beat=480, seed=0):
+    """Write a small synthetic multi-track midi file, as bytes.
+
+    The first track carries tempo, time and key signature changes, markers
+    and lyrics. Every track holds notes, with chords and notes repeated on
+    the same pitch back to back, control changes and pitch bends on its own
+    channel, the last one on the drum channel.
+
+    """
+    rng = random.Random(seed)
+    mido_obj = mido.MidiFile(ticks_per_beat=ticks_per_beat)
+    for track_idx in range(num_tracks):
+        channel = 9 if track_idx == num_tracks - 1 else track_idx
+        events = [(0, mido.MetaMessage('track_name', name='track %d' % track_idx))]
+        events.append((0, mido.Message(
+            'program_change', channel=channel, program=rng.randint(0, 127))))
+        if track_idx == 0:
+            for idx in range(4):
+                events.append((idx * ticks_per_beat * 8, mido.MetaMessage(
+                    'set_tempo', tempo=rng.randint(400000, 700000))))
+            events.append((0, mido.MetaMessage('time_signature', numerator=4, denominator=4)))
+            events.append((ticks_per_beat * 16, mido.MetaMessage(
+                'time_signature', numerator=3, denominator=4)))
+            events.append((0, mido.MetaMessage('key_signature', key='D')))
+            events.append((ticks_per_beat * 8, mido.MetaMessage('marker', text='B')))
+            events.append((ticks_per_beat * 4, mido.MetaMessage('lyrics', text='la')))
+
+        tick = 0
+        pitch = 60
+        for _ in range(num_notes):
+            tick += rng.choice([0, 0, ticks_per_beat // 4, ticks_per_beat // 2])
+            duration = rng.choice([ticks_per_beat // 4, ticks_per_beat // 2, ticks_per_beat])
+            if rng.random() < 0.8:
+                pitch = rng.randint(36, 96)
+            events.append((tick, mido.Message(
+                'note_on', channel=channel, note=pitch, velocity=rng.randint(1, 127))))
+            events.append((tick + duration, mido.Message(
+                'note_on', channel=channel, note=pitch, velocity=0)))
+            if rng.random() < 0.1:
+                events.append((tick, mido.Message(
+                    'control_change', channel=channel,
+                    control=rng.randint(0, 127), value=rng.randint(0, 127))))
+            if rng.random() < 0.1:
+                events.append((tick, mido.Message(
+                    'pitchwheel', channel=channel, pitch=rng.randint(-8192, 8191))))
+
+        events.sort(key=lambda x: x[0])
+        track = mido.MidiTrack()
+        last_tick = 0
+        for event_tick, msg in events:
+            track.append(msg.copy(time=event_tick - last_tick))
+            last_tick = event_tick
+        mido_obj.tracks.append(track)
+
+    stream = io.BytesIO()
+    mido_obj.save(file=stream)
+    return stream.getvalue()
+
+
+# name: arguments of `make_midi_data`
+SAMPLES = {
+    'multitrack': dict(num_tracks=4, num_notes=300, seed=0),
+    'single_track': dict(num_tracks=1, num_notes=200, seed=1),
+    'low_resolution': dict(num_tracks=3, num_notes=200, ticks_per_beat=96, seed=2),
+}
+
+
+@pytest.fixture(scope='session')
+def sample_files(tmp_path_factory):
+    """Paths of the sample midi files, by name."""
+    path = tmp_path_factory.mktemp('samples')
+    files = {}
+    for name, kwargs in SAMPLES.items():
+        files[name] = path / (name + '.mid')
+        files[name].write_bytes(make_midi_data(**kwargs))
+    return files
@@ -0,0 +1,60 @@
+import hashlib
+import io
+
+import numpy as np
+import pytest
+
+from miditoolkit.midi.parser import MidiFile
+
+
+# sha256 of the output of the former mido-based writer (miditoolkit 0.0.6)
+# on the sample files, whole and cropped to ticks [480, 4800)
+_DIGESTS = {
+    ('multitrack', None): '430543cfc684c1ec45861cf151cd6212775f4b5fb062123e420b1cc14c85eac6',
+    ('multitrack', (480, 4800)): '2f65fb7eb477bfe1da72c32b9300a82b3db61c0ed92914e211bd98ed1e559c75',
+    ('single_track', None): 'da126b91bf70f173c350e3f6de433fe8776e3aa52df30b95d5c47522ac7b556d',
+    ('single_track', (480, 4800)): '623ff204980a13fa70824da7a29042393b7a5bdf946b9e90b9ddf1e69902b069',
+    ('low_resolution', None): '545f8f31ed36aeea8cce3055590bdacecc81ae36153dc405ce582ba72f375c73',
+    ('low_resolution', (480, 4800)): '278d124a3759b0dcd28d6a40b6287efe13f6a8aaf473382d324c6239f5a94db3',
+}
+
+
+def _sorted(events):
+    # events at the same tick are written sorted by value
+    return sorted(events, key=lambda event: (event.time, event._values()))
+
+
+def _dump(midi_obj, **kwargs):
+    stream = io.BytesIO()
+    midi_obj.dump(file=stream, **kwargs)
+    return stream.getvalue()
+
+
+@pytest.mark.parametrize('name, segment', sorted(_DIGESTS, key=str))
+@pytest.mark.parametrize('note_array', [False, True])
+def test_dump_matches_former_writer(sample_files, name, segment, note_array):
+    midi_obj = MidiFile(str(sample_files[name]), note_array=note_array)
+    data = _dump(midi_obj, segment=segment)
+    assert hashlib.sha256(data).hexdigest() == _DIGESTS[name, segment]
+    # dumping leaves the file as it was
+    assert _dump(midi_obj, segment=segment) == data
+
+
+@pytest.mark.parametrize('name', ['multitrack', 'single_track', 'low_resolution'])
+def test_dump_round_trip(sample_files, name):
+    midi_obj = MidiFile(str(sample_files[name]))
+    reloaded = MidiFile(_dump(midi_obj))
+    assert reloaded.ticks_per_beat == midi_obj.ticks_per_beat
+    assert reloaded.time_signature_changes == midi_obj.time_signature_changes
+    assert reloaded.key_signature_changes == midi_obj.key_signature_changes
+    assert reloaded.markers == midi_obj.markers
+    assert reloaded.lyrics == midi_obj.lyrics
+    assert [t.time for t in reloaded.tempo_changes] == [t.time for t in midi_obj.tempo_changes]
+    assert len(reloaded.instruments) == len(midi_obj.instruments)
+    for instrument, expected in zip(reloaded.instruments, midi_obj.instruments):
+        assert (instrument.program, instrument.is_drum, instrument.name) == \
+            (expected.program, expected.is_drum, expected.name)
+        # notes at the same tick may come back in another order
+        assert np.array_equal(np.sort(instrument.note_array), np.sort(expected.note_array))
+        assert _sorted(instrument.control_changes) == _sorted(expected.control_changes)
+        assert _sorted(instrument.pitch_bends) == _sorted(expected.pitch_bends)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from miditoolkit.midi import parser, smf
+from miditoolkit.midi.parser import MidiFile
+
+
+def _assert_same_file(midi_obj, expected):
+    assert midi_obj.ticks_per_beat == expected.ticks_per_beat
+    assert midi_obj.max_tick == expected.max_tick
+    assert midi_obj.tempo_changes == expected.tempo_changes
+    assert midi_obj.time_signature_changes == expected.time_signature_changes
+    assert midi_obj.key_signature_changes == expected.key_signature_changes
+    assert midi_obj.markers == expected.markers
+    assert midi_obj.lyrics == expected.lyrics
+    assert len(midi_obj.instruments) == len(expected.instruments)
+    for instrument, other in zip(midi_obj.instruments, expected.instruments):
+        assert (instrument.program, instrument.is_drum, instrument.name) == \
+            (other.program, other.is_drum, other.name)
+        assert np.array_equal(instrument.note_array, other.note_array)
+        assert instrument.control_changes == other.control_changes
+        assert instrument.pitch_bends == other.pitch_bends
+
+
+@pytest.mark.parametrize('name', ['multitrack', 'single_track', 'low_resolution'])
+@pytest.mark.parametrize('note_array', [False, True])
+def test_native_matches_mido(sample_files, name, note_array):
+    filename = str(sample_files[name])
+    native = MidiFile(filename, native=True, note_array=note_array)
+    _assert_same_file(native, MidiFile(filename, native=False, note_array=note_array))
+    if not note_array:
+        assert native.instruments[0].notes == \
+            MidiFile(filename, native=False).instruments[0].notes
+
+
+def test_fallback_to_mido(sample_files, monkeypatch):
+    data = sample_files['multitrack'].read_bytes()
+    expected = MidiFile(data, native=False)
+
+    # the decoder gives up half way: mido reads the file into a new loader
+    def read_midi(data, loader):
+        loader.set_tempo(0, 500000)
+        raise ValueError('unsupported event')
+
+    monkeypatch.setattr(smf, 'read_midi', read_midi)
+    _assert_same_file(MidiFile(data), expected)
+
+
+def test_malformed_file(sample_files, monkeypatch):
+    # a key signature with 9 sharps, rejected by both decoders
+    data = sample_files['multitrack'].read_bytes()
+    pos = data.index(b'\xff\x59\x02') + 3
+    data = data[:pos] + bytes([9, 0]) + data[pos + 2:]
+    with pytest.raises(ValueError):
+        smf.read_midi(data, parser._MidiLoader(False))
+
+    calls = []
+    mido_file = parser.mido.MidiFile
+
+    def read_mido(*args, **kwargs):
+        calls.append(kwargs)
+        return mido_file(*args, **kwargs)
+
+    monkeypatch.setattr(parser.mido, 'MidiFile', read_mido)
+    # the error raised is the one of mido, once the native decoder gave up
+    with pytest.raises(Exception, match='Could not decode key'):
+        MidiFile(data)
+    assert len(calls) == 1
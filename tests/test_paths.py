@@ -0,0 +1,28 @@
+import pathlib
+
+from miditoolkit.midi.lazy import LazyMidiFile
+from miditoolkit.midi.parser import MidiFile
+from miditoolkit.midi.scan import scan_midi_file
+
+
+def test_path_round_trip(sample_files, tmp_path):
+    path = sample_files['multitrack']
+    assert isinstance(path, pathlib.Path)
+    midi_obj = MidiFile(path)
+    assert midi_obj.instruments[0].notes == MidiFile(str(path)).instruments[0].notes
+
+    dump_path = tmp_path / 'dump.mid'
+    midi_obj.dump(dump_path)
+    assert dump_path.read_bytes() == midi_obj.dump()
+
+    cache_path = tmp_path / 'file.cache'
+    midi_obj.save_cache(cache_path)
+    for use_mmap in (True, False):
+        cached = MidiFile.load_cache(cache_path, use_mmap=use_mmap)
+        assert cached.instruments[0].notes == midi_obj.instruments[0].notes
+        assert cached.tempo_changes == midi_obj.tempo_changes
+
+    lazy = LazyMidiFile(path)
+    assert lazy.tempo_changes == midi_obj.tempo_changes
+    assert scan_midi_file(path)['num_notes'] == sum(
+        instrument.get_num_notes() for instrument in midi_obj.instruments)
@@ -0,0 +1,85 @@
+import base64
+import pickle
+
+import numpy as np
+import pytest
+
+from miditoolkit.midi import containers as ct
+
+
+# a MidiFile pickled (protocol 2) by miditoolkit 0.0.6, before the event
+# containers had slots and instruments could hold their notes as an array
+_LEGACY_PICKLE = base64.b64decode(
+    'gAJjbWlkaXRvb2xraXQubWlkaS5wYXJzZXIKTWlkaUZpbGUKcQApgXEBfXECKFgOAAAAdGlj'
+    'a3NfcGVyX2JlYXRxA03gAVgIAAAAbWF4X3RpY2txBE3BA1gNAAAAdGVtcG9fY2hhbmdlc3EF'
+    'XXEGY21pZGl0b29sa2l0Lm1pZGkuY29udGFpbmVycwpUZW1wb0NoYW5nZQpxBymBcQh9cQko'
+    'WAUAAAB0ZW1wb3EKR0BeAAAAAAAAWAQAAAB0aW1lcQtLAHViYVgWAAAAdGltZV9zaWduYXR1'
+    'cmVfY2hhbmdlc3EMXXENY21pZGl0b29sa2l0Lm1pZGkuY29udGFpbmVycwpUaW1lU2lnbmF0'
+    'dXJlCnEOKYFxD31xEChYCQAAAG51bWVyYXRvcnERSwNYCwAAAGRlbm9taW5hdG9ycRJLBGgL'
+    'SwB1YmFYFQAAAGtleV9zaWduYXR1cmVfY2hhbmdlc3ETXXEUY21pZGl0b29sa2l0Lm1pZGku'
+    'Y29udGFpbmVycwpLZXlTaWduYXR1cmUKcRUpgXEWfXEXKFgIAAAAa2V5X25hbWVxGFgBAAAA'
+    'RHEZWAoAAABrZXlfbnVtYmVycRpLAmgLSwB1YmFYBgAAAGx5cmljc3EbXXEcY21pZGl0b29s'
+    'a2l0Lm1pZGkuY29udGFpbmVycwpMeXJpYwpxHSmBcR59cR8oWAQAAAB0ZXh0cSBYAgAAAGxh'
+    'cSFoC03gAXViYVgHAAAAbWFya2Vyc3EiXXEjY21pZGl0b29sa2l0Lm1pZGkuY29udGFpbmVy'
+    'cwpNYXJrZXIKcSQpgXElfXEmKGggWAEAAABBcSdoC0sAdWJhWAsAAABpbnN0cnVtZW50c3Eo'
+    'XXEpY21pZGl0b29sa2l0Lm1pZGkuY29udGFpbmVycwpJbnN0cnVtZW50CnEqKYFxK31xLChY'
+    'BwAAAHByb2dyYW1xLUsAWAcAAABpc19kcnVtcS6JWAQAAABuYW1lcS9YBQAAAHBpYW5vcTBY'
+    'BQAAAG5vdGVzcTFdcTIoY21pZGl0b29sa2l0Lm1pZGkuY29udGFpbmVycwpOb3RlCnEzKYFx'
+    'NH1xNShYCAAAAHZlbG9jaXR5cTZLUFgFAAAAcGl0Y2hxN0s8WAUAAABzdGFydHE4SwBYAwAA'
+    'AGVuZHE5TeABdWJoMymBcTp9cTsoaDZLWmg3S0BoOE3gAWg5TcADdWJlWAsAAABwaXRjaF9i'
+    'ZW5kc3E8XXE9Y21pZGl0b29sa2l0Lm1pZGkuY29udGFpbmVycwpQaXRjaEJlbmQKcT4pgXE/'
+    'fXFAKGg3S2RoC0vwdWJhWA8AAABjb250cm9sX2NoYW5nZXNxQV1xQmNtaWRpdG9vbGtpdC5t'
+    'aWRpLmNvbnRhaW5lcnMKQ29udHJvbENoYW5nZQpxQymBcUR9cUUoWAYAAABudW1iZXJxRktA'
+    'WAUAAAB2YWx1ZXFHS39oC0sAdWJhdWJhdWIu')
+
+
+def test_legacy_pickle():
+    midi_obj = pickle.loads(_LEGACY_PICKLE)
+    assert midi_obj.max_tick == 961
+    assert midi_obj.tempo_changes == [ct.TempoChange(120.0, 0)]
+    assert midi_obj.time_signature_changes == [ct.TimeSignature(3, 4, 0)]
+    assert midi_obj.key_signature_changes == [ct.KeySignature('D', 0)]
+    assert midi_obj.markers == [ct.Marker('A', 0)]
+    assert midi_obj.lyrics == [ct.Lyric('la', 480)]
+
+    instrument, = midi_obj.instruments
+    assert instrument.name == 'piano'
+    assert instrument.notes == [ct.Note(80, 60, 0, 480), ct.Note(90, 64, 480, 960)]
+    assert instrument.control_changes == [ct.ControlChange(64, 127, 0)]
+    assert instrument.pitch_bends == [ct.PitchBend(100, 240)]
+    assert instrument.get_num_notes() == 2
+    assert len(instrument.get_interval_index().overlapping(0, 480)) == 1
+    assert midi_obj.get_tick_to_time_mapping()[480] == pytest.approx(0.5)
+
+    # and round-trips in the current format
+    restored = pickle.loads(pickle.dumps(midi_obj))
+    assert restored.instruments[0].notes == instrument.notes
+    assert restored.tempo_changes == midi_obj.tempo_changes
+
+
+@pytest.mark.parametrize('protocol', range(pickle.HIGHEST_PROTOCOL + 1))
+def test_event_pickle(protocol):
+    events = [
+        ct.Note(80, 60, 0, 480), ct.PitchBend(100, 240), ct.ControlChange(64, 127, 0),
+        ct.TimeSignature(3, 4, 0), ct.KeySignature('D', 0), ct.Marker('A', 0),
+        ct.Lyric('la', 480), ct.TempoChange(120.0, 0)]
+    assert pickle.loads(pickle.dumps(events, protocol=protocol)) == events
+
+
+def test_event_setstate():
+    # the state of the default protocol for slots, and of legacy pickles
+    note = ct.Note.__new__(ct.Note)
+    note.__setstate__((None, {'velocity': 80, 'pitch': 60, 'start': 0, 'end': 480}))
+    assert note == ct.Note(80, 60, 0, 480)
+    note.__setstate__({'velocity': 90, 'pitch': 64, 'start': 480, 'end': 960})
+    assert note == ct.Note(90, 64, 480, 960)
+
+
+def test_instrument_pickle():
+    instrument = ct.Instrument(0)
+    instrument.note_array = ct.make_note_array([0, 480], [480, 960], [60, 64], [80, 90])
+    instrument.get_interval_index()
+    restored = pickle.loads(pickle.dumps(instrument))
+    assert restored._notes is None
+    assert np.array_equal(restored.note_array, instrument.note_array)
+    assert restored._interval_index_key is None
@@ -0,0 +1,47 @@
+import copy
+
+import numpy as np
+import pytest
+
+from miditoolkit.midi.containers import make_note_array
+from miditoolkit.midi.parser import MidiFile
+
+
+def _mask_slice(note_array, start_tick, end_tick, offset):
+    # clip all notes to the segment, drop those left empty
+    start = np.maximum(note_array['start'], start_tick)
+    end = np.maximum(np.minimum(note_array['end'], end_tick), start_tick)
+    keep = end > start
+    return make_note_array(
+        start[keep] - offset, end[keep] - offset,
+        note_array['pitch'][keep], note_array['velocity'][keep])
+
+
+@pytest.mark.parametrize('note_array', [False, True])
+@pytest.mark.parametrize('shift', [True, False])
+def test_slice_matches_mask(sample_files, note_array, shift):
+    midi_obj = MidiFile(str(sample_files['multitrack']), note_array=note_array)
+    # an invalid note, never kept
+    midi_obj.instruments[0].note_array = np.concatenate([
+        midi_obj.instruments[0].note_array, make_note_array([960], [960], [60], [80])])
+    if not note_array:
+        midi_obj.instruments[0].notes
+    before = copy.deepcopy(midi_obj)
+
+    windows = [(0, 480), (100, 2000), (1500, 1500), (2000, 1000),
+               (midi_obj.max_tick - 500, midi_obj.max_tick + 500)]
+    for start_tick, end_tick in windows:
+        cropped = midi_obj.slice(start_tick, end_tick, shift=shift)
+        offset = start_tick if shift else 0
+        for instrument, result in zip(midi_obj.instruments, cropped.instruments):
+            expected = _mask_slice(instrument.note_array, start_tick, end_tick, offset)
+            assert np.array_equal(result.note_array, expected)
+
+    # the source is left untouched
+    assert midi_obj.tempo_changes == before.tempo_changes
+    assert midi_obj.markers == before.markers
+    for instrument, original in zip(midi_obj.instruments, before.instruments):
+        assert (instrument._notes is None) == (original._notes is None)
+        assert np.array_equal(instrument.note_array, original.note_array)
+        assert instrument.control_changes == original.control_changes
+        assert instrument.pitch_bends == original.pitch_bends
@@ -0,0 +1,50 @@
+import io
+
+import mido
+import numpy as np
+
+from miditoolkit.midi.containers import TempoChange
+from miditoolkit.midi.parser import MidiFile
+
+
+def _make_midi():
+    # tempo changes spread over two tracks, read track by track out of order
+    mido_obj = mido.MidiFile(ticks_per_beat=480)
+    for times in ([0, 1920], [960, 2880]):
+        track = mido.MidiTrack()
+        prev = 0
+        for time in times:
+            tempo = mido.bpm2tempo(60 + time // 32)
+            track.append(mido.MetaMessage('set_tempo', tempo=tempo, time=time - prev))
+            prev = time
+        track.append(mido.Message('note_on', note=60, velocity=80, time=3840 - prev))
+        track.append(mido.Message('note_off', note=60, velocity=0, time=0))
+        mido_obj.tracks.append(track)
+    stream = io.BytesIO()
+    mido_obj.save(file=stream)
+    return stream.getvalue()
+
+
+def test_tempo_changes_sorted_on_load():
+    data = _make_midi()
+    for native in (True, False):
+        midi_obj = MidiFile(io.BytesIO(data), native=native)
+        times = [t.time for t in midi_obj.tempo_changes]
+        assert times == sorted(times)
+        assert len(times) == 4
+
+
+def test_out_of_order_tempo_changes():
+    midi_obj = MidiFile()
+    midi_obj.max_tick = 3841
+    midi_obj.tempo_changes = [
+        TempoChange(90.0, 1920), TempoChange(60.0, 0),
+        TempoChange(150.0, 2880), TempoChange(120.0, 960)]
+
+    tick_to_time = midi_obj.get_tick_to_time_mapping()
+    ticks = np.arange(midi_obj.max_tick + 1)
+    assert np.allclose(midi_obj.ticks_to_seconds(ticks), tick_to_time)
+    assert np.all(np.diff(tick_to_time) > 0)
+    # two beats at 60 bpm, then one at 120 bpm
+    assert np.isclose(tick_to_time[1440], 2.5)
+    assert np.array_equal(midi_obj.seconds_to_ticks(tick_to_time), ticks)
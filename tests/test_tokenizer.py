@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from miditoolkit.midi.containers import Instrument, Note, TempoChange, TimeSignature
+from miditoolkit.midi.parser import MidiFile
+from miditoolkit.tokenizer import REMITokenizer
+
+
+def _make_midi(tokenizer, time_signatures, notes):
+    midi_obj = MidiFile()
+    midi_obj.tempo_changes = [TempoChange(float(tokenizer.tempi[10]), 0)]
+    midi_obj.time_signature_changes = [TimeSignature(*ts) for ts in time_signatures]
+    instrument = Instrument(0)
+    instrument.notes = [
+        Note(int(tokenizer.velocities[velocity]), pitch, start, end)
+        for velocity, pitch, start, end in notes]
+    midi_obj.instruments = [instrument]
+    midi_obj.max_tick = max(note.end for note in instrument.notes) + 1
+    return midi_obj
+
+
+def _signatures(midi_obj):
+    return [(ts.numerator, ts.denominator, ts.time) for ts in midi_obj.time_signature_changes]
+
+
+def test_round_trip():
+    tokenizer = REMITokenizer(resolution=4)
+    midi_obj = _make_midi(
+        tokenizer, [(4, 4, 0), (6, 8, 1920), (5, 32, 3360)],
+        [(3, 60, 0, 480), (8, 64, 120, 240), (20, 67, 1920, 2400), (30, 72, 3360, 3480)])
+    decoded = tokenizer.decode(tokenizer.encode(midi_obj), ticks_per_beat=480)
+    assert _signatures(decoded) == _signatures(midi_obj)
+    assert decoded.tempo_changes == midi_obj.tempo_changes
+    assert decoded.instruments[0].program == 0
+    assert decoded.instruments[0].notes == midi_obj.instruments[0].notes
+
+
+@pytest.mark.parametrize('denominator, expected', [(3, 4), (5, 4), (6, 8), (64, 32)])
+def test_unsupported_denominator(denominator, expected):
+    # mapped to the nearest supported denominator, on a log scale
+    tokenizer = REMITokenizer(resolution=4)
+    midi_obj = _make_midi(
+        tokenizer, [(4, 4, 0), (3, denominator, 1920)],
+        [(3, 60, 0, 480), (8, 64, 1920, 2040)])
+    tokens = tokenizer.encode(midi_obj)
+    strings = tokenizer.tokens_to_strings(tokens)
+    assert strings.count('TimeSig_3/{}'.format(expected)) == 1
+
+    decoded = tokenizer.decode(tokens, ticks_per_beat=480)
+    assert _signatures(decoded) == [(4, 4, 0), (3, expected, 1920)]
+    assert decoded.instruments[0].notes == midi_obj.instruments[0].notes
+
+
+def test_mapped_denominator_moves_later_bars():
+    # the 3/3 bar spans 1920 ticks, decoded as a 3/4 bar of 1440
+    tokenizer = REMITokenizer(resolution=4)
+    midi_obj = _make_midi(
+        tokenizer, [(4, 4, 0), (3, 3, 1920), (4, 4, 3840)],
+        [(3, 60, 0, 480), (8, 64, 1920, 2040), (9, 65, 3840, 3960)])
+    decoded = tokenizer.decode(tokenizer.encode(midi_obj), ticks_per_beat=480)
+    assert _signatures(decoded) == [(4, 4, 0), (3, 4, 1920), (4, 4, 3360)]
+    assert [note.start for note in decoded.instruments[0].notes] == [0, 1920, 3360]
+    assert np.array_equal(
+        decoded.instruments[0].note_array['pitch'], [60, 64, 65])
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from miditoolkit.midi.parser import MidiFile
+
+
+@pytest.mark.parametrize('edit', [
+    lambda m: m.transpose(40, mode='drop'),
+    lambda m: m.transpose(-40, mode='clip', drums=True),
+    lambda m: m.apply_velocity_curve(1.7),
+    lambda m: m.stretch_time(0.9)])
+def test_note_list_matches_note_array(sample_files, edit):
+    midi_list = MidiFile(str(sample_files['multitrack']))
+    midi_array = MidiFile(str(sample_files['multitrack']), note_array=True)
+    notes = [instrument.notes for instrument in midi_list.instruments]
+    edit(midi_list)
+    edit(midi_array)
+    for instrument, expected in zip(midi_list.instruments, midi_array.instruments):
+        assert instrument._notes is not None
+        assert np.array_equal(instrument.note_array, expected.note_array)
+    # the Note objects are updated in place
+    for instrument, original in zip(midi_list.instruments, notes):
+        assert {id(note) for note in instrument.notes} <= {id(note) for note in original}